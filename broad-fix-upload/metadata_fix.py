@@ -21,6 +21,9 @@ import subprocess
 from random import randint
 import shutil
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'pcawg_metadata_parser'))
+from gnos_repo_registry import get_formal_repo_name
+
 logger = logging.getLogger('metadata_fix_and_upload')
 # create console handler with a higher log level
 ch = logging.StreamHandler()
@@ -28,29 +31,6 @@ ch = logging.StreamHandler()
 # gnos_key = '~/.ssh/gnos_key'
 
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
-
-    return repo_url_to_repo.get(repo)
-
-
 def download_metadata_xml(gnos_id, gnos_repo, download_dir=None):
     logger.info('Download metadata xml from GNOS repo: {} for analysis object: {}'.format(gnos_repo, gnos_id))
     
@@ -4,7 +4,6 @@
 import sys
 import csv
 import os
-import re
 import xmltodict
 import requests
 import logging
@@ -13,7 +12,6 @@ from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 import time
 import uuid
-import copy
 import simplejson as json
 import glob
 import hashlib
@@ -21,6 +19,7 @@ import subprocess
 from random import randint
 import shutil
 import tarfile
+from file_pattern_matcher import FilePatternMatcher, DirectoryListing
 
 logger = logging.getLogger('metadata_fix_and_upload')
 # create console handler with a higher log level
@@ -28,81 +27,53 @@ ch = logging.StreamHandler()
 #gnos_key = '/home/ubuntu/.ssh/gnos_key'
 # gnos_key = '~/.ssh/gnos_key'
 
+muse_file_matcher = FilePatternMatcher([
+        r'^.+\.somatic\.snv_mnv\.vcf\.gz$',
+        r'^.+\.somatic\.snv_mnv\.vcf\.gz\.idx$'
+    ])
+
+broad_file_matcher = FilePatternMatcher([
+        r'^.+\.germline\.indel\.vcf\.gz$',
+        r'^.+\.germline\.indel\.vcf\.gz\.tbi$',
+        r'^.+\.somatic\.indel\.vcf\.gz$',
+        r'^.+\.somatic\.indel\.vcf\.gz\.tbi$',
+        r'^.+\.broad-dRanger[^_].+\.somatic\.sv\.vcf\.gz$',
+        r'^.+\.broad-dRanger[^_].+\.somatic\.sv\.vcf\.gz\.tbi$',
+        r'^.+\.broad-snowman.+\.somatic\.sv\.vcf\.gz$',
+        r'^.+\.broad-snowman.+\.somatic\.sv\.vcf\.gz\.tbi$',
+        r'^.+\.broad-dRanger_snowman.+\.somatic\.sv\.vcf\.gz$',
+        r'^.+\.broad-dRanger_snowman.+\.somatic\.sv\.vcf\.gz\.tbi$',
+        r'^.+\.germline\.sv\.vcf\.gz$',
+        r'^.+\.germline\.sv\.vcf\.gz\.tbi$',
+        r'^.+\.somatic\.snv_mnv\.vcf\.gz$',
+        r'^.+\.somatic\.snv_mnv\.vcf\.gz\.tbi$'
+    ])
+
+# work dirs are listed once per run and shared by all donors
+dir_listing = DirectoryListing()
+
 
 def get_files(donor_id, call, work_dir, aliquot_id):
 
     matched_files = []
     if call == 'muse':
-        file_name_patterns = set([
-                r'^.+\.somatic\.snv_mnv\.vcf\.gz$',
-                r'^.+\.somatic\.snv_mnv\.vcf\.gz\.idx$'
-            ])
-
-        file_dir = 'Muse-calls'
-        for f in glob.glob(os.path.join(work_dir, file_dir, donor_id+'*')):
-            file_name = os.path.basename(f)
-            # print file_name
-            matched_fp = None
-            for fp in file_name_patterns:
-                if re.match(fp, file_name):
-                    matched_fp = fp
-                    matched_files.append(copy.deepcopy(f))
-
-            if matched_fp: file_name_patterns.remove(matched_fp)  # remove the file pattern that had a match
-
-        if file_name_patterns:
-            for fp in file_name_patterns:
-                logger.error('Missing expected variant call result file with pattern: {} for aliquot {}'.format(fp, aliquot)) 
+        candidate_files = dir_listing.glob_prefix(os.path.join(work_dir, 'Muse-calls'), donor_id)
+        matched_files, missing_patterns = muse_file_matcher.select(candidate_files)
+
+        for fp in missing_patterns:
+            logger.error('Missing expected variant call result file with pattern: {} for aliquot {}'.format(fp, aliquot_id))
 
     elif call in ['broad-v3', 'broad']:
-        file_name_patterns = set([
-                r'^.+\.germline\.indel\.vcf\.gz$',
-                r'^.+\.germline\.indel\.vcf\.gz\.tbi$',
-                r'^.+\.somatic\.indel\.vcf\.gz$',
-                r'^.+\.somatic\.indel\.vcf\.gz\.tbi$',
-                r'^.+\.broad-dRanger[^_].+\.somatic\.sv\.vcf\.gz$',
-                r'^.+\.broad-dRanger[^_].+\.somatic\.sv\.vcf\.gz\.tbi$',
-                r'^.+\.broad-snowman.+\.somatic\.sv\.vcf\.gz$',
-                r'^.+\.broad-snowman.+\.somatic\.sv\.vcf\.gz\.tbi$',
-                r'^.+\.broad-dRanger_snowman.+\.somatic\.sv\.vcf\.gz$',
-                r'^.+\.broad-dRanger_snowman.+\.somatic\.sv\.vcf\.gz\.tbi$',
-                r'^.+\.germline\.sv\.vcf\.gz$',
-                r'^.+\.germline\.sv\.vcf\.gz\.tbi$',
-                r'^.+\.somatic\.snv_mnv\.vcf\.gz$',
-                r'^.+\.somatic\.snv_mnv\.vcf\.gz\.tbi$'
-            ])
-        file_dir = 'broad-fix-for-long-running-jobs'
-        for f in glob.glob(os.path.join(work_dir, file_dir, aliquot_id+'*')):
-            file_name = os.path.basename(f)
-            # print file_name
-            matched_fp = None
-            for fp in file_name_patterns:
-                if re.match(fp, file_name):
-                    matched_fp = fp
-                    matched_files.append(copy.deepcopy(f))
-
-            if matched_fp: file_name_patterns.remove(matched_fp)  # remove the file pattern that had a match
-
-        file_dir = 'Broad-calls/'+donor_id+'/links_for_gnos/tabix_*'
-        for f in glob.glob(os.path.join(work_dir, file_dir, donor_id+'*')):
-            file_name = os.path.basename(f)
-            # print file_name
-            matched_fp = None
-            for fp in file_name_patterns:
-                if re.match(fp, file_name):
-                    matched_fp = fp
-                    matched_files.append(copy.deepcopy(f))
-
-            if matched_fp: file_name_patterns.remove(matched_fp)  # remove the file pattern that had a match
-
-        if file_name_patterns:
-            for fp in file_name_patterns:
-                logger.warning('Missing expected variant call result file with pattern: {} for aliquot {}'.format(fp, aliquot_id))       
+        candidate_files = dir_listing.glob_prefix(os.path.join(work_dir, 'broad-fix-for-long-running-jobs'), aliquot_id) + \
+                dir_listing.glob_prefix(os.path.join(work_dir, 'Broad-calls/'+donor_id+'/links_for_gnos/tabix_*'), donor_id)
+        matched_files, missing_patterns = broad_file_matcher.select(candidate_files)
 
+        for fp in missing_patterns:
+            logger.warning('Missing expected variant call result file with pattern: {} for aliquot {}'.format(fp, aliquot_id))
 
     elif call == 'broad_tar':
         file_dir = 'Broad-calls/'+donor_id+'/links_for_broad'
-        matched_files = glob.glob(os.path.join(work_dir, file_dir, '*'))
+        matched_files = dir_listing.glob_prefix(os.path.join(work_dir, file_dir))
         return matched_files            
 
     else:
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+# Shared helpers for the upload scripts' get_files: the expected file name
+# patterns are compiled once into a single regex (one named group per pattern)
+# and each work directory is read from disk only once per run, with the
+# listing kept sorted in memory so per-donor/per-aliquot prefix lookups
+# replace the repeated glob.glob calls.
+
+import os
+import re
+import glob
+import bisect
+
+
+class FilePatternMatcher(object):
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._regex = re.compile('|'.join(
+            '(?P<p{}>{})'.format(i, p) for i, p in enumerate(self.patterns)))
+
+    def match(self, file_name):
+        m = self._regex.match(file_name)
+        # the outermost named group closes last, so lastgroup is the pattern's group
+        return self.patterns[int(m.lastgroup[1:])] if m else None
+
+    def select(self, file_paths):
+        # same semantics as the old per-pattern loop: the first file matching a
+        # pattern is kept, later files matching an already satisfied pattern are not
+        matched_files = []
+        matched_patterns = set()
+        for f in file_paths:
+            fp = self.match(os.path.basename(f))
+            if fp is None or fp in matched_patterns: continue
+            matched_patterns.add(fp)
+            matched_files.append(f)
+
+        missing_patterns = [fp for fp in self.patterns if not fp in matched_patterns]
+        return matched_files, missing_patterns
+
+
+class DirectoryListing(object):
+
+    def __init__(self):
+        self._dirs = {}
+        self._listings = {}
+
+    def list_dir(self, path):
+        if not path in self._listings:
+            names = [n for n in os.listdir(path) if not n.startswith('.')] if os.path.isdir(path) else []
+            names.sort()
+            self._listings[path] = names
+        return self._listings[path]
+
+    def expand_dir(self, dir_pattern):
+        if not dir_pattern in self._dirs:
+            self._dirs[dir_pattern] = sorted(glob.glob(dir_pattern)) if glob.has_magic(dir_pattern) else [dir_pattern]
+        return self._dirs[dir_pattern]
+
+    def glob_prefix(self, dir_pattern, prefix=''):
+        # equivalent of glob.glob(os.path.join(dir_pattern, prefix+'*'))
+        files = []
+        for d in self.expand_dir(dir_pattern):
+            names = self.list_dir(d)
+            i = bisect.bisect_left(names, prefix)
+            while i < len(names) and names[i].startswith(prefix):
+                files.append(os.path.join(d, names[i]))
+                i += 1
+        return files
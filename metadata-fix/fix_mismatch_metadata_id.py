@@ -18,6 +18,10 @@ import time
 from random import randint
 import subprocess
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'pcawg_metadata_parser'))
+from gnos_repo_registry import get_formal_repo_name
+from report_writer import TsvWriter
+
 
 # logger = logging.getLogger('fix metadata')
 # ch = logging.StreamHandler()
@@ -61,28 +65,6 @@ def download_metadata_xml(gnos_repo, gnos_id, download_dir=None):
     return metadata_xml_str
 
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
-
-    return repo_url_to_repo.get(repo)
-
 def fix_illegal_id(xml_str, id_mapping, fix_pattern, id_types):
     for id_type in id_types:
         if not id_mapping.get(id_type): continue
@@ -188,24 +170,8 @@ def read_annotations(annotations, type, file_name, subtype):
 
 
 def write_file(flist, fn):
-    with open(fn, 'w') as f:
-        header = True  
-        for r in flist:
-            if header:
-                f.write('\t'.join(r.keys()) + '\n')
-                header = False 
-            # make the list of output from dict
-            line = []
-            for p in r.keys():
-                if isinstance(r.get(p), list):
-                    line.append('|'.join(r.get(p)))
-                elif isinstance(r.get(p), set):
-                    line.append('|'.join(list(r.get(p))))
-                elif r.get(p) is None:
-                    line.append('')
-                else:
-                    line.append(str(r.get(p)))
-            f.write('\t'.join(line) + '\n') 
+    with TsvWriter(fn) as tsv_writer:
+        tsv_writer.writerows(flist)
 
 
 def main(argv=None):
@@ -13,7 +13,6 @@ from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 import time
 import uuid
-import copy
 import simplejson as json
 import glob
 import hashlib
@@ -22,40 +21,40 @@ from random import randint
 import shutil
 import tarfile
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'broad-partial-upload'))
+from file_pattern_matcher import FilePatternMatcher, DirectoryListing
+
 logger = logging.getLogger('pcawg_final_consensus_vcfs_upload')
 
 ch = logging.StreamHandler()
 
+# compiled matchers per variant call, and work dirs listed once per run
+file_matchers = {}
+dir_listing = DirectoryListing()
+
+
+def get_file_matcher(call):
+    if not call in file_matchers:
+        file_matchers[call] = FilePatternMatcher([
+                r'^([a-f\d]{8}(-[a-f\d]{4}){3}-[a-f\d]{12}?)\.consensus\..+\.somatic\.'+re.escape(call)+r'\.vcf\.gz$',
+                r'^([a-f\d]{8}(-[a-f\d]{4}){3}-[a-f\d]{12}?)\.consensus\..+\.somatic\.'+re.escape(call)+r'\.vcf\.gz\.tbi$'
+            ])
+    return file_matchers[call]
 
 
 def get_files(dcc_project_code, call, work_dir, aliquot):
 
-    matched_files = []
     repo_type = 'tcga' if dcc_project_code.endswith('-US') else 'icgc'
     white_file_dir = os.path.join(work_dir, 'final_consensus_12oct', repo_type, call)
 
-    file_name_patterns = set([
-            r'^([a-f\d]{8}(-[a-f\d]{4}){3}-[a-f\d]{12}?)\.consensus\..+\.somatic\.'+re.escape(call)+r'\.vcf\.gz$',
-            r'^([a-f\d]{8}(-[a-f\d]{4}){3}-[a-f\d]{12}?)\.consensus\..+\.somatic\.'+re.escape(call)+r'\.vcf\.gz\.tbi$'
-        ])
-
+    candidate_files = []
     for file_dir in (white_file_dir, os.path.join(white_file_dir, '..', 'graylist', call)): # match fixed_file dir first
-        for f in glob.glob(os.path.join(file_dir, aliquot+'*')):
-            file_name = os.path.basename(f)
-            # print file_name
-            matched_fp = None
-            for fp in file_name_patterns:
-                if re.match(fp, file_name):
-                    matched_fp = fp
-                    matched_files.append(copy.deepcopy(f))
-
-            if matched_fp: file_name_patterns.remove(matched_fp)  # remove the file pattern that had a match
-
-        # print matched_files
-        # print len(matched_files)
-    if file_name_patterns:
-        for fp in file_name_patterns:
-            logger.error('Missing expected consensus variant call result file with pattern: {} for aliquot {}'.format(fp, aliquot))
+        candidate_files.extend(dir_listing.glob_prefix(file_dir, aliquot))
+
+    matched_files, missing_patterns = get_file_matcher(call).select(candidate_files)
+
+    for fp in missing_patterns:
+        logger.error('Missing expected consensus variant call result file with pattern: {} for aliquot {}'.format(fp, aliquot))
      
     return matched_files
 
@@ -9,6 +9,8 @@ import sys
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 import glob
+from gnos_repo_registry import get_formal_repo_name
+from xml_attribute_index import XmlAttributeIndex, effective_xml_md5sum, xml_md5sum
 
 def download_metadata_xml(gnos_repo, ao_uuid):
     
@@ -28,84 +30,6 @@ def download_metadata_xml(gnos_repo, ao_uuid):
     return metadata_xml_str
 
 
-def find_cached_metadata_xml(gnos_repo, gnos_id):
-
-    metadata_xml_files = 'gnos_metadata/__all_metadata_xml/' + get_formal_repo_name(gnos_repo) + '/' + gnos_id + '__live__*.xml'
-    metadata_xml_file = sorted(glob.glob(metadata_xml_files))[-1]
-    with open (metadata_xml_file, 'r') as x: data = x.read()
-    return data
-
-
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
-
-    return repo_url_to_repo.get(repo)
-
-
-def effective_xml_md5sum(xml_str):
-
-    xml_str = re.sub(r'<ResultSet .+?>', '<ResultSet>', xml_str)
-    xml_str = re.sub(r'<last_modified>.+?</last_modified>', '<last_modified></last_modified>', xml_str)
-    xml_str = re.sub(r'<upload_date>.+?</upload_date>', '<upload_date></upload_date>', xml_str)
-    xml_str = re.sub(r'<published_date>.+?</published_date>', '<published_date></published_date>', xml_str)
-    xml_str = re.sub(r'<center_name>.+?</center_name>', '<center_name></center_name>', xml_str)
-    xml_str = re.sub(r'<analyte_code>.+?</analyte_code>', '<analyte_code></analyte_code>', xml_str)
-    xml_str = re.sub(r'<reason>.+?</reason>', '<reason></reason>', xml_str)
-    xml_str = re.sub(r'<study>.+?</study>', '<study></study>', xml_str)
-    xml_str = re.sub(r'<sample_accession>.+?</sample_accession>', '<sample_accession></sample_accession>', xml_str)
-
-    #xml_str = re.sub(r'<dcc_project_code>.+?</dcc_project_code>', '<dcc_project_code></dcc_project_code>', xml_str)
-    #xml_str = re.sub(r'<participant_id>.+?</participant_id>', '<participant_id></participant_id>', xml_str)
-    xml_str = re.sub(r'<dcc_specimen_type>.+?</dcc_specimen_type>', '<dcc_specimen_type></dcc_specimen_type>', xml_str)
-
-    xml_str = re.sub(r'<specimen_id>.+?</specimen_id>', '<specimen_id></specimen_id>', xml_str)
-    xml_str = re.sub(r'<sample_id>.+?</sample_id>', '<sample_id></sample_id>', xml_str)
-    xml_str = re.sub(r'<use_cntl>.+?</use_cntl>', '<use_cntl></use_cntl>', xml_str)
-    xml_str = re.sub(r'<library_strategy>.+?</library_strategy>', '<library_strategy></library_strategy>', xml_str)
-    xml_str = re.sub(r'<platform>.+?</platform>', '<platform></platform>', xml_str)
-    xml_str = re.sub(r'<refassem_short_name>.+?</refassem_short_name>', '<refassem_short_name></refassem_short_name>', xml_str)
-
-    xml_str = re.sub(r'<STUDY_REF .+?/>', '<STUDY_REF/>', xml_str)
-    xml_str = re.sub(r'<ANALYSIS_SET .+?>', '<ANALYSIS_SET>', xml_str)
-    xml_str = re.sub(r'<ANALYSIS .+?>', '<ANALYSIS>', xml_str)
-    xml_str = re.sub(r'<EXPERIMENT_SET .+?>', '<EXPERIMENT_SET>', xml_str)
-    xml_str = re.sub(r'<RUN_SET .+?>', '<RUN_SET>', xml_str)
-    xml_str = re.sub(r'<analysis_detail_uri>.+?</analysis_detail_uri>', '<analysis_detail_uri></analysis_detail_uri>', xml_str)
-    xml_str = re.sub(r'<analysis_submission_uri>.+?</analysis_submission_uri>', '<analysis_submission_uri></analysis_submission_uri>', xml_str)
-    xml_str = re.sub(r'<analysis_data_uri>.+?</analysis_data_uri>', '<analysis_data_uri></analysis_data_uri>', xml_str)
-
-
-    # we need to take care of xml properties in different order but effectively/semantically the same
-    effective_eq_xml = json.dumps(xmltodict.parse(xml_str).get('ResultSet').get('Result'), indent=4, sort_keys=True)
-
-    effective_xml_md5sum = hashlib.md5(effective_eq_xml).hexdigest()
-    return effective_xml_md5sum
-
-
-def generate_md5(data):
-    data = re.sub(r'<ResultSet .+?>', '<ResultSet>', data)
-    xml_md5 = hashlib.md5(data).hexdigest()
-
-    return xml_md5
-
-
 def main(argv=None):
 
     parser = ArgumentParser(description="Check the state for s3 jobs",
@@ -131,7 +55,10 @@ def main(argv=None):
     jobs_info = set()
 
     if os.path.isfile(jobs_state_file): os.remove(jobs_state_file)
-    
+
+    # md5sums of the cached xml come from the xml attribute index, no need to read the xml files
+    attribute_index = XmlAttributeIndex()
+
     with open(jobs_state_file, 'w') as i:
         for f in files:
             with open(f, 'r') as r:
@@ -142,11 +69,15 @@ def main(argv=None):
                 gnos_id = job.get('gnos_id')
                 latest_xml_str = download_metadata_xml(gnos_repo, gnos_id)
                 if not latest_xml_str: continue
+                latest_xml_str = latest_xml_str.encode('utf8')
                 latest_effective_xml_md5sum = effective_xml_md5sum(latest_xml_str)
-                latest_xml_md5sum = generate_md5(latest_xml_str)
-                cached_xml_str = find_cached_metadata_xml(gnos_repo, gnos_id)
-                cached_effective_xml_md5sum = effective_xml_md5sum(cached_xml_str)
-                cached_xml_md5sum = generate_md5(cached_xml_str)
+                latest_xml_md5sum = xml_md5sum(latest_xml_str)
+                cached_xml = attribute_index.get(get_formal_repo_name(gnos_repo), gnos_id)
+                if not cached_xml:  # cached xml not indexed yet
+                    attribute_index.update(glob.glob('gnos_metadata/__all_metadata_xml/' + get_formal_repo_name(gnos_repo) + '/' + gnos_id + '__live__*.xml'))
+                    cached_xml = attribute_index.get(get_formal_repo_name(gnos_repo), gnos_id)
+                cached_effective_xml_md5sum = cached_xml.get('effective_xml_md5sum')
+                cached_xml_md5sum = cached_xml.get('xml_md5sum')
                 files = job.get('files')
                 for s in files:
                     if not gnos_id in s.get('file_name'): continue
@@ -173,6 +104,7 @@ def main(argv=None):
                     suggest_action = 'good_json'
                 i.write('\t'.join([gnos_id+'.'+sub_json_name, gnos_repo, str(do_effective_xml_md5sum_equal), str(do_cached_md5sum_equal), str(do_json_md5sum_equal), suggest_action])+'\n')
 
+    attribute_index.close()
 
     # write the job info to file if specify the file name
     if jobs_info_file is not None:    
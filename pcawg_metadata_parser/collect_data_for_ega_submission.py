@@ -11,6 +11,7 @@ import sys
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 import logging
 import glob
 from collections import OrderedDict
@@ -21,6 +22,9 @@ import subprocess
 import time
 import calendar
 import ftplib
+from multiprocessing import Pool
+from xml_attribute_index import XmlAttributeIndex, effective_xml_md5sum
+from ftp_listing import FtpListing
 
 
 logger = logging.getLogger('Collect sample and gnos_xml data')
@@ -28,6 +32,10 @@ ch = logging.StreamHandler()
 
 ega_box_token = os.environ.get('EGA_TOKEN')
 
+xml_collect_workers = 8
+
+gnos_id_sheets = {}
+
 def generate_es_query(dcc_project_code):
     es_query = {
         "fields": "donor_unique_id", 
@@ -60,10 +68,10 @@ def generate_es_query(dcc_project_code):
 
 
 def get_donors_list(es, es_index, dcc_project_code):
-    response = es.search(index=es_index, body=generate_es_query(dcc_project_code))
+    hits = scan_hits(es, es_index, generate_es_query(dcc_project_code))
     
     donors_list = set()
-    for p in response['hits']['hits']:
+    for p in hits:
         donors_list.add(p.get('fields').get('donor_unique_id')[0])
 
     return donors_list 
@@ -125,116 +133,132 @@ def collect_sample(donors_list, sample_ids_to_be_included, sample_ids_to_be_excl
             out_file = os.path.join(out_dir, 'sample.'+dcc_project_code+'.'+sequence_type+'_'+epoch_time+'.tsv')
             write_tsv_file(sample_sheet, out_file)
 
-def effective_xml_md5sum(xml_str):
+def download_metadata_xml(gnos_id):
+    # returns the xml and the error if the download failed
+    url = 'https://gtrepo-bsc.annailabs.com/cghub/metadata/analysisFull/' + gnos_id
+    response = None
+    try:
+        response = requests.get(url, stream=True, timeout=15)
+    except:
+        pass
 
-    xml_str = re.sub(r'<ResultSet .+?>', '<ResultSet>', xml_str)
-    xml_str = re.sub(r'<last_modified>.+?</last_modified>', '<last_modified></last_modified>', xml_str)
-    xml_str = re.sub(r'<upload_date>.+?</upload_date>', '<upload_date></upload_date>', xml_str)
-    xml_str = re.sub(r'<published_date>.+?</published_date>', '<published_date></published_date>', xml_str)
-    xml_str = re.sub(r'<center_name>.+?</center_name>', '<center_name></center_name>', xml_str)
-    xml_str = re.sub(r'<analyte_code>.+?</analyte_code>', '<analyte_code></analyte_code>', xml_str)
-    xml_str = re.sub(r'<reason>.+?</reason>', '<reason></reason>', xml_str)
-    xml_str = re.sub(r'<study>.+?</study>', '<study></study>', xml_str)
-    xml_str = re.sub(r'<sample_accession>.+?</sample_accession>', '<sample_accession></sample_accession>', xml_str)
+    if not response or not response.ok:
+        return None, 'Unable to download metadata from %s' % url
 
-    #xml_str = re.sub(r'<dcc_project_code>.+?</dcc_project_code>', '<dcc_project_code></dcc_project_code>', xml_str)
-    #xml_str = re.sub(r'<participant_id>.+?</participant_id>', '<participant_id></participant_id>', xml_str)
-    xml_str = re.sub(r'<dcc_specimen_type>.+?</dcc_specimen_type>', '<dcc_specimen_type></dcc_specimen_type>', xml_str)
+    return response.text, None
 
-    xml_str = re.sub(r'<specimen_id>.+?</specimen_id>', '<specimen_id></specimen_id>', xml_str)
-    xml_str = re.sub(r'<sample_id>.+?</sample_id>', '<sample_id></sample_id>', xml_str)
-    xml_str = re.sub(r'<use_cntl>.+?</use_cntl>', '<use_cntl></use_cntl>', xml_str)
-    xml_str = re.sub(r'<library_strategy>.+?</library_strategy>', '<library_strategy></library_strategy>', xml_str)
-    xml_str = re.sub(r'<platform>.+?</platform>', '<platform></platform>', xml_str)
-    xml_str = re.sub(r'<refassem_short_name>.+?</refassem_short_name>', '<refassem_short_name></refassem_short_name>', xml_str)
 
-    xml_str = re.sub(r'<STUDY_REF .+?/>', '<STUDY_REF/>', xml_str)
-    xml_str = re.sub(r'<ANALYSIS_SET .+?>', '<ANALYSIS_SET>', xml_str)
-    xml_str = re.sub(r'<ANALYSIS .+?>', '<ANALYSIS>', xml_str)
-    xml_str = re.sub(r'<EXPERIMENT_SET .+?>', '<EXPERIMENT_SET>', xml_str)
-    xml_str = re.sub(r'<RUN_SET .+?>', '<RUN_SET>', xml_str)
-    xml_str = re.sub(r'<analysis_detail_uri>.+?</analysis_detail_uri>', '<analysis_detail_uri></analysis_detail_uri>', xml_str)
-    xml_str = re.sub(r'<analysis_submission_uri>.+?</analysis_submission_uri>', '<analysis_submission_uri></analysis_submission_uri>', xml_str)
-    xml_str = re.sub(r'<analysis_data_uri>.+?</analysis_data_uri>', '<analysis_data_uri></analysis_data_uri>', xml_str)
+def find_cached_metadata_xml(gnos_id):
 
+    metadata_xml_files = 'gnos_metadata/__all_metadata_xml/bsc/' + gnos_id + '__live__*.xml'
+    if not glob.glob(metadata_xml_files): return None
+    return sorted(glob.glob(metadata_xml_files))[-1]
 
-    # we need to take care of xml properties in different order but effectively/semantically the same
-    effective_eq_xml = json.dumps(xmltodict.parse(xml_str).get('ResultSet').get('Result'), indent=4, sort_keys=True)
 
-    effective_xml_md5sum = hashlib.md5(effective_eq_xml).hexdigest()
-    return effective_xml_md5sum
+class Md5Writer(object):
+    # file object wrapper computing the md5sum of everything written through it
+    def __init__(self, fh):
+        self.fh = fh
+        self.md5 = hashlib.md5()
 
+    def write(self, data):
+        self.md5.update(data)
+        self.fh.write(data)
 
-def download_metadata_xml(gnos_id):
-    
-    url = 'https://gtrepo-bsc.annailabs.com/cghub/metadata/analysisFull/' + gnos_id
-    response = None
-    try:
-        response = requests.get(url, stream=True, timeout=15)
-    except:
-        click.echo('Error: Unable to download metadata from %s' % url, err=True)
-        sys.exit(0)
+    def flush(self):
+        self.fh.flush()
 
-    if not response or not response.ok:
-        click.echo('Error: Unable to download metadata from %s' % url, err=True)
-        sys.exit(0)
+
+def write_gzip(gz_file, data):
+    # gzip into a temp file hashing the gzip stream on the way, returns md5sum of the gzip file
+    with open(gz_file + '.tmp', 'wb') as f:
+        md5_writer = Md5Writer(f)
+        with gzip.GzipFile(filename=gz_file, mode='wb', fileobj=md5_writer) as n: n.write(data)
+    os.rename(gz_file + '.tmp', gz_file)
+    return md5_writer.md5.hexdigest()
+
+
+def stage_gnos_xml(task):
+    # runs in the worker pool, returns gnos_id, md5sum of the gzipped xml and the error if any
+    gnos_id, gnos_xml_gz_file, cached_xml = task
+    if os.path.exists(gnos_xml_gz_file): return gnos_id, get_md5(gnos_xml_gz_file, False), None
+
+    latest_xml_str, error = download_metadata_xml(gnos_id)
+    if error: return gnos_id, None, error
+
+    cached_xml_file = find_cached_metadata_xml(gnos_id)
+    if not cached_xml_file: return gnos_id, None, 'missing cached GNOS metadata xml in BSC for gnos_id: %s' % gnos_id
+    with open (cached_xml_file, 'r') as x: cached_xml_str = x.read()
+
+    # effective md5sum of the cached xml from the attribute index when it has indexed the same file
+    if cached_xml and cached_xml.get('xml_file') == cached_xml_file:
+        cached_effective_xml_md5sum = cached_xml.get('effective_xml_md5sum')
     else:
-        metadata_xml_str = response.text
+        cached_effective_xml_md5sum = effective_xml_md5sum(cached_xml_str)
 
-    return metadata_xml_str
+    if not effective_xml_md5sum(latest_xml_str.encode('utf8')) == cached_effective_xml_md5sum:
+        return gnos_id, None, 'BSC gnos xml has different effective md5sum with the cached xml for gnos_id: %s' % gnos_id
 
-def find_cached_metadata_xml(gnos_id):
+    return gnos_id, write_gzip(gnos_xml_gz_file, cached_xml_str), None
 
-    metadata_xml_files = 'gnos_metadata/__all_metadata_xml/bsc/' + gnos_id + '__live__*.xml'
-    if not glob.glob(metadata_xml_files): 
-        click.echo('Warning: missing cached GNOS metadata xml in BSC for gnos_id: %s' % gnos_id, err=True)
-        sys.exit(0)
-    metadata_xml_file = sorted(glob.glob(metadata_xml_files))[-1]
-    with open (metadata_xml_file, 'r') as x: data = x.read()
-    return data
+
+def read_gnos_id_sheet(pcawg_gnos_id_sheet):
+    # read once, then filtered for each project and workflow
+    if not pcawg_gnos_id_sheet in gnos_id_sheets:
+        with open(pcawg_gnos_id_sheet, 'r') as f:
+            reader = csv.DictReader(f, delimiter='\t')
+            gnos_id_sheets[pcawg_gnos_id_sheet] = [(row.get('donor_unique_id'), row.get('gnos_id'), row.get('entry_type')) for row in reader]
+    return gnos_id_sheets.get(pcawg_gnos_id_sheet)
 
 
 def collect_gnos_xml(donors_list, gnos_sample_ids_to_be_included, gnos_sample_ids_to_be_excluded, project, ega_dir, pcawg_gnos_id_sheet, workflow, annotations):
     
+    gnos_id_sheet = read_gnos_id_sheet(pcawg_gnos_id_sheet)
+    attribute_index = XmlAttributeIndex()
+    pool = Pool(xml_collect_workers)
+
     for w in workflow:
         print('\nCollecting the GNOS xmls for workflow: {} of project: {}'.format(get_mapping(w), project))
         gnos_xml_dir = os.path.join(ega_dir, project, get_mapping(w), 'GNOS_xml')
         if not os.path.exists(gnos_xml_dir): os.makedirs(gnos_xml_dir)
+
+        tasks = []
+        for donor_unique_id, gnos_id, entry_type in gnos_id_sheet:
+            if not donor_unique_id in donors_list: continue
+            if gnos_sample_ids_to_be_included and not gnos_id in gnos_sample_ids_to_be_included: continue
+            if gnos_sample_ids_to_be_excluded and gnos_id in gnos_sample_ids_to_be_excluded: continue
+            if not get_mapping(entry_type) == w: continue
+
+            gnos_xml_gz_file = os.path.join(gnos_xml_dir, 'analysis.'+gnos_id+'.GNOS.xml.gz')
+            cached_xml = attribute_index.get('bsc', gnos_id) if not os.path.exists(gnos_xml_gz_file) else None
+            tasks.append((gnos_id, gnos_xml_gz_file, cached_xml))
+
+        # fetch, compare and gzip concurrently, failures are reported for each gnos_id
         gnos_xml_sheet = []
-        with open(pcawg_gnos_id_sheet, 'r') as f:
-            reader = csv.DictReader(f, delimiter='\t')
-            for row in reader:
-                if not row.get('donor_unique_id') in donors_list: continue
-                gnos_id = row.get('gnos_id')
-                if gnos_sample_ids_to_be_included and not gnos_id in gnos_sample_ids_to_be_included: continue
-                if gnos_sample_ids_to_be_excluded and gnos_id in gnos_sample_ids_to_be_excluded: continue
-                entry_type = row.get('entry_type')
-                if not get_mapping(entry_type) == w: continue
-                
-                gnos_xml_gz_file = os.path.join(gnos_xml_dir, 'analysis.'+gnos_id+'.GNOS.xml.gz')
-                if not os.path.exists(gnos_xml_gz_file):
-                    latest_xml_str = download_metadata_xml(gnos_id)
-                    latest_effective_xml_md5sum = effective_xml_md5sum(latest_xml_str)
-                    cached_xml_str = find_cached_metadata_xml(gnos_id)
-                    cached_effective_xml_md5sum = effective_xml_md5sum(cached_xml_str)
-                    if not latest_effective_xml_md5sum == cached_effective_xml_md5sum:
-                        click.echo('Warning: BSC gnos xml has different effective md5sum with the cached xml for gnos_id: %s' % gnos_id, err=True)
-                        continue
-                    
-                    # gnos_xml_gz_file = os.path.join(gnos_xml_dir, 'analysis.'+gnos_id+'.GNOS.xml.gz')
-                    with gzip.open(gnos_xml_gz_file, 'wb') as n:  n.write(cached_xml_str.encode('utf8'))
-                xml_gz_md5sum = get_md5(gnos_xml_gz_file, False)
-                gnos_xml = OrderedDict()
-                gnos_xml['filename'] = gnos_id+'/analysis.'+gnos_id+'.GNOS.xml.gz.gpg'
-                gnos_xml['checksum'] = annotations.get('xml_encrypted_checksum').get(gnos_xml['filename']) if annotations.get('xml_encrypted_checksum').get(gnos_xml['filename']) else None
-                gnos_xml['unencrypted_checksum'] = xml_gz_md5sum
-                gnos_xml_sheet.append(copy.deepcopy(gnos_xml))
+        failed = 0
+        for gnos_id, xml_gz_md5sum, error in pool.imap(stage_gnos_xml, tasks):
+            if error:
+                click.echo('Warning: %s' % error, err=True)
+                failed += 1
+                continue
+            gnos_xml = OrderedDict()
+            gnos_xml['filename'] = gnos_id+'/analysis.'+gnos_id+'.GNOS.xml.gz.gpg'
+            gnos_xml['checksum'] = annotations.get('xml_encrypted_checksum').get(gnos_xml['filename']) if annotations.get('xml_encrypted_checksum').get(gnos_xml['filename']) else None
+            gnos_xml['unencrypted_checksum'] = xml_gz_md5sum
+            gnos_xml_sheet.append(copy.deepcopy(gnos_xml))
+        if failed:
+            click.echo('Warning: {} of {} GNOS xmls not collected for workflow: {} of project: {}'.format(failed, len(tasks), get_mapping(w), project), err=True)
+
         if gnos_xml_sheet:
             out_dir = os.path.join(ega_dir, 'file_info', 'GNOS_xml_file_info')
             if not os.path.isdir(out_dir): os.makedirs(out_dir)  
             staged_files = os.path.join(out_dir, project+'.'+w+'.tsv')
             write_tsv_file(gnos_xml_sheet, staged_files)
 
+    pool.close()
+    pool.join()
+    attribute_index.close()
+
 
 def get_md5(fname, use_shell=None):
     if use_shell:
@@ -372,21 +396,6 @@ def generate_id_list(id_lists):
 
     return ids_list
 
-def get_donor_json(es, es_index, donor_unique_id):
-    es_query_donor = {
-        "query": {
-            "term": {
-                "donor_unique_id": donor_unique_id
-            }
-        }
-    }
-    response = es.search(index=es_index, body=es_query_donor)
-
-    es_json = response['hits']['hits'][0]['_source']
- 
-    return es_json
-
-
 def get_formal_vcf_name(vcf):
     vcf_map = {
       "sanger": "sanger_variant_calling",
@@ -401,7 +410,29 @@ def get_formal_vcf_name(vcf):
     return vcf_map.get(vcf)
 
 
-def generate_unstaged_files(donors_list, project, ega_dir, unstage_type, annotations, es, es_index, gnos_sample_ids_to_be_excluded, ftp, ftp_gnos_ids, file_info):
+def get_donor_jsons(es, es_index, donors_list):
+    # all donor docs of the project in a few queries, reused for every data type
+    donor_jsons = {}
+    donors_list = sorted(donors_list)
+    for i in range(0, len(donors_list), 100):
+        es_query_donors = {
+            "query": {
+                "terms": {
+                    "donor_unique_id": donors_list[i:i+100]
+                }
+            },
+            "size": 100
+        }
+        response = es.search(index=es_index, body=es_query_donors)
+        for hit in response['hits']['hits']:
+            donor_jsons[hit['_source']['donor_unique_id']] = hit['_source']
+
+    return donor_jsons
+
+
+def generate_unstaged_files(donors_list, project, ega_dir, unstage_type, annotations, es, es_index, gnos_sample_ids_to_be_excluded, ftp_listing, file_info):
+    donor_jsons = get_donor_jsons(es, es_index, donors_list)
+
     for dt in unstage_type:
         print('\nCheck the unstaging files for data_type: {} of project: {}'.format(dt, project))
         file_pattern = os.path.join(ega_dir, project, get_mapping(dt), 'analysis','analysis.*.receipt-*.xml')
@@ -409,13 +440,13 @@ def generate_unstaged_files(donors_list, project, ega_dir, unstage_type, annotat
 
         missing_files = set()
         for donor_unique_id in donors_list:
-            es_json = get_donor_json(es, es_index, donor_unique_id)
+            es_json = donor_jsons.get(donor_unique_id)
             if dt == 'bwa':
                 analysis = es_json.get('wgs').get('normal_specimen').get('bwa_alignment')
-                add_files(analysis, missing_files, annotations, gnos_sample_ids_to_be_excluded, ftp, ftp_gnos_ids, file_info)
+                add_files(analysis, missing_files, annotations, gnos_sample_ids_to_be_excluded, ftp_listing, file_info)
                 for aliquot in es_json.get('wgs').get('tumor_specimens'):        
                     analysis = aliquot.get('bwa_alignment')
-                    add_files(analysis, missing_files, annotations, gnos_sample_ids_to_be_excluded, ftp, ftp_gnos_ids, file_info)
+                    add_files(analysis, missing_files, annotations, gnos_sample_ids_to_be_excluded, ftp_listing, file_info)
 
             elif dt == 'rna_seq':
                 pass
@@ -424,8 +455,8 @@ def generate_unstaged_files(donors_list, project, ega_dir, unstage_type, annotat
                 for aliquot in es_json.get('wgs').get('tumor_specimens'):  
                     if not aliquot.get(get_formal_vcf_name(dt)):
                         break                 
-                    analysis = aliquot.get(get_formal_vcf_name(vcf))
-                    add_files(analysis, missing_files, annotations, gnos_sample_ids_to_be_excluded, ftp, ftp_gnos_ids, file_info)
+                    analysis = aliquot.get(get_formal_vcf_name(dt))
+                    add_files(analysis, missing_files, annotations, gnos_sample_ids_to_be_excluded, ftp_listing, file_info)
  
         out_dir = os.path.join(ega_dir, 'file_info', 'bulk_report_of_files_missed_on_ftp_server')
         if not os.path.isdir(out_dir): os.makedirs(out_dir)
@@ -433,43 +464,18 @@ def generate_unstaged_files(donors_list, project, ega_dir, unstage_type, annotat
         with open(out_file, 'w') as o: o.write('\n'.join(sorted(missing_files)))        
 
 
-def add_files(analysis, missing_files, annotations, gnos_sample_ids_to_be_excluded, ftp, ftp_gnos_ids, file_info):
+def add_files(analysis, missing_files, annotations, gnos_sample_ids_to_be_excluded, ftp_listing, file_info):
     if gnos_sample_ids_to_be_excluded and analysis.get('gnos_id') in gnos_sample_ids_to_be_excluded: return
+    filenames = [os.path.join(analysis.get('gnos_id'), 'analysis.'+analysis.get('gnos_id')+'.GNOS.xml.gz.gpg')]
+    filenames.extend([os.path.join(analysis.get('gnos_id'), f.get('file_name')+'.gpg') for f in analysis.get('files')])
     # check if ftp has the folder, if not then all the files are missing for this analysis_id
-    if ftp_gnos_ids and analysis.get('gnos_id') not in ftp_gnos_ids:
-        filename = os.path.join(analysis.get('gnos_id'), 'analysis.'+analysis.get('gnos_id')+'.GNOS.xml.gz.gpg')
-        missing_files.add(filename)
-        for f in analysis.get('files'):
-            filename = os.path.join(analysis.get('gnos_id'), f.get('file_name')+'.gpg')
-            missing_files.add(filename)
-            missing_file_info = [filename, '', f.get('file_md5sum')]
-            #with open(file_info, 'a+') as fh: fh.write('\t'.join(missing_file_info) + '\n')
-        return
-    # if ftp has the folder, check first if the files have the information in file_info, if not check if they exist in the ftp
-    filename = os.path.join(analysis.get('gnos_id'), 'analysis.'+analysis.get('gnos_id')+'.GNOS.xml.gz.gpg')
-    ftp_files = None
-    if not filename in annotations.get('ega'):
-        ftp_files = get_ftp_files(ftp, analysis.get('gnos_id'))
-        if not ftp_files: print('\nWarning: FTP did not response for analysis_id: {}'.format(analysis.get('gnos_id')))
-        if ftp_files and not filename in ftp_files: missing_files.add(filename)
-    for f in analysis.get('files'):
-        filename = os.path.join(analysis.get('gnos_id'), f.get('file_name')+'.gpg')
-        if not filename in annotations.get('ega'):
-            if not ftp_files: ftp_files = get_ftp_files(ftp, analysis.get('gnos_id'))
-            if not ftp_files: print('\nWarning: FTP did not response for analysis_id: {}'.format(analysis.get('gnos_id')))
-            if ftp_files and not filename in ftp_files: missing_files.add(filename)
-            missing_file_info = [filename, '', f.get('file_md5sum')]
-            #with open(file_info, 'a+') as fh: fh.write('\t'.join(missing_file_info) + '\n')
+    if ftp_listing.dirs and not ftp_listing.has_dir(analysis.get('gnos_id')):
+        missing_files.update(filenames)
+        return missing_files
+    # if ftp has the folder, the files without information in file_info have to exist in the ftp
+    missing_files.update(ftp_listing.missing([f for f in filenames if not f in annotations.get('ega')]))
     return missing_files
 
-def get_ftp_files(ftp, gnos_id):
-    try:
-        ftp_files = set(ftp.nlst(gnos_id))
-    except:
-        return
-
-    return ftp_files
-
 
 def main(argv=None):
 
@@ -498,6 +504,8 @@ def main(argv=None):
              help="List sequence_type types[wgs, rna-seq]", required=False)
     parser.add_argument("-w", "--workflow", dest="workflow", nargs="*",
              help="List workflow types[bwa, sanger, dkfz, broad, muse, tophat2, star]", required=False)    
+    parser.add_argument("-l", "--refresh_ftp_listing", dest="refresh_ftp_listing", action="store_true",
+             help="List the ftp server again instead of using the recent listing snapshot", required=False)
 
 
 
@@ -524,6 +532,7 @@ def main(argv=None):
     unstage_type = args.unstage_type
     seq = args.seq
     workflow = args.workflow
+    refresh_ftp_listing = args.refresh_ftp_listing
 
     unstage_type = list(unstage_type) if unstage_type else []
     seq= list(seq) if seq else [] 
@@ -570,16 +579,18 @@ def main(argv=None):
     pcawg_gnos_id_sheet = '../pcawg-operations/data_releases/mar2016/release_mar2016_entry.tsv'
     file_info = ega_dir+'/file_info/file_info_missing.tsv'
 
+    if unstage_type:
+        # list the ftp staging area once for all projects, or reuse the recent snapshot
+        ftp_listing = FtpListing(lambda: ftplib.FTP('ftp.ega.ebi.ac.uk', 'ega-box-520', ega_box_token),
+                                 ega_dir+'/file_info/ftp_listing_snapshot.json', logger=logger)
+        ftp_listing.load(refresh=refresh_ftp_listing)
 
     for project in dcc_project_code:
         donors_list = get_donors_list(es, es_index, project)
         donors_list.difference_update(donor_id_to_be_excluded)
 
         if unstage_type:
-            # connect with the ftp
-            ftp=ftplib.FTP('ftp.ega.ebi.ac.uk', 'ega-box-520', ega_box_token)
-            ftp_gnos_ids = set(ftp.nlst())
-            generate_unstaged_files(donors_list, project, ega_dir, unstage_type, annotations, es, es_index, gnos_sample_ids_to_be_excluded, ftp, ftp_gnos_ids, file_info) 
+            generate_unstaged_files(donors_list, project, ega_dir, unstage_type, annotations, es, es_index, gnos_sample_ids_to_be_excluded, ftp_listing, file_info) 
 
         if seq:
             file_pattern = os.path.join(ega_dir, project, 'sample', 'sample.'+project+'.*.tsv')
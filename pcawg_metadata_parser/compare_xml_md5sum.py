@@ -22,6 +22,7 @@ import shutil
 from operator import itemgetter
 import csv
 from collections import OrderedDict
+from gnos_repo_registry import get_formal_repo_name
 
 
 def download_metadata_xml(gnos_repo, ao_uuid):
@@ -52,28 +53,6 @@ def find_cached_metadata_xml(metadata_dir, gnos_repo, gnos_id):
     return metadata_xml_str
 
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
-
-    return repo_url_to_repo.get(repo)
-
 def get_analysis_attrib(gnos_analysis):
     analysis_attrib = {}
     if (not gnos_analysis['analysis_xml']['ANALYSIS_SET'].get('ANALYSIS')
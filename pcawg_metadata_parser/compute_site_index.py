@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+# Inverted index over the compute site whitelists kept in pcawg-operations:
+# donor => [compute sites], built once when the whitelists are loaded. Donors
+# whitelisted at more than one site are detected at the same time and kept
+# as a report instead of being re-checked for every specimen.
+
+
+class ComputeSiteIndex(object):
+
+    def __init__(self, compute_sites):
+        # compute_sites: site => set of donors in whitelist format, ie, 'dcc_project_code\tsubmitter_donor_id'
+        self.sites = list(compute_sites)
+        self._donor_sites = {}
+        for c in self.sites:
+            for d in compute_sites.get(c):
+                self._donor_sites.setdefault(d, []).append(c)
+
+        self.overlaps = []
+        overlap_donors = {}
+        for d, sites in self._donor_sites.items():
+            if len(sites) < 2: continue
+            for i in range(len(sites)):
+                for j in range(i+1, len(sites)):
+                    overlap_donors.setdefault((sites[i], sites[j]), []).append(d)
+        for c in self.sites:
+            for d in self.sites:
+                if not (c, d) in overlap_donors: continue
+                self.overlaps.append({
+                    'compute_sites': [c, d],
+                    'donors': sorted(overlap_donors.get((c, d)))
+                })
+
+    def get_compute_sites(self, donor_unique_id):
+        return list(self._donor_sites.get(donor_unique_id.replace('::', '\t'), []))
+
+    def get_compute_site(self, donor_unique_id):
+        sites = self._donor_sites.get(donor_unique_id.replace('::', '\t'))
+        return sites[0] if sites else None
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+# Per donor reorganized json, packed into one uncompressed zip per project
+# (reports/donors/<dcc_project_code>.zip, entry <submitter_donor_id>.json)
+# instead of one small file per donor. The zip central directory is the
+# offset index, so a single donor is read without scanning the archive, eg:
+#   ./donor_archive.py -m gnos_metadata/2016-05-20_02-00-01_UTC -d BRCA-UK::CGP_donor_1186997
+
+import sys
+import os
+import json
+import zipfile
+from argparse import ArgumentParser
+from argparse import RawDescriptionHelpFormatter
+
+
+def get_archive_file(report_dir, project_code):
+    return os.path.join(report_dir, 'donors', project_code + '.zip')
+
+
+class DonorArchiveWriter(object):
+
+    def __init__(self, report_dir):
+        self.report_dir = report_dir
+        self.archives = {}
+
+    def write(self, donor_unique_id, reorganized_donor):
+        (project_code, donor_id) = donor_unique_id.split('::')
+
+        if not project_code in self.archives:
+            archive_file = get_archive_file(self.report_dir, project_code)
+            if not os.path.exists(os.path.dirname(archive_file)): os.makedirs(os.path.dirname(archive_file))
+            # written under a temp name, the complete archive replaces the old one on close
+            self.archives[project_code] = zipfile.ZipFile(archive_file + '.tmp', 'w', zipfile.ZIP_STORED, allowZip64=True)
+
+        self.archives[project_code].writestr(donor_id + '.json', json.dumps(reorganized_donor, indent=4, sort_keys=True))
+
+    def close(self):
+        for project_code, archive in self.archives.iteritems():
+            archive.close()
+            archive_file = get_archive_file(self.report_dir, project_code)
+            os.rename(archive_file + '.tmp', archive_file)
+        self.archives = {}
+
+
+def read_donor_json(report_dir, donor_unique_id):
+    (project_code, donor_id) = donor_unique_id.split('::')
+
+    archive_file = get_archive_file(report_dir, project_code)
+    if not os.path.isfile(archive_file): return None
+
+    with zipfile.ZipFile(archive_file, 'r') as archive:
+        try:
+            return archive.read(donor_id + '.json')
+        except KeyError:
+            return None
+
+
+def main(argv=None):
+
+    parser = ArgumentParser(description="Get the reorganized json of a donor from the per project donor archives",
+             formatter_class=RawDescriptionHelpFormatter)
+    parser.add_argument("-m", "--metadata_dir", dest="metadata_dir",
+             help="Directory containing metadata manifest files", required=True)
+    parser.add_argument("-d", "--donor_unique_id", dest="donor_unique_id",
+             help="Donor unique id, eg, BRCA-UK::CGP_donor_1186997", required=True)
+
+    args = parser.parse_args()
+
+    donor_json = read_donor_json(args.metadata_dir + '/reports/', args.donor_unique_id)
+    if donor_json is None:
+        sys.exit('Error: donor {} not found in {}'.format(args.donor_unique_id, args.metadata_dir))
+
+    print(donor_json)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# Streaming bulk loader for JSONL files into Elasticsearch. The jsonl lines
+# are sent as they are in the _bulk NDJSON body (only the doc id is read out
+# of each line), with several bulk requests in flight. A reload can go into a
+# fresh index which is then swapped in atomically behind an alias, so readers
+# of the alias never see an empty or partially loaded index.
+
+import json
+import time
+import logging
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+
+logger = logging.getLogger('es bulk loader')
+
+
+def bulk_chunks(lines, id_field, chunk_size):
+    # id_field: name of the doc field holding the id, or a function returning the id of a doc
+    get_id = id_field if callable(id_field) else lambda doc: doc[id_field]
+    chunk = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line: continue
+        chunk.append('{"index":{"_id":' + json.dumps(get_id(json.loads(line))) + '}}')
+        chunk.append(line)
+        if len(chunk) >= 2 * chunk_size:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk: yield '\n'.join(chunk) + '\n'
+
+
+def bulk_load(es, es_index, doc_type, lines, id_field, chunk_size=1000, workers=4):
+    def send(body):
+        response = es.bulk(body=body, index=es_index, doc_type=doc_type, timeout='90s')
+        failed = [item.get('index') for item in response.get('items') if item.get('index', {}).get('status', 200) >= 300] \
+                    if response.get('errors') else []
+        return len(response.get('items')), failed
+
+    results = [0, []]
+    def collect(pending_result):
+        count, failed = pending_result.get()
+        results[0] += count
+        results[1].extend(failed)
+
+    # at most 'workers' bulk requests in flight, the jsonl is never held in memory as a whole
+    pending = deque()
+    pool = ThreadPool(workers)
+    try:
+        for body in bulk_chunks(lines, id_field, chunk_size):
+            if len(pending) >= workers: collect(pending.popleft())
+            pending.append(pool.apply_async(send, (body, )))
+        while pending: collect(pending.popleft())
+    finally:
+        pool.close()
+        pool.join()
+
+    doc_count, failed_docs = results
+
+    for f in failed_docs:
+        logger.warning('failed to index doc: {} into {}, error: {}'.format(f.get('_id'), es_index, f.get('error')))
+
+    es.indices.refresh(index=es_index)
+    return doc_count - len(failed_docs)
+
+
+def load_into_alias(es, alias, doc_type, mapping_file, lines, id_field, chunk_size=1000, workers=4):
+    es_index = alias + '_' + time.strftime('%y%m%d%H%M%S')
+    es.indices.create(es_index)
+    with open(mapping_file, 'r') as m:
+        es.indices.put_mapping(index=es_index, doc_type=doc_type, body=m.read())
+
+    doc_count = bulk_load(es, es_index, doc_type, lines, id_field, chunk_size, workers)
+
+    old_indices = list(es.indices.get_alias(name=alias).keys()) if es.indices.exists_alias(name=alias) else []
+    if not old_indices and es.indices.exists(index=alias):
+        # one time migration from a plain index named as the alias, which has to go before the alias can be added
+        es.indices.delete(index=alias)
+
+    actions = [{'remove': {'index': i, 'alias': alias}} for i in old_indices]
+    actions.append({'add': {'index': es_index, 'alias': alias}})
+    es.indices.update_aliases(body={'actions': actions})
+
+    for i in old_indices:
+        if i != es_index: es.indices.delete(index=i)
+
+    logger.info('loaded {} docs into {}, now behind alias {}'.format(doc_count, es_index, alias))
+    return es_index
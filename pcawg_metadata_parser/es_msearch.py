@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+
+# Sends the search bodies of a report to one index as _msearch requests,
+# batch_size bodies per round trip, instead of one es.search per body.
+# Responses are yielded in the order of the bodies, and a failed search
+# raises the same way es.search does. Terms aggregations with cut off
+# buckets are searched again with larger sizes, see es_paging.
+
+from elasticsearch1.exceptions import TransportError
+from es_paging import complete_aggregations
+
+
+def msearch(es, es_index, bodies, batch_size=50):
+    bodies = list(bodies)
+    for i in range(0, len(bodies), batch_size):
+        request = []
+        for body in bodies[i:i+batch_size]:
+            request.extend([{'index': es_index}, body])
+
+        for body, response in zip(bodies[i:i+batch_size], es.msearch(body=request).get('responses')):
+            if response.get('error'):
+                raise TransportError(response.get('status', 500), response.get('error'))
+            yield complete_aggregations(es, es_index, body, response)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# Complete results from ES without the fixed "size": 10000 ceilings. Hit lists
+# are read through a scroll, page_size hits per shard per round trip, so the
+# size of the list no longer matters. Terms aggregations have no paging in
+# ES 1.x, instead every terms aggregation that reports documents left out of
+# its buckets (sum_other_doc_count) has its size raised and the search is run
+# again, until no bucket list is cut off.
+
+import copy
+import logging
+from elasticsearch1.helpers import scan
+
+
+logger = logging.getLogger('es paging')
+
+
+def scan_hits(es, es_index, body, page_size=500):
+    body = copy.deepcopy(body)
+    body.pop('size', None)  # the page size is set by the scroll
+    # only the hits are read, aggregations of a scroll are not
+    body.pop('aggs', None)
+    body.pop('aggregations', None)
+    # the scan search type ignores the sort, a sorted body is scrolled in order
+    return scan(es, query=body, index=es_index, size=page_size, scroll='5m', preserve_order='sort' in body)
+
+
+def _truncated_terms(body_aggs, response_aggs, truncated):
+    for name, agg in body_aggs.iteritems():
+        result = response_aggs.get(name)
+        if not isinstance(result, dict): continue
+
+        if agg.get('terms') and result.get('sum_other_doc_count'):
+            truncated[id(agg.get('terms'))] = agg.get('terms')
+
+        sub_aggs = agg.get('aggs') or agg.get('aggregations')
+        if not sub_aggs: continue
+        buckets = result.get('buckets')
+        if isinstance(buckets, dict): buckets = buckets.values()  # keyed buckets
+        # single bucket aggregations (filter, nested) hold the sub aggregations directly
+        for bucket in (buckets if buckets is not None else [result]):
+            _truncated_terms(sub_aggs, bucket, truncated)
+
+    return truncated
+
+
+def complete_aggregations(es, es_index, body, response, max_rounds=8):
+    # response: of the search with body, searched again with larger terms sizes as long as buckets are cut off
+    body = copy.deepcopy(body)
+    for i in range(max_rounds):
+        truncated = _truncated_terms(body.get('aggs') or body.get('aggregations') or {}, response.get('aggregations') or {}, {})
+        if not truncated: return response
+
+        for terms in truncated.values():
+            terms['size'] = max(terms.get('size') or 10, 10) * 4
+        logger.info('terms aggregation buckets cut off, searching again with sizes: {}'.format([t.get('size') for t in truncated.values()]))
+        response = es.search(index=es_index, body=body)
+
+    raise Exception('terms aggregation buckets still cut off after {} rounds'.format(max_rounds))
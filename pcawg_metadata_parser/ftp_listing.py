@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+# Local snapshot of the file listing of an FTP staging area. The whole area is
+# listed recursively in one go (MLSD when the server supports it, NLST per
+# directory otherwise) and kept as a set of paths, persisted as a json
+# snapshot that is reused until it gets too old or a refresh is asked for.
+# Checking which files are missing on the server is then a set difference
+# instead of a listing round trip per analysis.
+
+import os
+import json
+import time
+import ftplib
+import logging
+
+
+class FtpListing(object):
+
+    def __init__(self, connect, snapshot_file=None, max_age=12*3600, logger=None):
+        # connect: function returning a logged in ftplib.FTP, only called when the server has to be listed
+        self.logger = logger or logging.getLogger('ftp listing')
+        self.connect = connect
+        self.snapshot_file = snapshot_file
+        self.max_age = max_age
+        self.timestamp = None
+        self.dirs = set()
+        self.files = set()
+
+    def load(self, refresh=False):
+        if not refresh and self._load_snapshot(): return self
+        self.refresh()
+        return self
+
+    def _load_snapshot(self):
+        if not self.snapshot_file or not os.path.isfile(self.snapshot_file): return False
+        with open(self.snapshot_file, 'r') as f: snapshot = json.load(f)
+        if time.time() - snapshot.get('timestamp', 0) > self.max_age: return False
+
+        self.timestamp = snapshot.get('timestamp')
+        self.dirs = set(snapshot.get('dirs'))
+        self.files = set(snapshot.get('files'))
+        self.logger.info('loaded ftp listing snapshot of {} files from: {}'.format(len(self.files), self.snapshot_file))
+        return True
+
+    def _save_snapshot(self):
+        if not self.snapshot_file: return
+        if os.path.dirname(self.snapshot_file) and not os.path.isdir(os.path.dirname(self.snapshot_file)):
+            os.makedirs(os.path.dirname(self.snapshot_file))
+        with open(self.snapshot_file + '.tmp', 'w') as f:
+            json.dump({'timestamp': self.timestamp, 'dirs': sorted(self.dirs), 'files': sorted(self.files)}, f)
+        os.rename(self.snapshot_file + '.tmp', self.snapshot_file)
+
+    def refresh(self):
+        ftp = self.connect()
+        try:
+            self.timestamp = time.time()
+            self.dirs = set()
+            self.files = set()
+            try:
+                self._list_mlsd(ftp, '')
+            except ftplib.error_perm:
+                # no MLSD support, top level entries are the analysis directories
+                self.dirs = set()
+                self.files = set()
+                self._list_nlst(ftp)
+        finally:
+            try:
+                ftp.quit()
+            except:
+                pass
+
+        self.logger.info('listed {} files in {} directories on the ftp server'.format(len(self.files), len(self.dirs)))
+        self._save_snapshot()
+        return self
+
+    def _list_mlsd(self, ftp, path):
+        entries = []
+        ftp.retrlines('MLSD' + (' ' + path if path else ''), entries.append)
+        for entry in entries:
+            facts, name = entry.split(' ', 1)
+            facts = dict(f.split('=', 1) for f in facts.rstrip(';').split(';') if '=' in f)
+            entry_type = facts.get('type', '').lower()
+            if entry_type in ('cdir', 'pdir') or name in ('.', '..'): continue
+
+            name = os.path.join(path, name) if path else name
+            if entry_type == 'dir':
+                self.dirs.add(name)
+                self._list_mlsd(ftp, name)
+            else:
+                self.files.add(name)
+
+    def _list_nlst(self, ftp):
+        for d in ftp.nlst():
+            self.dirs.add(d)
+            try:
+                names = ftp.nlst(d)
+            except ftplib.error_perm:
+                continue
+            if names == [d]:  # a plain file
+                self.dirs.discard(d)
+                self.files.add(d)
+                continue
+            # servers answer with or without the directory prefix
+            self.files.update(n if n.startswith(d + '/') else os.path.join(d, n) for n in names)
+
+    def has_dir(self, name):
+        return name in self.dirs
+
+    def missing(self, paths):
+        return set(paths) - self.files
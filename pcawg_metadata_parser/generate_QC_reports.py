@@ -12,6 +12,7 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from collections import OrderedDict
 import datetime
 import dateutil.parser
@@ -20,6 +21,7 @@ from distutils.version import LooseVersion
 import csv
 import shutil
 from operator import itemgetter
+from report_writer import TsvWriter, ExternalSorter
 
 es_queries = [
 # query 0: PCAWGDATA-45_Sanger GNOS entries with study field ends with _test
@@ -1001,10 +1003,10 @@ def get_donor_json(es, es_index, donor_unique_id):
 
 
 def get_donors_list(es, es_index, es_queries, q_index):
-    response = es.search(index=es_index, body=es_queries[q_index].get('content'))
+    hits = scan_hits(es, es_index, es_queries[q_index].get('content'))
     
     donors_list = []
-    for p in response['hits']['hits']:
+    for p in hits:
       donors_list.append(p.get('fields').get('donor_unique_id')[0])
 
     return donors_list 
@@ -1552,22 +1554,27 @@ def main(argv=None):
     annotations = read_annotations(annotations, 'gender_update', '../pcawg-operations/lists/donor.gender_update.release21.tsv')
 
     for q in q_index:
-        report_tsv_fh = open(report_dir + '/' + es_queries[q].get('name') + '.txt', 'w')  
-
         # get the list of donors
         donors_list = get_donors_list(es, es_index, es_queries, q)
 
-        report_info_list_full = []
+        # do diff for santa_cruz missing only
+        is_release_diff = q in [4, 10, 13, 16, 20]
+
+        report_info_sorter = ExternalSorter(key=itemgetter('donor_unique_id'))
+        gnos_id_set = set()
         for donor_unique_id in donors_list:
             # get json doc for each donor                 
             es_json = get_donor_json(es, es_index, donor_unique_id)
             
             report_info_list_donor = create_report_info(donor_unique_id, es_json, q, annotations)
 
-            report_info_list_full.extend(report_info_list_donor)
+            if is_release_diff:
+                # generate the set of gnos_id
+                gnos_id_set.update([l.get('gnos_id') for l in report_info_list_donor])
+            else:
+                report_info_sorter.extend(report_info_list_donor)
 
-        # do diff for santa_cruz missing only
-        if q in [4, 10, 13, 16, 20]:
+        if is_release_diff:
             if q==4:
                 release_tsv = '../pcawg-operations/data_releases/santa_cruz/santa_cruz_freeze_entry.tsv' 
             elif q==10:
@@ -1580,9 +1587,6 @@ def main(argv=None):
                 release_tsv = '../pcawg-operations/data_releases/may2016/release_may2016_entry.tsv'
             else:
                 print('No entry for this query!')
-            # generate the set of gnos_id
-            gnos_id_set = set([l.get('gnos_id') for l in report_info_list_full])
-            report_info_list_full = []
             # read bench mark santa_cruz list, hardcode the location of santa_cruz_freeze_json
             with open(release_tsv, 'r') as s:
                 reader = csv.DictReader(s, delimiter='\t')
@@ -1591,29 +1595,10 @@ def main(argv=None):
                         row_order = OrderedDict()
                         for fn in reader.fieldnames:
                             row_order[fn.strip('#')] = row.get(fn)
-                        report_info_list_full.append(row_order)
-
-        report_info_list_full.sort(key=itemgetter('donor_unique_id'))
-
-        header = True  
-        for r in report_info_list_full:
-            if header:
-                report_tsv_fh.write('\t'.join(r.keys()) + '\n')
-                header = False 
-            # make the list of output from dict
-            line = []
-            for p in r.keys():
-                if isinstance(r.get(p), list):
-                    line.append('|'.join(r.get(p)))
-                elif isinstance(r.get(p), set):
-                    line.append('|'.join(list(r.get(p))))
-                elif r.get(p) is None:
-                    line.append('')
-                else:
-                    line.append(str(r.get(p)))
-            report_tsv_fh.write('\t'.join(line) + '\n') 
-        
-        report_tsv_fh.close()            
+                        report_info_sorter.add(row_order)
+
+        with TsvWriter(report_dir + '/' + es_queries[q].get('name') + '.txt') as report_tsv:
+            report_tsv.writerows(report_info_sorter)
 
 
     return 0
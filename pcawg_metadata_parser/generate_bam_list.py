@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 
 
 ES_QUERY = {
@@ -61,7 +62,7 @@ ES_QUERY = {
 
 es = Elasticsearch(['localhost:9200'])
 
-response = es.search(index='pcawg_summary', body=ES_QUERY)
+hits = scan_hits(es, 'pcawg_summary', ES_QUERY)
 
 header = [
           "project_code",
@@ -76,7 +77,7 @@ header = [
 
 print('\t'.join(header))
 
-for hit in response['hits']['hits']:
+for hit in hits:
     fields = hit['fields']
 
     project_code = fields["dcc_project_code"]
@@ -1,35 +1,35 @@
 #!/usr/bin/env python
 
+# Exports the reorganized donor json of all donors, bwa aligned donors, sanger
+# variant called donors and the UCSC pilot donors in one pass: every donor doc
+# is fetched and reorganized once, then written to each export whose
+# selection it matches (same selections as the former generate_all_donors,
+# generate_aligned_donors, generate_variant_called_donors and
+# generate_ucsc_pilot_donors_json scripts).
 
 import sys
 import os
 import re
-import glob
-import xmltodict
 import json
-import yaml
-import copy
 import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from collections import OrderedDict
 import datetime
-import dateutil.parser
-from itertools import izip
-from distutils.version import LooseVersion
-
-
+from donor_archive import DonorArchiveWriter
 
 
 es_queries = [
-  # query 0: donors_sanger_vcf_without_missing_bams 
+  # query 0: all donors
     {
-     "fields": "donor_unique_id", 
+     "fields": "donor_unique_id",
       "size": 10000
     }
 ]
 
+
 def create_reorganized_donor(donor_unique_id, es_json):
     reorganized_donor = {
         'donor_unique_id': donor_unique_id,
@@ -65,7 +65,7 @@ def create_reorganized_donor(donor_unique_id, es_json):
                 {
                     'bam_file_name': es_json.get('normal_alignment_status').get('aligned_bam').get('bam_file_name'),
                     'bam_file_md5sum': es_json.get('normal_alignment_status').get('aligned_bam').get('bam_file_md5sum'),
-                    'bam_file_size': es_json.get('normal_alignment_status').get('aligned_bam').get('bam_file_size')                        
+                    'bam_file_size': es_json.get('normal_alignment_status').get('aligned_bam').get('bam_file_size')
                 }
             ]
         }
@@ -88,12 +88,12 @@ def add_wgs_tumor_specimens(reorganized_donor, es_json):
     aliquot_info = {}
     for aliquot in wgs_tumor_alignment_info:
         tumor_wgs_specimen_count += 1
-    	aliquot_id = aliquot.get('aliquot_id')
+        aliquot_id = aliquot.get('aliquot_id')
 
-    	aliquot_info = {
-    	    'bwa_alignment':{ },
-    	    'sanger_variant_calling':{ }
-    	}
+        aliquot_info = {
+            'bwa_alignment':{ },
+            'sanger_variant_calling':{ }
+        }
 
         if aliquot.get('aligned_bam'):
             aliquot_info['bwa_alignment'] = {
@@ -125,13 +125,13 @@ def add_wgs_tumor_specimens(reorganized_donor, es_json):
                 'gnos_repo': wgs_tumor_sanger_vcf_info.get('gnos_repo'),
                 'gnos_id': wgs_tumor_sanger_vcf_info.get('gnos_id'),
                 'gnos_last_modified': wgs_tumor_sanger_vcf_info.get('gnos_last_modified')[-1],
-                'files':[]            
+                'files':[]
             }
             for f in sanger_vcf_files:
                 if aliquot_id in f.get('file_name'):
                     aliquot_info.get('sanger_variant_calling').get('files').append(f)
-        
-        reorganized_donor.get('wgs').get('tumor_specimens').append(aliquot_info) 
+
+        reorganized_donor.get('wgs').get('tumor_specimens').append(aliquot_info)
 
     reorganized_donor['tumor_wgs_specimen_count'] = tumor_wgs_specimen_count
 
@@ -155,7 +155,7 @@ def add_rna_seq_info(reorganized_donor, es_json):
     rna_seq_info = es_json.get('rna_seq').get('alignment')
     for specimen_type in rna_seq_info.keys():
         if not rna_seq_info.get(specimen_type): # the specimen_type has no alignment result
-		    continue
+            continue
         if 'normal' in specimen_type:
             aliquot = rna_seq_info.get(specimen_type)
             alignment_info = {}
@@ -172,7 +172,7 @@ def add_rna_seq_info(reorganized_donor, es_json):
                         {
                             'bam_file_name': aliquot.get(workflow_type).get('aligned_bam').get('bam_file_name'),
                             'bam_file_md5sum': aliquot.get(workflow_type).get('aligned_bam').get('bam_file_md5sum'),
-                            'bam_file_size': aliquot.get(workflow_type).get('aligned_bam').get('bam_file_size')                           
+                            'bam_file_size': aliquot.get(workflow_type).get('aligned_bam').get('bam_file_size')
                         }
                     ]
                 }
@@ -182,61 +182,69 @@ def add_rna_seq_info(reorganized_donor, es_json):
                 alignment_info = {}
                 for workflow_type in aliquot.keys():
                     alignment_info[workflow_type] = {
-			    	    'submitter_specimen_id': aliquot.get(workflow_type).get('submitter_specimen_id'),
-			    	    'submitter_sample_id': aliquot.get(workflow_type).get('submitter_sample_id'),
+                        'submitter_specimen_id': aliquot.get(workflow_type).get('submitter_specimen_id'),
+                        'submitter_sample_id': aliquot.get(workflow_type).get('submitter_sample_id'),
                         'specimen_type': aliquot.get(workflow_type).get('dcc_specimen_type'),
-			    	    'aliquot_id': aliquot.get(workflow_type).get('aliquot_id'),
-			    	    'gnos_repo': aliquot.get(workflow_type).get('aligned_bam').get('gnos_repo'),
-			    	    'gnos_id': aliquot.get(workflow_type).get('aligned_bam').get('gnos_id'),
+                        'aliquot_id': aliquot.get(workflow_type).get('aliquot_id'),
+                        'gnos_repo': aliquot.get(workflow_type).get('aligned_bam').get('gnos_repo'),
+                        'gnos_id': aliquot.get(workflow_type).get('aligned_bam').get('gnos_id'),
                         'gnos_last_modified': aliquot.get(workflow_type).get('aligned_bam').get('gnos_last_modified')[-1],
-			    	    'files': [
-			    	        {
+                        'files': [
+                            {
                                 'bam_file_name': aliquot.get(workflow_type).get('aligned_bam').get('bam_file_name'),
                                 'bam_file_md5sum': aliquot.get(workflow_type).get('aligned_bam').get('bam_file_md5sum'),
-                                'bam_file_size': aliquot.get(workflow_type).get('aligned_bam').get('bam_file_size')			    	        
-			                }
-			    	    ]
-			    	}
-
-                reorganized_donor.get('rna_seq')[specimen_type + '_specimens'].append(alignment_info) 
-
-
-def get_donor_json(es, es_index, donor_unique_id):
-    es_query_donor = {
-        "query": {
-            "term": {
-                "donor_unique_id": donor_unique_id
-            }
-        }
-    }
-    response = es.search(index=es_index, body=es_query_donor)
+                                'bam_file_size': aliquot.get(workflow_type).get('aligned_bam').get('bam_file_size')
+                            }
+                        ]
+                    }
 
-    es_json = response['hits']['hits'][0]['_source']
- 
-    return es_json
+                reorganized_donor.get('rna_seq')[specimen_type + '_specimens'].append(alignment_info)
 
 
 def get_donors_list(es, es_index, es_queries):
     q_index = 0
-    response = es.search(index=es_index, body=es_queries[q_index])
-    
+    hits = scan_hits(es, es_index, es_queries[q_index])
+
     donors_list = []
-    for p in response['hits']['hits']:
-    	donors_list.append(p.get('fields').get('donor_unique_id')[0])
+    for p in hits:
+        donors_list.append(p.get('fields').get('donor_unique_id')[0])
 
-    return donors_list 
+    return donors_list
 
-def init_es(es_host, es_index):
-    es = Elasticsearch([ es_host ])
 
-    es.indices.create( es_index, ignore=400 )
+def get_donor_jsons(es, es_index, donors_list, batch_size=100):
+    # donor docs in the order of donors_list, fetched batch_size at a time
+    for i in range(0, len(donors_list), batch_size):
+        batch = donors_list[i:i+batch_size]
+        es_query_donors = {
+            "query": {
+                "terms": {
+                    "donor_unique_id": batch
+                }
+            },
+            "size": batch_size
+        }
+        response = es.search(index=es_index, body=es_query_donors)
+        es_jsons = dict((h['_source']['donor_unique_id'], h['_source']) for h in response['hits']['hits'])
+        for donor_unique_id in batch:
+            if es_jsons.get(donor_unique_id): yield donor_unique_id, es_jsons.get(donor_unique_id)
+
 
-    # create mappings
-    es_mapping = open('pancan.reorganized.donor.mapping.json')
-    es.indices.put_mapping(index=es_index, doc_type='donor', body=es_mapping.read())
-    es_mapping.close()
+def is_aligned_donor(es_json):
+    flags = es_json.get('flags')
+    return (flags.get('is_normal_specimen_aligned') is True or flags.get('are_all_tumor_specimens_aligned') is True) \
+        and not flags.get('is_manual_qc_failed') is True
 
-    return es
+
+def is_sanger_variant_called_donor(es_json):
+    # sanger called, on the complete alignment set, with none of the bams used by sanger missing
+    flags = es_json.get('flags')
+    sanger_vcf = (es_json.get('variant_calling_results') or {}).get('sanger_variant_calling') or {}
+    return flags.get('is_sanger_variant_calling_performed') is True \
+        and sanger_vcf.get('is_bam_used_by_sanger_missing') is False \
+        and flags.get('is_normal_specimen_aligned') is True \
+        and flags.get('are_all_tumor_specimens_aligned') is True \
+        and not flags.get('is_manual_qc_failed') is True
 
 
 def set_default(obj):
@@ -246,13 +254,14 @@ def set_default(obj):
         return list(obj)
     raise TypeError
 
+
 def generate_json_for_tsv_file(reorganized_donor):
     pilot_tsv_json = OrderedDict()
     pilot_tsv_json['dcc_project_code'] = reorganized_donor.get('dcc_project_code')
     pilot_tsv_json['submitter_donor_id'] = reorganized_donor.get('submitter_donor_id')
     pilot_tsv_json['data_train'] = reorganized_donor.get('data_train')
     pilot_tsv_json['train2_pilot'] = reorganized_donor.get('train2_pilot')
-    # wgs normal specimen 
+    # wgs normal specimen
     pilot_tsv_json['normal_wgs_submitter_specimen_id'] = reorganized_donor.get('wgs').get('normal_specimen').get('bwa_alignment').get('submitter_specimen_id')
     pilot_tsv_json['normal_wgs_submitter_sample_id'] = reorganized_donor.get('wgs').get('normal_specimen').get('bwa_alignment').get('submitter_sample_id')
     pilot_tsv_json['normal_wgs_aliquot_id'] = reorganized_donor.get('wgs').get('normal_specimen').get('bwa_alignment').get('aliquot_id')
@@ -262,7 +271,7 @@ def generate_json_for_tsv_file(reorganized_donor):
     # wgs tumor specimen
     wgs_tumor_speciments = reorganized_donor.get('wgs').get('tumor_specimens')
     pilot_tsv_json['tumor_wgs_specimen_count'] = reorganized_donor.get('tumor_wgs_specimen_count')
-    pilot_tsv_json['tumor_wgs_submitter_specimen_id'] = [] 
+    pilot_tsv_json['tumor_wgs_submitter_specimen_id'] = []
     pilot_tsv_json['tumor_wgs_submitter_sample_id'] = []
     pilot_tsv_json['tumor_wgs_aliquot_id'] = []
     pilot_tsv_json['tumor_wgs_alignment_gnos_repo'] = []
@@ -282,7 +291,7 @@ def generate_json_for_tsv_file(reorganized_donor):
         # wgs tumor sanger vcf
         pilot_tsv_json['sanger_variant_calling_repo'].append(specimen.get('sanger_variant_calling').get('gnos_repo'))
         pilot_tsv_json['sanger_variant_calling_file_name_prefix'].append(specimen.get('sanger_variant_calling').get('aliquot_id'))
-    
+
     # rna_seq normal specimen
     pilot_tsv_json['normal_rna_seq_submitter_specimen_id'] = None
     pilot_tsv_json['normal_rna_seq_submitter_sample_id'] = None
@@ -309,7 +318,7 @@ def generate_json_for_tsv_file(reorganized_donor):
         pilot_tsv_json['normal_rna_seq_STAR_alignment_gnos_repo'] = rna_seq_normal.get('star').get('gnos_repo')
         pilot_tsv_json['normal_rna_seq_STAR_alignment_gnos_id'] = rna_seq_normal.get('star').get('gnos_id')
         pilot_tsv_json['normal_rna_seq_STAR_alignment_bam_file_name'] = rna_seq_normal.get('star').get('files')[0].get('bam_file_name')
-       
+
     # rna_seq tumor specimens
     pilot_tsv_json['tumor_rna_seq_submitter_specimen_id'] = []
     pilot_tsv_json['tumor_rna_seq_submitter_sample_id'] = []
@@ -347,19 +356,51 @@ def generate_json_for_tsv_file(reorganized_donor):
         pilot_tsv_json['tumor_rna_seq_submitter_specimen_id'] = rna_seq_tumor_specimen_id
         pilot_tsv_json['tumor_rna_seq_submitter_sample_id'] = rna_seq_tumor_sample_id
         pilot_tsv_json['tumor_rna_seq_aliquot_id'] = rna_seq_tumor_aliquot_id
-    
+
     return pilot_tsv_json
 
 
-def write_individule_json(report_dir, donor_unique_id, reorganized_donor):
-    (project_code, donor_id) = donor_unique_id.split('::')
+def format_pilot_tsv_line(pilot_tsv_json):
+    line = []
+    for p in pilot_tsv_json.keys():
+        v = pilot_tsv_json.get(p)
+        if isinstance(v, list):
+            field = []
+            for q in v:
+                if isinstance(q, list):
+                    field.append('|'.join([str(r) for r in q]))
+                else:
+                    field.append(str(q) if q else '')
+            line.append(','.join(field))
+        else:
+            line.append(str(v) if v else '')
+    return '\t'.join(line) + '\n'
+
+
+class DonorExport(object):
 
-    project_dir = report_dir + '/donors/' + project_code
+    def __init__(self, jsonl_file, select=None, tsv_file=None, tsv_fields_file=None, donor_archive_dir=None):
+        # select: function of the donor es doc, all donors when not given
+        self.select = select
+        self.donor_fh = open(jsonl_file, 'w')
+        # per donor json, packed in one archive per project
+        self.donor_archive = DonorArchiveWriter(donor_archive_dir) if donor_archive_dir else None
+        self.pilot_tsv_fh = None
+        if tsv_file:
+            self.pilot_tsv_fh = open(tsv_file, 'w')
+            # read the tsv fields file and write to the pilot donor tsv file
+            with open(tsv_fields_file, 'r') as t:
+                self.pilot_tsv_fh.write('\t'.join([line.rstrip() for line in t]) + '\n')
 
-    if not os.path.exists(project_dir): os.makedirs(project_dir)
+    def write(self, donor_unique_id, reorganized_donor, donor_json, pilot_tsv_line):
+        if self.donor_archive: self.donor_archive.write(donor_unique_id, reorganized_donor)
+        self.donor_fh.write(donor_json + '\n')
+        if self.pilot_tsv_fh: self.pilot_tsv_fh.write(pilot_tsv_line())
 
-    with open(project_dir + '/' + donor_id + '.json', 'w') as w:
-        w.write(json.dumps(reorganized_donor, indent=4, sort_keys=True))
+    def close(self):
+        self.donor_fh.close()
+        if self.pilot_tsv_fh: self.pilot_tsv_fh.close()
+        if self.donor_archive: self.donor_archive.close()
 
 
 def main(argv=None):
@@ -381,88 +422,36 @@ def main(argv=None):
     timestamp = str.split(metadata_dir, '/')[-1]
     es_index = 'p_' + ('' if not repo else repo+'_') + re.sub(r'\D', '', timestamp).replace('20','',1)
     es_index_reorganize = 'r_' + ('' if not repo else repo+'_') + re.sub(r'\D', '', timestamp).replace('20','',1)
-    es_type = "donor"
     es_host = 'localhost:9200'
 
     es = Elasticsearch([es_host], timeout=600)
-    #es_reorganized = init_es(es_host, es_index_reorganize)
-
-    donor_fh = open(metadata_dir+'/reports/donors_all.jsonl', 'w')
-
-    # pilot_tsv_fh = open(metadata_dir + '/reports/donors_with_bwa_alignment.tsv', 'w')
-    
-    # # read the tsv fields file and write to the pilot donor tsv file
-    # tsv_fields = ["Project code", "Submitter donor ID", "Data train", "Train2 pilot", "Normal WGS submitter specimen ID", \
-    # "Normal WGS submitter sample ID", "Normal WGS aliquot ID", "Normal WGS alignment GNOS repo(s)", "Normal WGS alignment GNOS analysis ID", \
-    # "Normal WGS alignment BAM file name", "Tumour WGS Specimen Count", "Tumour WGS submitter specimen ID(s)", \
-    # "Tumour WGS submitter sample ID(s)", "Tumour WGS aliquot ID(s)", "Tumour WGS alignment GNOS repo(s)", \
-    # "Tumour WGS alignment GNOS analysis ID(s)", "Tumour WGS alignment BAM file name(s)", "Sanger variant call GNOS repo(s)", \
-    # "Sanger variant call GNOS analysis ID(s)", "Sanger variant call GNOS file name prefix", "Normal RNA-Seq submitter specimen ID", \
-    # "Normal RNA-Seq submitter sample ID", "Normal RNA-Seq aliquot ID", "Normal RNA-Seq STAR alignment GNOS repo(s)", \
-    # "Normal RNA-Seq STAR alignment GNOS analysis ID", "Normal RNA-Seq STAR alignment BAM file name", \
-    # "Normal RNA-Seq TopHat2 alignment GNOS repo(s)", "Normal RNA-Seq TopHat2 alignment GNOS analysis ID", \
-    # "Normal RNA-Seq TopHat2 alignment BAM file name", "Tumour RNA-Seq submitter specimen ID", "Tumour RNA-Seq submitter sample ID", \
-    # "Tumour RNA-Seq aliquot ID", "Tumour RNA-Seq STAR alignment GNOS repo(s)", "Tumour RNA-Seq STAR alignment GNOS analysis ID", \
-    # "Tumour RNA-Seq STAR alignment BAM file name", "Tumour RNA-Seq TopHat2 alignment GNOS repo(s)", \
-    # "Tumour RNA-Seq TopHat2 alignment GNOS analysis ID", "Tumour RNA-Seq TopHat2 alignment BAM file name" 
-    # ]
-    # pilot_tsv_fh.write('\t'.join(tsv_fields) + '\n')
-
-
-	# get the list of donors whose sanger_vcf without missing bams
+
+    report_dir = metadata_dir+'/reports/'
+    exports = [
+        DonorExport(report_dir+'donors_all.jsonl', donor_archive_dir=report_dir),
+        DonorExport(report_dir+'donors_with_bwa_alignment.jsonl', is_aligned_donor),
+        DonorExport(report_dir+'sanger_variant_called_donors.jsonl', is_sanger_variant_called_donor),
+        DonorExport(report_dir+'sanger_variant_called_donor_' + es_index_reorganize + '.jsonl', is_sanger_variant_called_donor,
+                    report_dir+'sanger_variant_called_donor_' + es_index_reorganize + '.tsv', 'ucsc_pilot_donor_tsv_fields.txt')
+    ]
+
     donors_list = get_donors_list(es, es_index, es_queries)
-    
-    # get json doc for each donor and reorganize it 
-    for donor_unique_id in donors_list:     
-        
-    	es_json = get_donor_json(es, es_index, donor_unique_id)
-        
-        reorganized_donor = create_reorganized_donor(donor_unique_id, es_json)
 
-        write_individule_json(metadata_dir+'/reports/', donor_unique_id, reorganized_donor)
-
-        # DO NOT NEED THIS YET: push to Elasticsearch
-        #es_reorganized.index(index=es_index_reorganize, doc_type='donor', id=reorganized_donor['donor_unique_id'], \
-        #    body=json.loads(json.dumps(reorganized_donor, default=set_default)), timeout=90 )
-
-        donor_fh.write(json.dumps(reorganized_donor, default=set_default) + '\n')
-        '''
-        # generate json for tsv file from reorganized donor
-        pilot_tsv_json = generate_json_for_tsv_file(reorganized_donor)
-        # write to the tsv file
-        line = ""
-        for p in pilot_tsv_json.keys():
-            if isinstance(pilot_tsv_json.get(p), list):
-                if pilot_tsv_json.get(p):
-                    count0 = 0
-                    for q in pilot_tsv_json.get(p):
-                        if isinstance(q, list):
-                            if q:
-                                line += '|'.join(q)
-                            else:
-                                line += ''
-                        else:
-                            line += str(q) if q else ''
-                        count0 = count0 + 1
-                        if count0 < len(pilot_tsv_json.get(p)):
-                            line += ','
-                else:
-                    line += '' # None as empty string
-            else:
-                line += str(pilot_tsv_json.get(p)) if pilot_tsv_json.get(p) is not None else ''
-            line += '\t' # field ends
-        line = line[:-1] # remove the last unwanted '\t'
-        pilot_tsv_fh.write(line + '\n')    
-        '''
-        
-    #pilot_tsv_fh.close()
-
-    donor_fh.close()
+    # get json doc for each donor, reorganize it once and write it to the exports selecting it
+    for donor_unique_id, es_json in get_donor_jsons(es, es_index, donors_list):
+        selected = [e for e in exports if not e.select or e.select(es_json)]
+        if not selected: continue
 
-    return 0
+        reorganized_donor = create_reorganized_donor(donor_unique_id, es_json)
+        donor_json = json.dumps(reorganized_donor, default=set_default)
+        # the pilot tsv line is only built when a selected export has the tsv
+        pilot_tsv_line = lambda: format_pilot_tsv_line(generate_json_for_tsv_file(reorganized_donor))
 
+        for e in selected: e.write(donor_unique_id, reorganized_donor, donor_json, pilot_tsv_line)
 
+    for e in exports: e.close()
 
+    return 0
 
 
 if __name__ == "__main__":
@@ -13,11 +13,13 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from collections import OrderedDict
 import datetime
 import dateutil.parser
 from itertools import izip
 from distutils.version import LooseVersion
+from report_writer import TsvWriter, format_value_or_empty
 
 
 
@@ -187,10 +189,10 @@ def get_donor_json(es, es_index, donor_unique_id):
 
 def get_donors_list(es, es_index, es_queries):
     q_index = 0
-    response = es.search(index=es_index, body=es_queries[q_index])
+    hits = scan_hits(es, es_index, es_queries[q_index])
     
     donors_list = []
-    for p in response['hits']['hits']:
+    for p in hits:
     	donors_list.append(p.get('fields').get('donor_unique_id')[0])
 
     return donors_list 
@@ -229,13 +231,12 @@ def main(argv=None):
 
     PCAWG_GNOS_entity_fh = open(metadata_dir+'/PCAWG_Full_List_GNOS_entities_'+es_index+'.jsonl', 'w')
 
-    PCAWG_GNOS_entity_tsv_fh = open(metadata_dir + '/PCAWG_Full_List_GNOS_entities_' + es_index + '.tsv', 'w')
+    PCAWG_GNOS_entity_tsv = TsvWriter(metadata_dir + '/PCAWG_Full_List_GNOS_entities_' + es_index + '.tsv', value_formatter=format_value_or_empty, line_end='\t\n')
 
 
 	# get the full list of donors in PCAWG
     donors_list = get_donors_list(es, es_index, es_queries)
     
-    header = True
     # get json doc for each donor and reorganize it 
     for donor_unique_id in donors_list:     
         
@@ -245,20 +246,10 @@ def main(argv=None):
         
         for gnos_entity in gnos_entity_info_list: 
             PCAWG_GNOS_entity_fh.write(json.dumps(gnos_entity, default=set_default) + '\n')
-            if header:
-                PCAWG_GNOS_entity_tsv_fh.write('\t'.join(gnos_entity.keys()) + '\n')
-                header = False 
             # write to the tsv file
-            for p in gnos_entity.keys():
-                if isinstance(gnos_entity.get(p), set):
-                    PCAWG_GNOS_entity_tsv_fh.write('|'.join(list(gnos_entity.get(p))) + '\t')
-                elif not gnos_entity.get(p):
-                    PCAWG_GNOS_entity_tsv_fh.write('\t')
-                else:
-                    PCAWG_GNOS_entity_tsv_fh.write(str(gnos_entity.get(p)) + '\t')
-            PCAWG_GNOS_entity_tsv_fh.write('\n')
+            PCAWG_GNOS_entity_tsv.write(gnos_entity)
         
-    PCAWG_GNOS_entity_tsv_fh.close()
+    PCAWG_GNOS_entity_tsv.close()
 
     PCAWG_GNOS_entity_fh.close()
 
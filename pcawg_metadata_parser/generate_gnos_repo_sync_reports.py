@@ -12,6 +12,7 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from collections import OrderedDict
 import datetime
 import dateutil.parser
@@ -20,6 +21,8 @@ from distutils.version import LooseVersion
 import csv
 import shutil
 from operator import itemgetter
+from gnos_repo_registry import get_formal_repo_name
+from report_writer import TsvWriter
 
 
 
@@ -258,10 +261,10 @@ def get_donor_json(es, es_index, donor_unique_id):
 
 def get_donors_list(es, es_index, es_queries):
     q_index = 0
-    response = es.search(index=es_index, body=es_queries[q_index])
+    hits = scan_hits(es, es_index, es_queries[q_index])
     
     donors_list = []
-    for p in response['hits']['hits']:
+    for p in hits:
     	donors_list.append(p.get('fields').get('donor_unique_id')[0])
 
     return donors_list 
@@ -281,47 +284,9 @@ def init_report_dir(metadata_dir, report_name):
 
     return report_dir
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
-
-    return repo_url_to_repo.get(repo)
-
 def write_tsv_file(report, filename):
-    with open(filename, 'w') as fh:
-        header = True  
-        for r in report:
-            if header:
-                fh.write('\t'.join(r.keys()) + '\n')
-                header = False 
-            # make the list of output from dict
-            line = []
-            for p in r.keys():
-                if isinstance(r.get(p), list):
-                    line.append('|'.join(r.get(p)))
-                elif isinstance(r.get(p), set):
-                    line.append('|'.join(list(r.get(p))))
-                elif r.get(p) is None:
-                    line.append('')
-                else:
-                    line.append(str(r.get(p)))
-            fh.write('\t'.join(line) + '\n') 
+    with TsvWriter(filename) as tsv_writer:
+        tsv_writer.writerows(report)
 
 
 def main(argv=None):
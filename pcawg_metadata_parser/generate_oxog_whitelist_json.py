@@ -23,6 +23,9 @@ import xml.dom.minidom
 import shutil
 import requests
 import csv
+from gnos_repo_registry import get_formal_repo_name
+from metadata_xml_digest import generate_md5_size
+from icgc_object_id import ObjectIdResolver
 
 # id_service_token = os.environ.get('ICGC_TOKEN')
 icgc_project_code = os.environ.get('ICGC_PROJECT_CODE')
@@ -30,6 +33,9 @@ icgc_project_code = os.environ.get('ICGC_PROJECT_CODE')
 logger = logging.getLogger('OxOG filter json generator')
 ch = logging.StreamHandler()
 
+# ICGC object ids, cached locally and resolved per donor
+object_id_resolver = ObjectIdResolver(token=None, logger=logger)
+
 es_queries = [
   {
     "fields": "donor_unique_id", 
@@ -198,75 +204,9 @@ def get_source_repo_index_pos (available_repos, chosen_gnos_repo=None):
     return None
 
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
-
-    return repo_url_to_repo.get(repo)
-
-
-def generate_md5_size(metadata_xml_file):
-    with open (metadata_xml_file, 'r') as x: data = x.read()
-    data = re.sub(r'<ResultSet .+?>', '<ResultSet>', data)
-
-    with open('tmp.xml', 'w') as f: f.write(data)
-
-    xml_md5 = hashlib.md5(data).hexdigest()
-    xml_size = os.path.getsize('tmp.xml')
-
-    return [xml_md5, xml_size]
-
-
 def generate_object_id(filename, gnos_id, target_cloud):
     if target_cloud in ['tcga', 'gtdownload']: return ''
-    global id_service_token
-    url = 'https://meta.icgc.org/entities'
-    # try get request first
-    r = requests.get(url + '?gnosId=' + gnos_id + '&fileName=' + filename,
-                       headers={'Content-Type': 'application/json'})
-    if not r or not r.ok:
-        logger.warning('GET request unable to access metadata service: {}'.format(url))
-        return ''
-    elif r.json().get('totalElements') == 1:
-        logger.info('GET request got the id')
-        return r.json().get('content')[0].get('id')
-    elif r.json().get('totalElements') > 1:
-        logger.warning('GET request to metadata service return multiple matches for gnos_id: {} and filename: {}'
-                          .format(gnos_id, filename))
-        return ''
-    elif id_service_token:  # no match then try post to create
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': 'Bearer ' + id_service_token
-        }
-        body = {
-            "gnosId": gnos_id,
-            "fileName": filename
-        }
-        r = requests.post(url, data=json.dumps(body), headers=headers)
-        if not r or not r.ok:
-            logger.warning('POST request failed')
-            return ''
-        return r.json().get('id')
-    else:
-        logger.info('No luck, generate FAKE ID')
-        return ''
+    return object_id_resolver.defer(filename, gnos_id)
 
 
 def add_metadata_xml_info(obj, chosen_gnos_repo, target_cloud):
@@ -276,10 +216,11 @@ def add_metadata_xml_info(obj, chosen_gnos_repo, target_cloud):
     ao_updated = obj.get('gnos_last_modified')[ get_source_repo_index_pos(obj.get('gnos_repo'), chosen_gnos_repo) ].encode('utf8')
     ao_updated = str.split(ao_updated, '+')[0] + 'Z'
     metadata_xml_file = 'gnos_metadata/__all_metadata_xml/' + repo + '/' + gnos_id + '__' + ao_state + '__' + ao_updated + '.xml'
+    xml_md5, xml_size = generate_md5_size(metadata_xml_file)
     metadata_xml_file_info = {
         'file_name': gnos_id + '.xml',
-        'file_md5sum': generate_md5_size(metadata_xml_file)[0],
-        'file_size': generate_md5_size(metadata_xml_file)[1],
+        'file_md5sum': xml_md5,
+        'file_size': xml_size,
         'object_id': generate_object_id(gnos_id+'.xml', gnos_id, target_cloud)
     }
 
@@ -520,6 +461,8 @@ def write_json(jobs_dir, job_json):
     json_name_list = [project_code, donor_id, 'json']
 
     json_name = '.'.join(json_name_list)
+    # the object ids of all the donor's files are resolved in one batch
+    object_id_resolver.resolve(job_json)
     with open(jobs_dir + '/' + json_name, 'w') as w:
         w.write(json.dumps(job_json, indent=4, sort_keys=True))
 
@@ -691,7 +634,7 @@ def main(argv=None):
         write_json(jobs_dir, job_json)
 
 
-    if os.path.isfile('tmp.xml'): os.remove('tmp.xml')
+    object_id_resolver.close()
 
     return 0
 
@@ -13,12 +13,19 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
+from es_msearch import msearch
 from collections import OrderedDict
 import datetime
 import dateutil.parser
 from itertools import izip
 from distutils.version import LooseVersion
 import shutil
+from gnos_repo_registry import registry, get_formal_repo_name
+from compute_site_index import ComputeSiteIndex
+from history_store import cumulative_counts
+from es_bulk_loader import bulk_load
+from report_writer import TsvWriter, format_value_or_empty
 
 
 
@@ -272,12 +279,9 @@ def add_wgs_aliquot_gnos_entity(aliquot, gnos_entity_info, gnos_entity_info_list
 
     return gnos_entity_info_list
 
-def get_compute_site(donor_unique_id, compute_sites, gnos_repo):
-
-    for c in compute_sites:
-        if donor_unique_id.replace('::', '\t') in compute_sites.get(c):
-            compute_site = c
-            return compute_site
+def get_compute_site(donor_unique_id, compute_site_index, gnos_repo):
+    compute_site = compute_site_index.get_compute_site(donor_unique_id)
+    if compute_site: return compute_site
 
     compute_site = get_formal_repo_name(gnos_repo)    
     return compute_site
@@ -363,10 +367,10 @@ def get_donor_json(es, es_index, donor_unique_id):
 
 def get_donors_list(es, es_index, es_queries):
     q_index = 0
-    response = es.search(index=es_index, body=es_queries[q_index])
+    hits = scan_hits(es, es_index, es_queries[q_index])
     
     donors_list = []
-    for p in response['hits']['hits']:
+    for p in hits:
     	donors_list.append(p.get('fields').get('donor_unique_id')[0])
 
     return donors_list 
@@ -389,80 +393,30 @@ def init_es(es_host, es_index):
     es_mapping.close()
     return es
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
-
-    return repo_url_to_repo.get(repo)
-
 def generate_report(es, es_index, es_queries, report_dir, compute_sites):
 
+    # the per day counts of all queries go out in one msearch
+    responses = msearch(es, es_index, [q.get('content') for q in es_queries])
     for q_index in range(len(es_queries)):
-        counts_per_day = OrderedDict()
         
         if compute_sites.get(es_queries[q_index].get('name')):
-            repos = set(['bsc', 'ebi', 'cghub', 'dkfz', 'riken', 'osdc-icgc', 'osdc-tcga', 'etri']+compute_sites.get(es_queries[q_index].get('name')).keys())
+            repos = set(registry.repo_codes+compute_sites.get(es_queries[q_index].get('name')).sites)
         else:
-            repos = set(['bsc', 'ebi', 'cghub', 'dkfz', 'riken', 'osdc-icgc', 'osdc-tcga', 'etri'])
-
-        # initialized
-        start_date = datetime.date(2014, 8, 1)
-        current_date = datetime.date.today()
-        step = datetime.timedelta(days=1)
-        all_dates = []
-        while start_date<current_date:
-            counts_per_day[start_date.strftime("%Y-%m-%d")]={}
-            counts_per_day[start_date.strftime("%Y-%m-%d")]['count']=0
-            for r in repos:
-                counts_per_day[start_date.strftime("%Y-%m-%d")][r]=0
-            all_dates.append(start_date.strftime("%Y-%m-%d"))
-            start_date += step
-        
+            repos = set(registry.repo_codes)
+
         # get counts per day
-        response = es.search(index=es_index, body=es_queries[q_index].get('content'))
+        counts_per_day = OrderedDict()
+        response = next(responses)
         for p in response['aggregations']['published_date'].get('buckets'):
             published_date = p.get('key_as_string').split('T')[0]
-            counts_per_day[published_date]['count'] = p.get('doc_count')
+            counts_per_day[published_date] = {'count': p.get('doc_count')}
             for d in p.get('repo').get('buckets'):
                 counts_per_day[published_date][d.get('key')] = d.get('doc_count')
 
         # get the cumulative sum
-        counts_sum = OrderedDict()
         counts_sum_list = [['Date', 'count']+list(repos)]
-                
-        for d in range(len(all_dates)):
-            counts_list = [all_dates[d]]
-            if d == 0: 
-                counts_sum[all_dates[d]] = counts_per_day.get(all_dates[d])
-            else:
-                counts_sum[all_dates[d]] = {}
-                counts_sum[all_dates[d]]['count'] = counts_sum[all_dates[d-1]]['count'] + counts_per_day[all_dates[d]]['count']
-                for r in repos:
-                    counts_sum[all_dates[d]][r] = counts_sum[all_dates[d-1]][r] + counts_per_day[all_dates[d]][r]
-            counts_list.append(copy.deepcopy(counts_sum[all_dates[d]]['count']))
-            for r in repos:
-                counts_list.append(copy.deepcopy(counts_sum[all_dates[d]][r]))
-            counts_sum_list.append(copy.deepcopy(counts_list)) 
-            
-
-        # with open(report_dir + '/' + es_queries[q_index].get('name') + '.counts.json', 'w') as o:
-        #     o.write(json.dumps(counts_sum))
+        counts_sum_list.extend(cumulative_counts(counts_per_day, ['count']+list(repos), datetime.date(2014, 8, 1), datetime.date.today()))
+
         with open(report_dir + '/' + es_queries[q_index].get('name') + '.counts.txt', 'w') as o: 
             for r in counts_sum_list:
                 o.write('\t'.join(str(x) for x in r) + '\n')
@@ -487,6 +441,10 @@ def get_whitelists(whitelist_dir):
                 if not compute_sites.get(d): compute_sites[d] = {} 
                 if not compute_sites[d].get(c): compute_sites[d][c] = set()
                 compute_sites[d][c].update(get_donors(f))
+
+    # index donor => compute sites for each whitelist type
+    for d in compute_sites:
+        compute_sites[d] = ComputeSiteIndex(compute_sites[d])
     return compute_sites
 
 def get_donors(fname):
@@ -521,7 +479,7 @@ def main(argv=None):
     es = Elasticsearch([es_host], timeout=600)
 
     fh = open(metadata_dir+'/pcawg_history_entities_'+es_index+'.jsonl', 'w')
-    tsv_fh = open(metadata_dir + '/pcawg_history_entities_' + es_index + '.tsv', 'w')
+    tsv_writer = TsvWriter(metadata_dir + '/pcawg_history_entities_' + es_index + '.tsv', value_formatter=format_value_or_empty, line_end='\t\n')
 
     es_index_history = 'pcawg_history'
     es_history = init_es(es_host, es_index_history)
@@ -539,7 +497,6 @@ def main(argv=None):
     }
     compute_sites = get_whitelists(whitelist_dir)
   
-    header = True
     # get json doc for each donor and reorganize it 
     for donor_unique_id in donors_list:     
         
@@ -549,24 +506,16 @@ def main(argv=None):
         
         for gnos_entity in gnos_entity_info_list: 
             fh.write(json.dumps(gnos_entity, default=set_default) + '\n')
-            # push to Elasticsearch
-            es_history.index(index=es_index_history, doc_type=es_type_history, id=gnos_entity['gnos_id'], body=json.loads(json.dumps(gnos_entity, default=set_default)), timeout=90 )
 
-            if header:
-                tsv_fh.write('\t'.join(gnos_entity.keys()) + '\n')
-                header = False 
             # write to the tsv file
-            for p in gnos_entity.keys():
-                if isinstance(gnos_entity.get(p), set):
-                    tsv_fh.write('|'.join(list(gnos_entity.get(p))) + '\t')
-                elif not gnos_entity.get(p):
-                    tsv_fh.write('\t')
-                else:
-                    tsv_fh.write(str(gnos_entity.get(p)) + '\t')
-            tsv_fh.write('\n')
-    tsv_fh.close()
+            tsv_writer.write(gnos_entity)
+    tsv_writer.close()
     fh.close()
 
+    # push to Elasticsearch, straight from the jsonl just written
+    with open(metadata_dir+'/pcawg_history_entities_'+es_index+'.jsonl', 'r') as f:
+        bulk_load(es_history, es_index_history, es_type_history, f, 'gnos_id')
+
     # output result
     report_name = re.sub(r'^generate_', '', os.path.basename(__file__))
     report_name = re.sub(r'\.py$', '', report_name)
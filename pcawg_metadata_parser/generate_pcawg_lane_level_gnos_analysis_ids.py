@@ -13,12 +13,14 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from collections import OrderedDict
 import datetime
 import dateutil.parser
 from itertools import izip
 from distutils.version import LooseVersion
 import shutil
+from gnos_repo_registry import registry, get_formal_repo_name
 
 
 
@@ -126,10 +128,10 @@ def get_donor_json(es, es_index, donor_unique_id):
 
 def get_donors_list(es, es_index, es_queries):
     q_index = 0
-    response = es.search(index=es_index, body=es_queries[q_index])
+    hits = scan_hits(es, es_index, es_queries[q_index])
     
     donors_list = []
-    for p in response['hits']['hits']:
+    for p in hits:
     	donors_list.append(p.get('fields').get('donor_unique_id')[0])
 
     return donors_list 
@@ -142,27 +144,17 @@ def set_default(obj):
         return list(obj)
     raise TypeError
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
+def format_tsv_line(gnos_entity):
+    fields = []
+    for v in gnos_entity.values():
+        if isinstance(v, set):
+            fields.append('|'.join(list(v)))
+        elif not v:
+            fields.append('')
+        else:
+            fields.append(str(v))
 
-    return repo_url_to_repo.get(repo)
+    return '\t'.join(fields) + '\t\n'
 
 def init_report_dir(metadata_dir, report_name):
     report_dir = metadata_dir + '/reports/' + report_name
@@ -198,34 +190,29 @@ def main(argv=None):
     report_dir = init_report_dir(metadata_dir, report_name)
 
 
-	# get the list of donors in PCAWG
+    # get the list of donors in PCAWG
     donors_list = get_donors_list(es, es_index, es_queries)
-    
-    report_info_list_full = []
-    # get json doc for each donor and reorganize it 
-    for donor_unique_id in donors_list:            
-    	es_json = get_donor_json(es, es_index, donor_unique_id)
-        report_info_list_donor = create_gnos_entity_info(donor_unique_id, es_json)
-        report_info_list_full.extend(report_info_list_donor)
-
-                
-    for repo in ['bsc', 'ebi', 'cghub', 'dkfz', 'riken', 'osdc-icgc', 'osdc-tcga', 'etri']:
-        header = True
-        report_tsv_fh = open(report_dir + '/' + repo + '.lane_level.analysis_id.txt', 'w')
-        for gnos_entity in report_info_list_full: 
+
+    # one buffered output per repo, keyed by repo url so entities are routed with a single dict lookup
+    report_fhs = OrderedDict()
+    for repo in registry.repo_codes:
+        report_fhs[get_formal_repo_name(repo)] = open(report_dir + '/' + repo + '.lane_level.analysis_id.txt', 'w', 1024*1024)
+
+    header = True
+    # get json doc for each donor, reorganize it and write its entities out right away
+    for donor_unique_id in donors_list:
+        es_json = get_donor_json(es, es_index, donor_unique_id)
+        for gnos_entity in create_gnos_entity_info(donor_unique_id, es_json):
             if header:
-                report_tsv_fh.write('\t'.join(gnos_entity.keys()) + '\n')
-                header = False 
-            # write to the tsv file
-            if not get_formal_repo_name(gnos_entity.get('gnos_repo')) == repo: continue
-            for p in gnos_entity.keys():
-                if isinstance(gnos_entity.get(p), set):
-                    report_tsv_fh.write('|'.join(list(gnos_entity.get(p))) + '\t')
-                elif not gnos_entity.get(p):
-                    report_tsv_fh.write('\t')
-                else:
-                    report_tsv_fh.write(str(gnos_entity.get(p)) + '\t')
-            report_tsv_fh.write('\n')    
+                for report_tsv_fh in report_fhs.values():
+                    report_tsv_fh.write('\t'.join(gnos_entity.keys()) + '\n')
+                header = False
+            # write to the tsv file of the repo the entity is in
+            report_tsv_fh = report_fhs.get(gnos_entity.get('gnos_repo'))
+            if not report_tsv_fh: continue
+            report_tsv_fh.write(format_tsv_line(gnos_entity))
+
+    for report_tsv_fh in report_fhs.values():
         report_tsv_fh.close()
 
 
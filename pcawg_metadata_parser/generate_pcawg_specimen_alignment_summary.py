@@ -13,11 +13,16 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from collections import OrderedDict
 import datetime
 import dateutil.parser
 from itertools import izip
 from distutils.version import LooseVersion
+from gnos_repo_registry import get_repo_code
+from compute_site_index import ComputeSiteIndex
+from history_store import DailyCountStore
+from report_writer import TsvWriter
 
 
 
@@ -57,7 +62,7 @@ def init_report_dir(metadata_dir, report_name):
         os.makedirs(report_dir)
     return report_dir
 
-def create_specimen_info(donor_unique_id, es_json, compute_sites):
+def create_specimen_info(donor_unique_id, es_json, compute_site_index):
     specimen_info_list = []
 
     specimen_info = OrderedDict()
@@ -65,7 +70,7 @@ def create_specimen_info(donor_unique_id, es_json, compute_sites):
     specimen_info['submitter_donor_id'] = es_json['submitter_donor_id']
     specimen_info['dcc_project_code'] = es_json['dcc_project_code']
     
-    add_wgs_specimens(specimen_info_list, specimen_info, es_json, compute_sites)
+    add_wgs_specimens(specimen_info_list, specimen_info, es_json, compute_site_index)
 
     #comment it for now not considering the rna-seq alignments 
     #add_rna_seq_specimens(specimen_info_list, specimen_info, es_json)
@@ -73,19 +78,19 @@ def create_specimen_info(donor_unique_id, es_json, compute_sites):
     return specimen_info_list
 
 
-def add_wgs_specimens(specimen_info_list, specimen_info, es_json, compute_sites):
+def add_wgs_specimens(specimen_info_list, specimen_info, es_json, compute_site_index):
 
     if es_json.get('normal_alignment_status'):
         aliquot = es_json.get('normal_alignment_status')
-        get_wgs_aliquot_fields(aliquot, specimen_info, compute_sites, specimen_info_list)
+        get_wgs_aliquot_fields(aliquot, specimen_info, compute_site_index, specimen_info_list)
 
     if es_json.get('tumor_alignment_status'):
         for aliquot in es_json.get('tumor_alignment_status'):
-            get_wgs_aliquot_fields(aliquot, specimen_info, compute_sites, specimen_info_list)
+            get_wgs_aliquot_fields(aliquot, specimen_info, compute_site_index, specimen_info_list)
 
     return specimen_info_list
 
-def get_wgs_aliquot_fields(aliquot, specimen_info, compute_sites, specimen_info_list):
+def get_wgs_aliquot_fields(aliquot, specimen_info, compute_site_index, specimen_info_list):
     specimen_info['aliquot_id'] = aliquot.get('aliquot_id')
     specimen_info['submitter_specimen_id'] = aliquot.get('submitter_specimen_id')
     specimen_info['submitter_sample_id'] = aliquot.get('submitter_sample_id')
@@ -95,13 +100,11 @@ def get_wgs_aliquot_fields(aliquot, specimen_info, compute_sites, specimen_info_
     specimen_info['workflow_type'] = 'BWA'
     specimen_info['has_bam_been_transferred'] = aliquot.get('has_bwa_bam_been_transferred')
     specimen_info['bam_gnos_id'] = aliquot.get('aligned_bam').get('gnos_id') if specimen_info['aligned'] else None
-    specimen_info['computer_site'] = []    
-    if get_compute_site(specimen_info['donor_unique_id'], compute_sites):
-        specimen_info['computer_site'] = get_compute_site(specimen_info['donor_unique_id'], compute_sites)
+    specimen_info['computer_site'] = compute_site_index.get_compute_sites(specimen_info['donor_unique_id'])
     #leave the compute site to be blank if the donor is not in the whitelist whether it is aligned or not
     #since we do not have the history info for the aligned ones
     #else:
-    #    specimen_info['computer_site'] = [get_formal_repo_name(aliquot.get('aligned_bam').get('gnos_repo')[0])] if specimen_info['aligned'] else []
+    #    specimen_info['computer_site'] = [get_repo_code(aliquot.get('aligned_bam').get('gnos_repo')[0])] if specimen_info['aligned'] else []
 
     specimen_info_list.append(copy.deepcopy(specimen_info))
     return specimen_info_list
@@ -117,35 +120,46 @@ def compute_site_report(metadata_dir, report_dir, report_name, site_counts, unas
         o.write('# dcc_project_code' + '\t' + 'submitter_donor_id' + '\n')
         o.write('\n'.join(unassigned_unaligned_donors) + '\n')
 
-    # get all previous days counts
-    [dates, metadata_dirs] = get_metadata_dirs(metadata_dir, '2015-05-26')
+    # previous days counts are kept in the history store, only today's counts are added
+    history_store = DailyCountStore(metadata_dir + '/../pcawg_history.sqlite')
+    series = report_name + '.site_counts'
+    if not history_store.has_series(series):
+        # first run with the store, load the counts from all earlier reports once
+        [dates, metadata_dirs] = get_metadata_dirs(metadata_dir, '2015-05-26')
+        for i, md in enumerate(metadata_dirs):
+            summary_site_count_file = md + '/reports/' + report_name + '/summary_site_counts.json'
+            if not os.path.isfile(summary_site_count_file): continue
+            history_store.update(series, dates[i], flatten_site_counts(json.load(open(summary_site_count_file))))
+
+    today = str.split(os.path.basename(metadata_dir.rstrip('/')), '_')[0]
+    history_store.update(series, today, flatten_site_counts(site_counts))
+
+    site_summary_report = [[d, unflatten_site_counts(c)] for d, c in reversed(history_store.get_daily_counts(series, today).items())]
+    history_store.close()
+    with open(report_dir + '/hist_summary_site_counts.json', 'w') as o: o.write(json.dumps(site_summary_report))
 
-    site_summary_report = []
-    for i, md in reversed(list(enumerate(metadata_dirs))):
-        summary_site_count_file = md + '/reports/' + report_name + '/summary_site_counts.json'
-        if not os.path.isfile(summary_site_count_file): continue
 
-        site_counts_tmp = json.load(open(summary_site_count_file))
-        site_summary_report.append([dates[i], site_counts_tmp])
-    with open(report_dir + '/hist_summary_site_counts.json', 'w') as o: o.write(json.dumps(site_summary_report))
+def flatten_site_counts(site_counts):
+    return dict((c + ':' + k, v) for c in site_counts for k, v in site_counts.get(c).items())
 
 
-def get_compute_site(donor_unique_id, compute_sites):
-    compute_site = []
+def unflatten_site_counts(counts):
+    site_counts = {}
+    for key, v in counts.items():
+        c, k = key.rsplit(':', 1)
+        site_counts.setdefault(c, {})[k] = v
+    return site_counts
+
+
+def compute_site_overlap_report(report_dir, compute_site_index):
+    for overlap in compute_site_index.overlaps:
+        # log overlap donors issue
+        print "WARN: overlap donors found between " + overlap.get('compute_sites')[0] + " and " + overlap.get('compute_sites')[1] \
+              + ": " + ", ".join(overlap.get('donors'))
+
+    with open(report_dir + '/compute_site_overlap_donors.json', 'w') as o: o.write(json.dumps(compute_site_index.overlaps))
 
-    for c in compute_sites:
-        for d in compute_sites:
-            if c == d: continue
-            if compute_sites.get(c).intersection(compute_sites.get(d)):
-                # log overlap donors issue
-                print "WARN: overlap donors found between " + c + " and " + d \
-                      + ": " + ", ".join(compute_sites.get(c).intersection(compute_sites.get(d)))
-        if donor_unique_id.replace('::', '\t') in compute_sites.get(c):
-            compute_site.append(c)
-    
-    return(compute_site)
 
-    
 def get_whitelists(compute_sites):
     whitelist_dir = '../pcawg-operations/bwa_alignment/'
 
@@ -162,29 +176,6 @@ def get_donors(fname):
     return donors
 
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "bsc",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "ebi",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "cghub",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "dkfz",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "riken",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "osdc-icgc",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "osdc-tcga",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "etri"
-    }
-
-    return repo_url_to_repo.get(repo)
-
-
 def add_rna_seq_specimens(specimen_info_list, specimen_info, es_json):
     # to build pcawg santa cruz pilot dataset, this is a temporary walkaround to exclude the 130 RNA-Seq bad
     # entries from MALY-DE and CLLE-ES projects
@@ -241,10 +232,10 @@ def get_donor_json(es, es_index, donor_unique_id):
 
 def get_donors_list(es, es_index, es_queries):
     q_index = 0
-    response = es.search(index=es_index, body=es_queries[q_index])
+    hits = scan_hits(es, es_index, es_queries[q_index])
     
     donors_list = []
-    for p in response['hits']['hits']:
+    for p in hits:
     	donors_list.append(p.get('fields').get('donor_unique_id')[0])
 
     return donors_list 
@@ -327,14 +318,14 @@ def main(argv=None):
 
     #report_jsonl_fh = open(report_dir + '/' + report_name + '.jsonl', 'w')
 
-    report_tsv_fh = open(report_dir + '/' + report_name + '.tsv', 'w')
-    
     # read the tsv fields file and write to the pilot donor tsv file
     tsv_fields = ["donor_unique_id", "submitter_donor_id", "dcc_project_code", "aliquot_id", "submitter_specimen_id", \
     "submitter_sample_id", "dcc_specimen_type", "library_strategy", "aligned", "workflow_type", "has_bam_been_transferred",\
     "gnos_id", "computer_site" 
     ]
-    report_tsv_fh.write('\t'.join(tsv_fields) + '\n')
+    # the gnos_id column holds the bam_gnos_id of the specimen
+    report_tsv = TsvWriter(report_dir + '/' + report_name + '.tsv', header=tsv_fields,
+                           fields=[f if not f == 'gnos_id' else 'bam_gnos_id' for f in tsv_fields])
 
 	# get the full list of donors in PCAWG
     donors_list = get_donors_list(es, es_index, es_queries)
@@ -360,6 +351,8 @@ def main(argv=None):
     }
 
     get_whitelists(compute_sites)
+    compute_site_index = ComputeSiteIndex(compute_sites)
+    compute_site_overlap_report(report_dir, compute_site_index)
 
     site_counts = {}
     site_counts['unassigned'] = {
@@ -375,27 +368,17 @@ def main(argv=None):
         
     	es_json = get_donor_json(es, es_index, donor_unique_id)
         
-        specimen_info_list = create_specimen_info(donor_unique_id, es_json, compute_sites)
+        specimen_info_list = create_specimen_info(donor_unique_id, es_json, compute_site_index)
         
         for specimen in specimen_info_list: 
             #report_jsonl_fh.write(json.dumps(specimen, default=set_default) + '\n')
             # write to the tsv file
-            line = ''
-            for p in specimen.keys():
-                if isinstance(specimen.get(p), list):
-                    line += '|'.join(specimen.get(p))
-                elif isinstance(specimen.get(p), set):
-                    line += '|'.join(list(specimen.get(p)))
-                else:
-                    line += str(specimen.get(p)) if specimen.get(p) is not None else ''
-                line += '\t'
-            line = line[:-1]
-            report_tsv_fh.write(line + '\n')
+            report_tsv.write(specimen)
 
             # report for computer site
             compute_site_count(specimen, site_counts, unassigned_unaligned_donors)
         
-    report_tsv_fh.close()
+    report_tsv.close()
     #report_jsonl_fh.close()
 
     # report for each computer site and history
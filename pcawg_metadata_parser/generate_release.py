@@ -11,9 +11,11 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from collections import OrderedDict
 import datetime
 import csv
+from es_bulk_loader import load_into_alias
 
 logger = logging.getLogger('generate PCAWG data release')
 ch = logging.StreamHandler()
@@ -396,23 +398,13 @@ def get_donor_json(es, es_index, donor_unique_id):
 
 def get_donors_list(es, es_index, es_queries):
     q_index = 0
-    response = es.search(index=es_index, body=es_queries[q_index])
+    hits = scan_hits(es, es_index, es_queries[q_index])
     donors_list = set()
-    for p in response['hits']['hits']:
+    for p in hits:
       donors_list.add(p.get('fields').get('donor_unique_id')[0])
     return donors_list 
 
 
-def init_es(es_host, es_index):
-    es = Elasticsearch([ es_host ])
-    es.indices.create( es_index, ignore=400 )
-    # create mappings
-    es_mapping = open('pcawg_summary.mapping.json')
-    es.indices.put_mapping(index=es_index, doc_type='donor', body=es_mapping.read())
-    es_mapping.close()
-    return es
-
-
 def set_default(obj):
     if isinstance(obj, datetime.datetime):
         return obj.isoformat()
@@ -551,60 +543,104 @@ def generate_id_list(id_lists):
     return ids_list
 
 
-def generate_simple_release_tsv(release_donor_json, simple_release_tsv, vcf):
-    simple_release = OrderedDict()
-    simple_release['donor_unique_id'] = release_donor_json.get('donor_unique_id')
+simple_release_fields = ['donor_unique_id', 'gnos_id', 'entry_type']
+
+
+def generate_simple_release_entries(release_donor_json, vcf):
+    # (donor_unique_id, gnos_id, entry_type) of each entry of the donor, the same entry may come more than once
+    donor_unique_id = release_donor_json.get('donor_unique_id')
     if release_donor_json.get('wgs') and release_donor_json.get('wgs').get('normal_specimen'):
         for bam_type in ['bwa_alignment', 'minibam']:
             if release_donor_json.get('wgs').get('normal_specimen').get(bam_type):
                 entry = release_donor_json.get('wgs').get('normal_specimen').get(bam_type)
-                simple_release['gnos_id'] = entry.get('gnos_id')
-                simple_release['entry_type'] = 'normal_wgs_'+bam_type
-                simple_release_tsv.append(copy.deepcopy(simple_release))
+                yield (donor_unique_id, entry.get('gnos_id'), 'normal_wgs_'+bam_type)
 
     if release_donor_json.get('wgs') and release_donor_json.get('wgs').get('tumor_specimens'):
         for aliquot in release_donor_json.get('wgs').get('tumor_specimens'):
             for bam_type in ['bwa_alignment', 'minibam']:
                 if aliquot.get(bam_type):
                     entry = aliquot.get(bam_type)
-                    simple_release['gnos_id'] = entry.get('gnos_id')
-                    simple_release['entry_type'] = 'tumor_wgs_'+bam_type
-                    simple_release_tsv.append(copy.deepcopy(simple_release))
+                    yield (donor_unique_id, entry.get('gnos_id'), 'tumor_wgs_'+bam_type)
             for v in vcf:
                 if aliquot.get(get_key_map(v)):
                     entry = aliquot.get(get_key_map(v))
-                    simple_release['gnos_id'] = entry.get('gnos_id')
-                    simple_release['entry_type'] = get_key_map(v)
-                    simple_release_tsv.append(copy.deepcopy(simple_release))
+                    yield (donor_unique_id, entry.get('gnos_id'), get_key_map(v))
     
     if release_donor_json.get('rna_seq') and release_donor_json.get('rna_seq').get('normal_specimen'):
         entry = release_donor_json.get('rna_seq').get('normal_specimen')
         for k,v in entry.iteritems():        
-            simple_release['gnos_id'] = v.get('gnos_id')
-            simple_release['entry_type'] = 'normal_RNA_Seq_' + k.upper() + '_bam'
-            simple_release_tsv.append(copy.deepcopy(simple_release))
+            yield (donor_unique_id, v.get('gnos_id'), 'normal_RNA_Seq_' + k.upper() + '_bam')
     
     if release_donor_json.get('rna_seq') and release_donor_json.get('rna_seq').get('tumor_specimens'):
         for aliquot in release_donor_json.get('rna_seq').get('tumor_specimens'):
             for k,v in aliquot.iteritems():
                 if not v: continue        
-                simple_release['gnos_id'] = v.get('gnos_id')
-                simple_release['entry_type'] = 'tumor_RNA_Seq_' + k.upper() + '_bam'
-                simple_release_tsv.append(copy.deepcopy(simple_release))
+                yield (donor_unique_id, v.get('gnos_id'), 'tumor_RNA_Seq_' + k.upper() + '_bam')
 
-    simple_release_tsv = remove_dup_items(simple_release_tsv)
 
-    return simple_release_tsv
-
-def remove_dup_items(simple_release_tsv):
+def write_simple_release_tsv(simple_tsv_fh, release_donor_json, vcf, header):
+    # entries carry the donor_unique_id, so duplicates can only come from within the same donor
     seen = set()
-    new_simple_release_tsv = []
-    for d in simple_release_tsv:
-        t = tuple(d.items())
-        if t not in seen:
-            seen.add(t)
-            new_simple_release_tsv.append(d)
-    return new_simple_release_tsv
+    for entry in generate_simple_release_entries(release_donor_json, vcf):
+        if entry in seen: continue
+        seen.add(entry)
+        if header:
+            simple_tsv_fh.write('\t'.join(simple_release_fields) + '\n')
+            header = False
+        simple_tsv_fh.write('\t'.join(['' if e is None else str(e) for e in entry]) + '\n')
+    return header
+
+
+def format_pilot_tsv_line(pilot_tsv_json):
+    line = []
+    for p in pilot_tsv_json.keys():
+        if isinstance(pilot_tsv_json.get(p), list):
+            field = []
+            for q in pilot_tsv_json.get(p):
+                if isinstance(q, list):
+                    field.append('|'.join(q))
+                elif q is None:
+                    field.append('')
+                else:
+                    field.append(str(q))
+            line.append(','.join(field))
+
+        elif pilot_tsv_json.get(p) is None:
+            line.append('')
+        else:
+            line.append(str(pilot_tsv_json.get(p)))
+
+    return '\t'.join(line) + '\n'
+
+
+class ReleaseView(object):
+    # one donor set of the release (release itself, whitelisted, blacklisted, graylisted donors) and its output files
+
+    def __init__(self, report_dir, release_name, suffix, donors):
+        self.donors = set(donors or [])
+        self.donor_file = report_dir+release_name+suffix+'.jsonl'
+        self.donor_fh = open(self.donor_file, 'w')
+        self.pilot_tsv_fh = open(report_dir+release_name+suffix+'.tsv', 'w')
+        self.simple_tsv_fh = open(report_dir+release_name+'_entry'+suffix+'.tsv', 'w')
+        self.pilot_tsv_header = True
+        self.simple_tsv_header = True
+
+    def write(self, reorganized_donor, donor_json, pilot_tsv_fields, pilot_tsv_line, vcf):
+        self.donor_fh.write(donor_json + '\n')
+
+        # generate simple tsv from reorganized donor
+        self.simple_tsv_header = write_simple_release_tsv(self.simple_tsv_fh, reorganized_donor, vcf, self.simple_tsv_header)
+
+        if self.pilot_tsv_header:
+            self.pilot_tsv_fh.write('\t'.join(pilot_tsv_fields) + '\n')
+            self.pilot_tsv_header = False 
+        self.pilot_tsv_fh.write(pilot_tsv_line)
+
+    def close(self):
+        self.donor_fh.close()
+        self.pilot_tsv_fh.close()
+        self.simple_tsv_fh.close()
+
 
 def read_annotations(annotations, type, file_name):
     if not os.path.isfile(file_name):
@@ -678,7 +714,6 @@ def main(argv=None):
     es_host = 'localhost:9200'
 
     es = Elasticsearch([es_host], timeout=600)
-    es_summary = init_es(es_host, es_index_summary)
 
     logger.setLevel(logging.INFO)
     ch.setLevel(logging.WARN)
@@ -732,93 +767,35 @@ def main(argv=None):
 
     
 
-    for dtype in ['release', 'whitelist','blacklist', 'graylist']:
-        if dtype == 'release':
-            donor_fh = open(metadata_dir+'/reports/'+release_name+'.jsonl', 'w') 
-            pilot_tsv_fh = open(metadata_dir + '/reports/'+release_name+'.tsv', 'w') 
-            simple_tsv_fh = open(metadata_dir + '/reports/'+release_name+'_entry.tsv', 'w') 
-            donors_list = donor_ids_to_be_included
-        elif dtype in ['blacklist', 'graylist']:
-            donor_fh = open(metadata_dir+'/reports/'+release_name+'.'+dtype+'ed_donors.jsonl', 'w') 
-            pilot_tsv_fh = open(metadata_dir + '/reports/'+release_name+'.'+dtype+'ed_donors.tsv', 'w') 
-            simple_tsv_fh = open(metadata_dir + '/reports/'+release_name+'_entry.'+dtype+'ed_donors.tsv', 'w') 
-            donors_list = annotations.get(dtype)            
-        else:
-            donor_fh = open(metadata_dir+'/reports/'+release_name+'.whitelisted_donors.jsonl', 'w')
-            pilot_tsv_fh = open(metadata_dir + '/reports/'+release_name+'.whitelisted_donors.tsv', 'w')
-            simple_tsv_fh = open(metadata_dir + '/reports/'+release_name+'_entry.whitelisted_donors.tsv', 'w')
-            # exclude the donors if they were specified on the exclude_donor_id_lists
-            donors_list = donor_ids_to_be_included.difference(donor_ids_to_be_excluded)
-
-        donors_list = sorted(donors_list)  
-        simple_release_tsv = []        
-        # get json doc for each donor and reorganize it
-        header = True 
-        for donor_unique_id in donors_list:    
-            es_json = get_donor_json(es, es_index, donor_unique_id)
-
-            if not es_json: continue
-            
-            reorganized_donor = create_reorganized_donor(donor_unique_id, es_json, vcf, gnos_ids_to_be_excluded, gnos_ids_to_be_included, annotations)
-
-            # push to Elasticsearch
-            if dtype == 'release':
-                es_summary.index(index=es_index_summary, doc_type=es_type, id=reorganized_donor['donor_unique_id'], body=json.loads(json.dumps(reorganized_donor, default=set_default)), timeout=90 )
-
-            donor_fh.write(json.dumps(reorganized_donor, default=set_default) + '\n')
-
-            # generate simple tsv from reorganized donor
-            simple_release_tsv = generate_simple_release_tsv(reorganized_donor, simple_release_tsv, vcf)
-
-            # generate json for tsv file from reorganized donor
-            pilot_tsv_json = generate_tsv_file(reorganized_donor, vcf, annotations)
-            # write to the tsv file
-            if header:
-                pilot_tsv_fh.write('\t'.join(pilot_tsv_json.keys()) + '\n')
-                header = False 
-            line = []
-            for p in pilot_tsv_json.keys():
-                if isinstance(pilot_tsv_json.get(p), list):
-                    field = []
-                    for q in pilot_tsv_json.get(p):
-                        if isinstance(q, list):
-                            field.append('|'.join(q))
-                        elif q is None:
-                            field.append('')
-                        else:
-                            field.append(str(q))
-                    line.append(','.join(field))
-
-                elif pilot_tsv_json.get(p) is None:
-                    line.append('')
-                else:
-                    line.append(str(pilot_tsv_json.get(p)))
+    # every view gets its own files, donors are fetched and reorganized once and written to all their views
+    views = [
+        ReleaseView(metadata_dir+'/reports/', release_name, '', donor_ids_to_be_included),
+        ReleaseView(metadata_dir+'/reports/', release_name, '.whitelisted_donors', donor_ids_to_be_included.difference(donor_ids_to_be_excluded)),
+        ReleaseView(metadata_dir+'/reports/', release_name, '.blacklisted_donors', annotations.get('blacklist')),
+        ReleaseView(metadata_dir+'/reports/', release_name, '.graylisted_donors', annotations.get('graylist'))
+    ]
 
-            pilot_tsv_fh.write('\t'.join(line) + '\n')
-            
-        pilot_tsv_fh.close()
-
-        donor_fh.close()
-
-        header = True 
-        for r in simple_release_tsv:
-            if header:
-                simple_tsv_fh.write('\t'.join(r.keys()) + '\n')
-                header = False 
-            # make the list of output from dict
-            line = []
-            for p in r.keys():
-                if isinstance(r.get(p), list):
-                    line.append('|'.join(r.get(p)))
-                elif isinstance(r.get(p), set):
-                    line.append('|'.join(list(r.get(p))))
-                elif r.get(p) is None:
-                    line.append('')
-                else:
-                    line.append(str(r.get(p)))
-            simple_tsv_fh.write('\t'.join(line) + '\n') 
-            
-        simple_tsv_fh.close() 
+    for donor_unique_id in sorted(set().union(*[v.donors for v in views])):
+        es_json = get_donor_json(es, es_index, donor_unique_id)
+
+        if not es_json: continue
+        
+        reorganized_donor = create_reorganized_donor(donor_unique_id, es_json, vcf, gnos_ids_to_be_excluded, gnos_ids_to_be_included, annotations)
+        donor_json = json.dumps(reorganized_donor, default=set_default)
+
+        # generate json for tsv file from reorganized donor
+        pilot_tsv_json = generate_tsv_file(reorganized_donor, vcf, annotations)
+        pilot_tsv_line = format_pilot_tsv_line(pilot_tsv_json)
+
+        for view in views:
+            if donor_unique_id in view.donors:
+                view.write(reorganized_donor, donor_json, pilot_tsv_json.keys(), pilot_tsv_line, vcf)
+
+    for view in views: view.close()
+
+    # push the release to Elasticsearch: bulk load into a fresh index and swap it in behind the pcawg_summary alias
+    with open(views[0].donor_file, 'r') as f:
+        load_into_alias(es, es_index_summary, es_type, 'pcawg_summary.mapping.json', f, 'donor_unique_id')
 
     return 0
 
@@ -13,6 +13,7 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from collections import OrderedDict
 import datetime
 import dateutil.parser
@@ -22,6 +23,9 @@ import hashlib
 import xml.dom.minidom
 import shutil
 import requests
+from gnos_repo_registry import get_formal_repo_name
+from metadata_xml_digest import generate_md5_size
+from icgc_object_id import ObjectIdResolver
 
 id_service_token = os.environ.get('ICGC_TOKEN')
 icgc_project_code = os.environ.get('ICGC_PROJECT_CODE')
@@ -29,6 +33,11 @@ icgc_project_code = os.environ.get('ICGC_PROJECT_CODE')
 logger = logging.getLogger('Transfer json generator')
 ch = logging.StreamHandler()
 
+# ICGC object ids, cached locally and resolved per donor
+object_id_resolver = ObjectIdResolver(token=id_service_token, logger=logger)
+# (json file, transfer json) of the donor's jobs waiting for their object ids
+pending_jobs = []
+
 es_queries = [
   {
     "fields": "donor_unique_id", 
@@ -160,76 +169,8 @@ def get_source_repo_index_pos (available_repos, chosen_gnos_repo=None):
     return None
 
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "https://gtrepo-bsc.annailabs.com/",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "https://gtrepo-ebi.annailabs.com/",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "https://cghub.ucsc.edu/",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "https://gtrepo-dkfz.annailabs.com/",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "https://gtrepo-riken.annailabs.com/",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "https://gtrepo-osdc-icgc.annailabs.com/",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "https://gtrepo-osdc-tcga.annailabs.com/",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "https://gtrepo-etri.annailabs.com/"
-    }
-
-    return repo_url_to_repo.get(repo)
-
-
-def generate_md5_size(metadata_xml_file):
-    with open (metadata_xml_file, 'r') as x: data = x.read()
-    data = re.sub(r'<ResultSet .+?>', '<ResultSet>', data)
-
-    with open('tmp.xml', 'w') as f: f.write(data)
-
-    xml_md5 = hashlib.md5(data).hexdigest()
-    xml_size = os.path.getsize('tmp.xml')
-
-    return [xml_md5, xml_size]
-
-
 def generate_object_id(filename, gnos_id, project_code):
-    global id_service_token
-    url = 'https://meta.icgc.org/entities'
-    # try get request first
-    r = requests.get(url + '?gnosId=' + gnos_id + '&fileName=' + filename,
-                       headers={'Content-Type': 'application/json'})
-    if not r or not r.ok:
-        logger.warning('GET request unable to access metadata service: {}'.format(url))
-        return ''
-    elif r.json().get('totalElements') == 1:
-        logger.info('GET request got the id')
-        return r.json().get('content')[0].get('id')
-    elif r.json().get('totalElements') > 1:
-        logger.warning('GET request to metadata service return multiple matches for gnos_id: {} and filename: {}'
-                          .format(gnos_id, filename))
-        return ''
-    elif id_service_token:  # no match then try post to create
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': 'Bearer ' + id_service_token
-        }
-        body = {
-            "gnosId": gnos_id,
-            "fileName": filename,
-            "projectCode": project_code,
-            "access": "controlled"
-        }
-        r = requests.post(url, data=json.dumps(body), headers=headers)
-        if not r or not r.ok:
-            logger.warning('POST request failed')
-            return ''
-        return r.json().get('id')
-    else:
-        logger.info('No luck, generate FAKE ID')
-        return ''
+    return object_id_resolver.defer(filename, gnos_id, project_code)
 
 def add_wgs_normal_specimen(es_json, gnos_ids_to_be_included, gnos_ids_to_be_excluded, chosen_gnos_repo, jobs_dir):
     aliquot = es_json.get('normal_alignment_status')
@@ -248,10 +189,11 @@ def add_metadata_xml_info(obj, project_code, chosen_gnos_repo=None):
     ao_updated = obj.get('gnos_last_modified')[ get_source_repo_index_pos(obj.get('gnos_repo'), chosen_gnos_repo) ].encode('utf8')
     ao_updated = str.split(ao_updated, '+')[0] + 'Z'
     metadata_xml_file = 'gnos_metadata/__all_metadata_xml/' + repo + '/' + gnos_id + '__' + ao_state + '__' + ao_updated + '.xml'
+    xml_md5, xml_size = generate_md5_size(metadata_xml_file)
     metadata_xml_file_info = {
         'file_name': gnos_id + '.xml',
-        'file_md5sum': generate_md5_size(metadata_xml_file)[0],
-        'file_size': generate_md5_size(metadata_xml_file)[1],
+        'file_md5sum': xml_md5,
+        'file_size': xml_size,
         'object_id': generate_object_id(gnos_id+'.xml', gnos_id, project_code) if project_code else None
     }
 
@@ -572,9 +514,9 @@ def get_donor_json(es, es_index, donor_unique_id):
 
 def get_donors_list(es, es_index, es_queries):
     q_index = 0
-    response = es.search(index=es_index, body=es_queries[q_index])
+    hits = scan_hits(es, es_index, es_queries[q_index])
     donors_list = set()
-    for p in response['hits']['hits']:
+    for p in hits:
         donors_list.add(p.get('fields').get('donor_unique_id')[0])
     return donors_list 
 
@@ -605,8 +547,16 @@ def write_s3_transfer_json(jobs_dir, transfer_json, gnos_ids_to_be_excluded):
 
         json_name = '.'.join(json_name_list)
         json_name_new = json_name.replace(' ', '__')
-        with open(jobs_dir + '/' + json_name_new, 'w') as w:
+        pending_jobs.append((jobs_dir + '/' + json_name_new, transfer_json))
+
+
+def write_pending_jobs():
+    # the object ids of all the jobs of a donor are resolved in one batch before writing
+    object_id_resolver.resolve([transfer_json for json_file, transfer_json in pending_jobs])
+    for json_file, transfer_json in pending_jobs:
+        with open(json_file, 'w') as w:
             w.write(json.dumps(transfer_json, indent=4, sort_keys=True))
+    del pending_jobs[:]
 
 
 def generate_id_list(id_lists):
@@ -745,7 +695,7 @@ def main(argv=None):
     # get json doc for each donor 
     for donor_unique_id in donors_list:     
         
-    	es_json = get_donor_json(es, es_index, donor_unique_id)
+        es_json = get_donor_json(es, es_index, donor_unique_id)
 
         if seq and 'wgs' in seq:
             add_wgs_normal_specimen(es_json, gnos_ids_to_be_included, gnos_ids_to_be_excluded, chosen_gnos_repo, jobs_dir)
@@ -761,7 +711,9 @@ def main(argv=None):
         if consensus:
             add_consensus_calling(es_json, gnos_ids_to_be_included, gnos_ids_to_be_excluded, chosen_gnos_repo, jobs_dir, consensus)
 
-    if os.path.isfile('tmp.xml'): os.remove('tmp.xml')
+        write_pending_jobs()
+
+    object_id_resolver.close()
 
     return 0
 
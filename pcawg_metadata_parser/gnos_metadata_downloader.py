@@ -14,6 +14,7 @@ import logging
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 import time
+from xml_attribute_index import XmlAttributeIndex
 
 
 logger = logging.getLogger('gnos parser')
@@ -90,7 +91,7 @@ def is_blacklisted_ao_uuid(ao_uuid):
     return ao_uuid in blacklist
 
 
-def download_metadata_xml(gnos_repo, ao_uuid, metadata_xml_dir, ao_list_file_handler):
+def download_metadata_xml(gnos_repo, ao_uuid, metadata_xml_dir, ao_list_file_handler, attribute_index):
 
     if is_blacklisted_ao_uuid(ao_uuid):
         logger.warning('skip blacklisted item for: {} from {}'.format(ao_uuid, gnos_repo.get('base_url')))
@@ -119,9 +120,14 @@ def download_metadata_xml(gnos_repo, ao_uuid, metadata_xml_dir, ao_list_file_han
         metadata_xml_file = metadata_xml_dir + '/' + ao_uuid + '__' + ao_state + '__' + ao_updated + '.xml'
         with open(metadata_xml_file, 'w') as f:  # write to metadata xml file now
             f.write(metadata_xml_str.encode('utf8'))
+        # a file not indexed here is picked up as a cached file by the update pass of the next run
+        try:
+            attribute_index.add(gnos_ao, metadata_xml_file, metadata_xml_str.encode('utf8'))
+        except Exception as e:
+            logger.warning('unable to add metadata xml: {} to the attribute index, error: {}'.format(metadata_xml_file, e))
 
 
-def sync_metadata_xml(gnos_repo, output_dir, manifest_file):
+def sync_metadata_xml(gnos_repo, output_dir, manifest_file, attribute_index):
     logger.info('synchronize metadata xml with GNOS repo: {}'.format(gnos_repo.get('repo_code')))
 
     metadata_xml_dir = output_dir + '/__all_metadata_xml/' + gnos_repo.get('repo_code')
@@ -131,6 +137,7 @@ def sync_metadata_xml(gnos_repo, output_dir, manifest_file):
     ao_list_file = manifest_file.replace('manifest.', 'analysis_objects.').replace('.xml', '.tsv')
     fh = open(ao_list_file, 'w')  # file for list of gnos analysis objects
 
+    cached_xml_files = []
     for gnos_ao in get_ao_from_manifest(manifest_file):
         ao_uuid = gnos_ao.get('analysis_id')
         ao_state = gnos_ao.get('state')
@@ -139,13 +146,21 @@ def sync_metadata_xml(gnos_repo, output_dir, manifest_file):
 
         if os.path.isfile(metadata_xml_file):
             fh.write(ao_uuid + '\t' + ao_state + '\t' + ao_updated + '\n')
+            cached_xml_files.append(metadata_xml_file)
         else:  # do not have it locally, donwload from GNOS repo
-            download_metadata_xml(gnos_repo, ao_uuid, metadata_xml_dir, fh)
+            download_metadata_xml(gnos_repo, ao_uuid, metadata_xml_dir, fh, attribute_index)
 
     fh.close()
 
+    # index the cached xml files not indexed yet, downloaded ones are indexed as they are written
+    try:
+        count = attribute_index.update(cached_xml_files)
+        if count: logger.info('added {} cached metadata xml to the attribute index for GNOS repo: {}'.format(count, gnos_repo.get('repo_code')))
+    except Exception as e:
+        logger.warning('unable to update the attribute index for GNOS repo: {}, error: {}'.format(gnos_repo.get('repo_code'), e))
+
 
-def process_gnos_repo(gnos_repo, output_dir, mani_output_dir, cache_repos):
+def process_gnos_repo(gnos_repo, output_dir, mani_output_dir, cache_repos, attribute_index):
     logger.info('processing GNOS repo: {}'.format(gnos_repo.get('repo_code')))
 
     manifest = ''
@@ -156,7 +171,7 @@ def process_gnos_repo(gnos_repo, output_dir, mani_output_dir, cache_repos):
         if not manifest_file: manifest_file = use_previous_manifest(gnos_repo, output_dir, mani_output_dir)
 
     if manifest_file:
-        sync_metadata_xml(gnos_repo, output_dir, manifest_file)
+        sync_metadata_xml(gnos_repo, output_dir, manifest_file, attribute_index)
 
 
 def main(argv=None):
@@ -202,8 +217,13 @@ def main(argv=None):
     logger.addHandler(fh)
     logger.addHandler(ch)
 
+    if not os.path.exists(output_dir + '/__all_metadata_xml'): os.makedirs(output_dir + '/__all_metadata_xml')
+    attribute_index = XmlAttributeIndex(output_dir + '/__all_metadata_xml/xml_attribute_index.sqlite')
+
     for g in conf.get('gnos_repos'):
-        process_gnos_repo(g, output_dir, mani_output_dir, cache_repos)
+        process_gnos_repo(g, output_dir, mani_output_dir, cache_repos, attribute_index)
+
+    attribute_index.close()
 
     return 0
 
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+# Single registry of GNOS repos, loaded once from settings.yml. Each repo is
+# interned as a small integer id, with O(1) lookups between the id, the repo
+# code (eg, 'ebi') and the repo base url (eg, 'https://gtrepo-ebi.annailabs.com/').
+
+import os
+import yaml
+
+
+settings_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'settings.yml')
+
+
+class GnosRepoRegistry(object):
+
+    def __init__(self, gnos_repos):
+        self.repo_codes = []
+        self.repo_urls = []
+        self._repo_ids = {}
+
+        for r in gnos_repos:
+            repo_id = len(self.repo_codes)
+            self.repo_codes.append(r.get('repo_code'))
+            self.repo_urls.append(r.get('base_url'))
+            self._repo_ids[r.get('repo_code')] = repo_id
+            self._repo_ids[r.get('base_url')] = repo_id
+
+    def repo_id(self, repo):
+        # accepts either repo code or repo url
+        return self._repo_ids.get(repo)
+
+    def repo_code(self, repo):
+        repo_id = repo if isinstance(repo, int) else self._repo_ids.get(repo)
+        return self.repo_codes[repo_id] if repo_id is not None else None
+
+    def repo_url(self, repo):
+        repo_id = repo if isinstance(repo, int) else self._repo_ids.get(repo)
+        return self.repo_urls[repo_id] if repo_id is not None else None
+
+    def formal_repo_name(self, repo):
+        # repo url is translated to repo code and vice versa
+        repo_id = self._repo_ids.get(repo)
+        if repo_id is None: return None
+        return self.repo_codes[repo_id] if repo == self.repo_urls[repo_id] else self.repo_urls[repo_id]
+
+    def repo_url_from_uri(self, uri):
+        # eg, https://gtrepo-ebi.annailabs.com/cghub/metadata/analysisDetail/<uuid> => https://gtrepo-ebi.annailabs.com/
+        repo_url = uri[:uri.find('/cghub/')] + '/'
+        repo_id = self._repo_ids.get(repo_url)
+        return self.repo_urls[repo_id] if repo_id is not None else repo_url  # share the registry's string when known
+
+
+def load_registry(conf_file=settings_file):
+    with open(conf_file) as f:
+        conf = yaml.safe_load(f)
+
+    # retired repos are no longer synchronized but still show up in older metadata
+    return GnosRepoRegistry(conf.get('gnos_repos') + (conf.get('retired_gnos_repos') or []))
+
+
+registry = load_registry()
+
+
+def get_formal_repo_name(repo):
+    return registry.formal_repo_name(repo)
+
+
+def get_repo_code(repo):
+    return registry.repo_code(repo)
+
+
+def get_repo_url_from_uri(uri):
+    return registry.repo_url_from_uri(uri)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+# Parallel scan over the cached GNOS metadata xml files. Each xml is read and
+# parsed once in a worker process, and the effective xml md5sum is only
+# computed when asked for. A process function can run in the workers too, so
+# only its (small) result is sent back. Results come back in the order of the
+# xml files.
+
+from multiprocessing import Pool, cpu_count
+from parse_gnos_xml import parse_gnos_analysis
+
+
+def _scan_one(task):
+    f, effective_md5, process_fn, with_xml = task
+    with open (f, 'r') as x: xml_str = x.read()
+
+    gnos_analysis = parse_gnos_analysis(xml_str, effective_md5)
+    if not gnos_analysis: return None
+
+    if not process_fn: return gnos_analysis
+    return process_fn(gnos_analysis, f, xml_str) if with_xml else process_fn(gnos_analysis)
+
+
+def scan_xml_files(xml_files, process_fn=None, effective_md5=False, workers=None, chunksize=64, with_xml=False):
+    # process_fn has to be a module level function, so it can be sent to the workers,
+    # with_xml: process_fn also gets the xml file name and the raw xml string
+    pool = Pool(workers or cpu_count())
+    try:
+        tasks = ((f, effective_md5, process_fn, with_xml) for f in xml_files)
+        for result in pool.imap(_scan_one, tasks, chunksize):
+            if result is not None: yield result
+    finally:
+        pool.close()
+        pool.join()
+
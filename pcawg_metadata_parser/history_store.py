@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# Append-only store of per-day counts (per compute site, per repo etc) used by
+# the history reports. Counts live in one sqlite table keyed by
+# (series, date, key), so each run only needs to add its own day instead of
+# re-reading every earlier report, and cumulative sums are produced in a
+# single running pass over the days.
+
+import sqlite3
+import datetime
+from collections import OrderedDict
+
+
+class DailyCountStore(object):
+
+    def __init__(self, db_file):
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS daily_counts ('
+                          'series TEXT, date TEXT, key TEXT, count INTEGER, '
+                          'PRIMARY KEY (series, date, key))')
+        self.conn.commit()
+
+    def has_series(self, series):
+        return self.conn.execute('SELECT 1 FROM daily_counts WHERE series = ? LIMIT 1', (series, )).fetchone() is not None
+
+    def update(self, series, date, counts):
+        # counts: key => count, replaces whatever was stored for the day
+        with self.conn:
+            self.conn.execute('DELETE FROM daily_counts WHERE series = ? AND date = ?', (series, date))
+            self.conn.executemany('INSERT INTO daily_counts VALUES (?, ?, ?, ?)',
+                                  [(series, date, k, v) for k, v in counts.items()])
+
+    def get_daily_counts(self, series, end_date=None):
+        daily_counts = OrderedDict()
+        query = 'SELECT date, key, count FROM daily_counts WHERE series = ?'
+        params = [series]
+        if end_date:
+            query += ' AND date <= ?'
+            params.append(end_date)
+        for date, key, count in self.conn.execute(query + ' ORDER BY date', params):
+            daily_counts.setdefault(str(date), {})[str(key)] = count
+        return daily_counts
+
+    def close(self):
+        self.conn.close()
+
+
+def cumulative_counts(daily_counts, keys, start_date, end_date):
+    # one row per day from start_date up to (not including) end_date:
+    # [date, cumulative count of each key ...], days without counts carry the running sums over
+    rows = []
+    sums = [0] * len(keys)
+    step = datetime.timedelta(days=1)
+    d = start_date
+    while d < end_date:
+        date = d.strftime("%Y-%m-%d")
+        counts = daily_counts.get(date)
+        if counts:
+            sums = [s + counts.get(k, 0) for s, k in zip(sums, keys)]
+        rows.append([date] + sums)
+        d += step
+    return rows
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+# Resolves ICGC object ids of GNOS files through the metadata entity service.
+# Resolved ids are kept in a persistent local cache keyed by (gnos_id, file_name).
+# Ids not yet cached can be deferred while the transfer jobs are built and
+# resolved for all the jobs a donor ships at once, with the lookups sent
+# concurrently through one pooled http session.
+
+import os
+import json
+import logging
+import threading
+import requests
+from multiprocessing.pool import ThreadPool
+
+
+entity_service_url = os.environ.get('ICGC_ENTITY_SERVICE_URL', 'https://meta.icgc.org/entities')
+object_id_cache_file = 'gnos_metadata/icgc_object_ids.tsv'
+
+
+class PendingObjectId(object):
+    # stands in the job json for an object id not looked up yet
+
+    __slots__ = ('key', 'project_code')
+
+    def __init__(self, key, project_code=None):
+        self.key = key
+        self.project_code = project_code
+
+
+class ObjectIdResolver(object):
+
+    def __init__(self, url=entity_service_url, token=None, cache_file=object_id_cache_file, workers=16, logger=None):
+        self.logger = logger or logging.getLogger('icgc object id')
+        self.url = url
+        self.token = token
+        self.cache_file = cache_file
+        self.workers = workers
+
+        self._object_ids = {}
+        self._not_found = set()  # keys the GET lookup found no match for, POST is needed to create them
+        self._lock = threading.Lock()
+        self._pool = None
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_file or not os.path.isfile(self.cache_file): return
+        with open(self.cache_file, 'r') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != 3 or not fields[2]: continue
+                self._object_ids[(fields[0], fields[1])] = fields[2]
+
+    def _cache(self, key, object_id):
+        with self._lock:
+            self._object_ids[key] = object_id
+            if not self.cache_file: return
+            with open(self.cache_file, 'a') as f:
+                f.write('\t'.join([key[0], key[1], object_id]) + '\n')
+
+    def _lookup(self, key):
+        # GET only, returns the id, None when there is no match, '' on failure
+        gnos_id, filename = key
+        try:
+            r = self.session.get(self.url, params={'gnosId': gnos_id, 'fileName': filename},
+                                   headers={'Content-Type': 'application/json'})
+        except requests.exceptions.RequestException:
+            r = None
+        if not r or not r.ok:
+            self.logger.warning('GET request unable to access metadata service: {}'.format(self.url))
+            return ''
+        elif r.json().get('totalElements') == 1:
+            self.logger.info('GET request got the id')
+            return r.json().get('content')[0].get('id')
+        elif r.json().get('totalElements') > 1:
+            self.logger.warning('GET request to metadata service return multiple matches for gnos_id: {} and filename: {}'
+                              .format(gnos_id, filename))
+            return ''
+        return None
+
+    def _create(self, key, project_code=None):
+        gnos_id, filename = key
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': 'Bearer ' + self.token
+        }
+        body = {
+            "gnosId": gnos_id,
+            "fileName": filename
+        }
+        if project_code:
+            body.update({
+                "projectCode": project_code,
+                "access": "controlled"
+            })
+        try:
+            r = self.session.post(self.url, data=json.dumps(body), headers=headers)
+        except requests.exceptions.RequestException:
+            r = None
+        if not r or not r.ok:
+            self.logger.warning('POST request failed')
+            return ''
+        return r.json().get('id')
+
+    def _prefetch_one(self, key):
+        object_id = self._lookup(key)
+        if object_id:
+            self._cache(key, object_id)
+        elif object_id is None:
+            with self._lock: self._not_found.add(key)
+
+    def prefetch(self, keys):
+        keys = set(k for k in keys if not k in self._object_ids and not k in self._not_found)
+        if not keys: return
+        if not self._pool: self._pool = ThreadPool(self.workers)
+        self._pool.map(self._prefetch_one, keys)
+
+    def defer(self, filename, gnos_id, project_code=None):
+        key = (gnos_id, filename)
+        if key in self._object_ids: return self._object_ids.get(key)
+        return PendingObjectId(key, project_code)
+
+    def resolve(self, obj):
+        # replaces the pending object ids in obj, the ones not cached are looked up in one concurrent batch
+        pending = find_pending_object_ids(obj, [])
+        self.prefetch([p.key for container, k, p in pending])
+        for container, k, p in pending:
+            container[k] = self.get(p.key[1], p.key[0], p.project_code)
+        return obj
+
+    def get(self, filename, gnos_id, project_code=None):
+        key = (gnos_id, filename)
+        if key in self._object_ids: return self._object_ids.get(key)
+
+        object_id = None if key in self._not_found else self._lookup(key)
+        if object_id is None:
+            if not self.token:
+                self.logger.info('No luck, generate FAKE ID')
+                return ''
+            object_id = self._create(key, project_code)  # no match then try post to create
+            with self._lock: self._not_found.discard(key)
+
+        if object_id: self._cache(key, object_id)
+        return object_id
+
+    def close(self):
+        if self._pool:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        self.session.close()
+
+
+def find_pending_object_ids(obj, pending):
+    # (container, key or index, PendingObjectId) of every pending id in the dicts and lists of obj
+    items = obj.iteritems() if isinstance(obj, dict) else enumerate(obj) if isinstance(obj, list) else ()
+    for k, v in items:
+        if isinstance(v, PendingObjectId):
+            pending.append((obj, k, v))
+        elif isinstance(v, (dict, list)):
+            find_pending_object_ids(v, pending)
+    return pending
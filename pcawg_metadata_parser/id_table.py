@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# Dense integer ids for the string ids the gnos parser looks up over and over
+# (donor_unique_id, aliquot and gnos analysis ids). Every distinct string gets
+# the next integer once, project scoped ids are cached by their
+# (dcc_project_code, submitter_id) pair so the '::' joined string is built
+# only the first time, and annotation lists are kept as bitmaps over the
+# integers, so a membership check is an index into a bytearray.
+
+
+class IdTable(object):
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.pair_ids = {}
+
+    def intern(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def intern_pair(self, dcc_project_code, submitter_id):
+        key = (dcc_project_code, submitter_id)
+        i = self.pair_ids.get(key)
+        if i is None:
+            i = self.pair_ids[key] = self.intern(dcc_project_code + '::' + submitter_id)
+        return i
+
+    def get(self, name):
+        # does not assign, an id never interned is in no bitmap
+        return self.ids.get(name)
+
+    def name(self, i):
+        # the one string object kept for the id, shared by every dict keyed with it
+        return self.names[i]
+
+    def __len__(self):
+        return len(self.names)
+
+
+class IdBitmap(object):
+
+    def __init__(self, ids=()):
+        self.bits = bytearray()
+        self.count = 0
+        for i in ids: self.add(i)
+
+    def add(self, i):
+        byte, mask = i >> 3, 1 << (i & 7)
+        if byte >= len(self.bits):
+            self.bits.extend(bytearray(byte + 1 - len(self.bits)))
+        if not self.bits[byte] & mask:
+            self.bits[byte] |= mask
+            self.count += 1
+
+    def __contains__(self, i):
+        if i is None: return False
+        byte = i >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (i & 7)))
+
+    def __iter__(self):
+        for byte, value in enumerate(self.bits):
+            if not value: continue
+            for b in range(8):
+                if value & (1 << b): yield (byte << 3) + b
+
+    def __len__(self):
+        return self.count
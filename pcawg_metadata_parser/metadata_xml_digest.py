@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+# md5sum and size of the metadata xml (with the ResultSet attributes removed)
+# as shipped in transfer jobs. Results are memoized in memory and persisted in
+# a digest cache keyed by the cached xml file name, which already carries the
+# entry's last_modified, so an xml is only ever hashed once across runs.
+
+import os
+import re
+import hashlib
+
+
+digest_cache_file = 'gnos_metadata/__all_metadata_xml/metadata_xml_md5_size.tsv'
+
+_digests = None
+
+
+def _load_digests():
+    global _digests
+    _digests = {}
+    if not os.path.isfile(digest_cache_file): return
+
+    with open(digest_cache_file, 'r') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) != 3: continue  # ignore line partially written by an interrupted run
+            _digests[fields[0]] = [fields[1], int(fields[2])]
+
+
+def _save_digest(metadata_xml_file, md5_size):
+    # one short line per append, so concurrent runs can share the cache file
+    with open(digest_cache_file, 'a') as f:
+        f.write('\t'.join([metadata_xml_file, md5_size[0], str(md5_size[1])]) + '\n')
+
+
+def generate_md5_size(metadata_xml_file):
+    if _digests is None: _load_digests()
+
+    if not metadata_xml_file in _digests:
+        with open (metadata_xml_file, 'r') as x: data = x.read()
+        data = re.sub(r'<ResultSet .+?>', '<ResultSet>', data)
+
+        _digests[metadata_xml_file] = [hashlib.md5(data).hexdigest(), len(data)]
+        _save_digest(metadata_xml_file, _digests[metadata_xml_file])
+
+    return _digests[metadata_xml_file]
@@ -17,16 +17,37 @@ from elasticsearch1 import Elasticsearch
 from collections import OrderedDict
 import datetime
 import dateutil.parser
-from itertools import izip
+from itertools import izip, dropwhile
 from distutils.version import LooseVersion
 import csv
 import hashlib
+from gnos_repo_registry import get_repo_url_from_uri
+from qc_prioritization import assess_donor as assess_donor_qc, report_fields as qc_report_fields
+from report_writer import TsvWriter
+from id_table import IdTable, IdBitmap
+from run_stats import RunStats, StackSampler
 
 logger = logging.getLogger('gnos parser')
 # create console handler with a higher log level
 ch = logging.StreamHandler()
-latest_release = 'may2016'
-previous_releases = ['mar2016','oct2015', 'aug2015', 'santa_cruz']
+# phase timings and counters of the run, written next to the log file
+run_stats = RunStats()
+releases = ['santa_cruz', 'aug2015', 'oct2015', 'mar2016', 'may2016']  # oldest first, new releases are appended
+latest_release = releases[-1]
+previous_releases = releases[-2::-1]
+
+# gnos_id lists every entry is checked against, one bit each in annotations['gnos_id_membership']
+membership_lists = releases + ['s3_transfer_scheduled', 's3_transfer_completed']
+membership_bit = dict((m, 1 << i) for i, m in enumerate(membership_lists))
+membership_flags = ['is_'+r+'_entry' for r in releases] + ['is_s3_transfer_scheduled', 'is_s3_transfer_completed']
+release_entry_flags = membership_flags[:len(releases)]
+
+# an additional aligned BAM of the same aliquot replaces the one in use when it is in any of
+# these lists, newest release first, scheduled s3 transfers rank right above aug2015
+replacing_memberships = releases[:1:-1] + ['s3_transfer_scheduled'] + releases[1::-1]
+replacing_membership_bits = [(membership_bit[m], 'scheduled for S3 transfer' if m.startswith('s3_') else 'in '+m)
+                                for m in replacing_memberships]
+replacing_membership_mask = sum(bit for bit, label in replacing_membership_bits)
 
 
 def init_es(es_host, es_index):
@@ -50,7 +71,7 @@ def process_gnos_analysis(gnos_analysis, donors, vcf_entries, es_index, es, bam_
   analysis_attrib = get_analysis_attrib(gnos_analysis)
 
   if analysis_attrib and analysis_attrib.get('variant_workflow_name'):  # variant call gnos entry
-    donor_unique_id = analysis_attrib.get('dcc_project_code') + '::' + analysis_attrib.get('submitter_donor_id')
+    donor_unique_id = get_donor_unique_id(analysis_attrib, annotations)
 
     if is_in_donor_blacklist(donor_unique_id):
         logger.warning('ignore blacklisted donor: {} GNOS entry: {}'
@@ -130,7 +151,7 @@ def process_gnos_analysis(gnos_analysis, donors, vcf_entries, es_index, es, bam_
                          .format(gnos_analysis.get('analysis_detail_uri').replace('analysisDetail', 'analysisFull') ))
         return
 
-    donor_unique_id = analysis_attrib.get('dcc_project_code') + '::' + analysis_attrib.get('submitter_donor_id')
+    donor_unique_id = get_donor_unique_id(analysis_attrib, annotations)
 
     #disable this check for specimen and sample for now as we are still fixing these IDs
     #for id_type in ['donor', 'specimen', 'sample']:
@@ -262,9 +283,8 @@ def process_gnos_analysis(gnos_analysis, donors, vcf_entries, es_index, es, bam_
             donors.get(donor_unique_id).get('flags')['all_tumor_specimen_aliquot_counts'] = len(donors.get(donor_unique_id).get('all_tumor_specimen_aliquots'))
             if bam_file.get('is_aligned'):
                 if donors.get(donor_unique_id).get('aligned_tumor_specimens'):
-                    if donors.get(donor_unique_id).get('aligned_tumor_specimen_aliquots').intersection(
-                            [ bam_file.get('aliquot_id') ]
-                        ): # multiple alignments for the same tumor aliquot_id
+                    if bam_file.get('aliquot_id') in donors.get(donor_unique_id).get('aligned_tumor_specimen_aliquots'):
+                        # multiple alignments for the same tumor aliquot_id
                         logger.warning('more than one tumor aligned bam for donor: {} with aliquot_id: {}, additional entry found in: {}'
                               .format(donor_unique_id,
                                   bam_file.get('aliquot_id'),
@@ -301,18 +321,38 @@ def process_gnos_analysis(gnos_analysis, donors, vcf_entries, es_index, es, bam_
     bam_output_fh.write(json.dumps(bam_file, default=set_default) + '\n')
 
 
+def get_donor_unique_id(analysis_attrib, annotations):
+    donor_ids = annotations['ids']['donor']
+    return donor_ids.name(donor_ids.intern_pair(analysis_attrib.get('dcc_project_code'), analysis_attrib.get('submitter_donor_id')))
+
+
 def is_in_aliquot_blacklist(aliquot_id, annotations):
-    if annotations.get('aliquot_blacklist') and aliquot_id in annotations.get('aliquot_blacklist'):
+    if annotations.get('aliquot_blacklist') and annotations['ids']['aliquot'].get(aliquot_id) in annotations.get('aliquot_blacklist'):
         return True
     else:
         return False
 
 
 def is_in_pcawg_final_list(dcc_project_code, pcawg_id, id_type, annotations):
-    if annotations.get('pcawg_final_list').get(id_type).intersection([dcc_project_code+'::'+pcawg_id]):
-        return True
-    else:
-        return False
+    return annotations['ids'][id_type].intern_pair(dcc_project_code, pcawg_id) in annotations.get('pcawg_final_list').get(id_type)
+
+
+def get_entry_flags(gnos_analysis, annotations):
+    # release and s3 transfer flags shared by vcf and bam entries, all from one lookup
+    mask = annotations['gnos_id_membership'].get(gnos_analysis.get('analysis_id'), 0)
+    return dict((f, bool(mask & (1 << i))) for i, f in enumerate(membership_flags))
+
+
+def copy_membership_flags(entry, source, flags=membership_flags):
+    for f in flags: entry[f] = source.get(f)
+    return entry
+
+
+def get_replacing_membership(mask):
+    # how the entry ranks in replacing_memberships, None if it is in none of them
+    if not mask & replacing_membership_mask: return None
+    for bit, label in replacing_membership_bits:
+        if mask & bit: return label
 
 
 
@@ -436,19 +476,12 @@ def create_vcf_entry(donor_unique_id, analysis_attrib, gnos_analysis, annotation
         #'analysis_attrib': analysis_attrib, # remove this later
         #'gnos_analysis': gnos_analysis, # remove this later
         "gnos_id": gnos_analysis.get('analysis_id'),
-        "gnos_repo": [gnos_analysis.get('analysis_detail_uri').split('/cghub/')[0] + '/'],
+        "gnos_repo": [get_repo_url_from_uri(gnos_analysis.get('analysis_detail_uri'))],
         "gnos_last_modified": [dateutil.parser.parse(gnos_analysis.get('last_modified'))],
         "gnos_published_date": [dateutil.parser.parse(gnos_analysis.get('published_date'))],
         "files": files,
         "study": gnos_analysis.get('study'),
         "effective_xml_md5sum": [gnos_analysis.get('_effective_xml_md5sum')],
-        "is_santa_cruz_entry": True if gnos_analysis.get('analysis_id') in annotations.get('santa_cruz').get('gnos_id') else False,
-        "is_aug2015_entry": True if gnos_analysis.get('analysis_id') in annotations.get('aug2015').get('gnos_id') else False,
-        "is_oct2015_entry": True if gnos_analysis.get('analysis_id') in annotations.get('oct2015').get('gnos_id') else False,
-        "is_mar2016_entry": True if gnos_analysis.get('analysis_id') in annotations.get('mar2016').get('gnos_id') else False,
-        "is_may2016_entry": True if gnos_analysis.get('analysis_id') in annotations.get('may2016').get('gnos_id') else False,
-        "is_s3_transfer_scheduled": True if gnos_analysis.get('analysis_id') in annotations.get('s3_transfer_scheduled') else False,
-        "is_s3_transfer_completed": True if gnos_analysis.get('analysis_id') in annotations.get('s3_transfer_completed') else False,
         "exists_xml_md5sum_mismatch": False,
         "variant_calling_performed_at": gnos_analysis.get('analysis_xml').get('ANALYSIS_SET').get('ANALYSIS').get('@center_name'),
         "workflow_details": {
@@ -460,6 +493,7 @@ def create_vcf_entry(donor_unique_id, analysis_attrib, gnos_analysis, annotation
             "variant_timing_metrics": {}
         }
     }
+    vcf_entry.update(get_entry_flags(gnos_analysis, annotations))
 
     qc = {}
     try:
@@ -584,20 +618,19 @@ def prepare_aggregated_specimen_level_info(bam_file):
     return specimen
 
 
+hard_coded_donor_blacklist = frozenset([
+        "PACA-CA::PCSI_0449",
+        "PACA-CA::PCSI_0309",
+        "LIHC-US::G1551",
+        "LIHC-US::G15512",
+        "TCGA_MUT_BENCHMARK_4::G15511",
+        "TCGA_MUT_BENCHMARK_4::G15512",
+        "PBCA-DE::SNV_CALLING_TEST"
+    ])
+
+
 def is_in_donor_blacklist(donor_unique_id):
-    donor_blacklist = set([
-            "PACA-CA::PCSI_0449",
-            "PACA-CA::PCSI_0309",
-            "LIHC-US::G1551",
-            "LIHC-US::G15512",
-            "TCGA_MUT_BENCHMARK_4::G15511",
-            "TCGA_MUT_BENCHMARK_4::G15512",
-            "PBCA-DE::SNV_CALLING_TEST"
-        ])
-    if donor_blacklist.intersection([donor_unique_id]):
-        return True
-    else:
-        return False
+    return donor_unique_id in hard_coded_donor_blacklist
 
 
 def create_bam_file_entry(donor_unique_id, analysis_attrib, gnos_analysis, annotations):
@@ -616,16 +649,9 @@ def create_bam_file_entry(donor_unique_id, analysis_attrib, gnos_analysis, annot
         "Stars": annotations.get('Stars').get(gnos_analysis.get('aliquot_id')) if annotations.get('Stars').get(gnos_analysis.get('aliquot_id')) else None,
 
         "effective_xml_md5sum": gnos_analysis.get('_effective_xml_md5sum'),
-        "is_santa_cruz_entry": True if gnos_analysis.get('analysis_id') in annotations.get('santa_cruz').get('gnos_id') else False,
-        "is_aug2015_entry": True if gnos_analysis.get('analysis_id') in annotations.get('aug2015').get('gnos_id') else False,
-        "is_oct2015_entry": True if gnos_analysis.get('analysis_id') in annotations.get('oct2015').get('gnos_id') else False,
-        "is_mar2016_entry": True if gnos_analysis.get('analysis_id') in annotations.get('mar2016').get('gnos_id') else False,
-        "is_may2016_entry": True if gnos_analysis.get('analysis_id') in annotations.get('may2016').get('gnos_id') else False,
-        "is_s3_transfer_scheduled": True if gnos_analysis.get('analysis_id') in annotations.get('s3_transfer_scheduled') else False,
-        "is_s3_transfer_completed": True if gnos_analysis.get('analysis_id') in annotations.get('s3_transfer_completed') else False,
 
         "library_strategy": gnos_analysis.get('library_strategy'),
-        "gnos_repo": gnos_analysis.get('analysis_detail_uri').split('/cghub/')[0] + '/',
+        "gnos_repo": get_repo_url_from_uri(gnos_analysis.get('analysis_detail_uri')),
         "gnos_metadata_url": gnos_analysis.get('analysis_detail_uri').replace('analysisDetail', 'analysisFull'),
         "refassem_short_name": gnos_analysis.get('refassem_short_name'),
         "bam_gnos_ao_id": gnos_analysis.get('analysis_id'),
@@ -642,6 +668,7 @@ def create_bam_file_entry(donor_unique_id, analysis_attrib, gnos_analysis, annot
         "bai_file_md5sum": file_info.get('bai_file_md5sum'),
 
     }
+    bam_file.update(get_entry_flags(gnos_analysis, annotations))
 
     # much more TODO for bam file info and alignment details
     if bam_file.get('refassem_short_name') == 'unaligned' and \
@@ -762,31 +789,27 @@ def get_icgc_id(donor_unique_id, dcc_project_code, submitter_id, subtype, annota
             return None
         submitter_id = annotations.get('uuid_to_barcode').get(submitter_id)
 
-    if not annotations.get('icgc_'+subtype+'_id').get(dcc_project_code+'::'+submitter_id):
+    icgc_id = annotations.get('icgc_'+subtype+'_id').get((dcc_project_code, submitter_id))
+    if not icgc_id:
         logger.warning('donor: {}, the {} with pcawg_id: {} has no mapping icgc_id'.format(donor_unique_id, subtype, submitter_id))
         return None
-    icgc_id = annotations.get('icgc_'+subtype+'_id').get(dcc_project_code+'::'+submitter_id)
     return icgc_id
 
 
 def create_donor(donor_unique_id, analysis_attrib, gnos_analysis, annotations):
+    donor_id = annotations['ids']['donor'].intern(donor_unique_id)
     donor = {
         'donor_unique_id': donor_unique_id,
         'submitter_donor_id': analysis_attrib['submitter_donor_id'],
         'dcc_project_code': analysis_attrib['dcc_project_code'],
         'icgc_donor_id': get_icgc_id(donor_unique_id, analysis_attrib['dcc_project_code'], analysis_attrib['submitter_donor_id'], 'donor', annotations), 
         'gnos_study': gnos_analysis.get('study'),
-        'gnos_repo': gnos_analysis.get('analysis_detail_uri').split('/cghub/')[0] + '/', # can be better
+        'gnos_repo': get_repo_url_from_uri(gnos_analysis.get('analysis_detail_uri')), # can be better
         'flags': {
             'is_test': is_test(analysis_attrib, gnos_analysis),
             'is_cell_line': is_cell_line(analysis_attrib, gnos_analysis),
             'is_train2_donor': False,
             'is_train2_pilot': False,
-            'is_santa_cruz_donor': True if donor_unique_id in annotations.get('santa_cruz').get('donor') else False,
-            'is_aug2015_donor': True if donor_unique_id in annotations.get('aug2015').get('donor') else False,
-            'is_oct2015_donor': True if donor_unique_id in annotations.get('oct2015').get('donor') else False,
-            'is_mar2016_donor': True if donor_unique_id in annotations.get('mar2016').get('donor') else False,
-            'is_may2016_donor': True if donor_unique_id in annotations.get('may2016').get('donor') else False,
             'TiN': annotations.get('TiN').get(donor_unique_id, 'NA'),
             'is_normal_specimen_aligned': False,
             'are_all_tumor_specimens_aligned': False,
@@ -829,6 +852,9 @@ def create_donor(donor_unique_id, analysis_attrib, gnos_analysis, annotations):
             }
         }
     }
+    for r in releases:
+        donor['flags']['is_'+r+'_donor'] = donor_id in annotations.get(r).get('donor')
+
     try:
         if type(gnos_analysis.get('experiment_xml').get('EXPERIMENT_SET').get('EXPERIMENT')) == list:
             donor['sequencing_center'] = gnos_analysis.get('experiment_xml').get('EXPERIMENT_SET').get('EXPERIMENT')[0].get('@center_name')
@@ -837,13 +863,6 @@ def create_donor(donor_unique_id, analysis_attrib, gnos_analysis, annotations):
     except:
         logger.warning('analysis object has no sequencing_center information: {}'.format(gnos_analysis.get('analysis_detail_uri')))
 
-    
-    if not annotations.get('qc_donor_prioritization'):
-        logger.warning('Missing qc_donor_prioritization annotation')
-    elif annotations.get('qc_donor_prioritization').get(donor_unique_id) is not None:
-        donor.get('flags')['qc_score'] = annotations.get('qc_donor_prioritization').get(donor_unique_id)
-    else:
-        logger.warning('No qc prioritization score for donor: {}'.format(donor_unique_id))
 
     return donor
 
@@ -893,10 +912,20 @@ def get_analysis_attrib(gnos_analysis):
     return analysis_attrib
 
 
-def get_gnos_analysis(f):
-    with open (f, 'r') as x: xml_str = x.read()
-    gnos_analysis = xmltodict.parse(xml_str).get('ResultSet').get('Result')
-    add_effective_xml_md5sum(gnos_analysis, xml_str)
+def get_gnos_analysis(f, effective_md5=True):
+    with run_stats.phase('xml_read'):
+        with open (f, 'r') as x: xml_str = x.read()
+    run_stats.count('xml_files_read')
+    run_stats.count('xml_bytes', len(xml_str))
+    return parse_gnos_analysis(xml_str, effective_md5)
+
+
+def parse_gnos_analysis(xml_str, effective_md5=True):
+    with run_stats.phase('xml_parse'):
+        gnos_analysis = xmltodict.parse(xml_str).get('ResultSet').get('Result')
+    if effective_md5:
+        with run_stats.phase('xml_md5'):
+            add_effective_xml_md5sum(gnos_analysis, xml_str)
     return gnos_analysis
 
 
@@ -972,35 +1001,15 @@ def process(metadata_dir, conf, es_index, es, donor_output_jsonl_file, bam_outpu
     # update the pc_annotation-sanger_vcf_in_jamboree files using the jamboree subdirectory files
     vcf_in_jamboree_dir = '../pcawg-operations/variant_calling/sanger_workflow/jamboree/'
     
-    infiles = glob.glob(vcf_in_jamboree_dir+'/Sanger_jamboree_batch*.txt')
-    outfile = 'pc_annotation-sanger_vcf_in_jamboree.tsv' # hard-code file name
-    update_vcf_jamboree(infiles, outfile)    
+    with run_stats.phase('annotation_load'):
+        infiles = glob.glob(vcf_in_jamboree_dir+'/Sanger_jamboree_batch*.txt')
+        outfile = 'pc_annotation-sanger_vcf_in_jamboree.tsv' # hard-code file name
+        update_vcf_jamboree(infiles, outfile)    
 
-    annotations = {}
-    read_annotations(annotations, 'gnos_assignment', 'pc_annotation-gnos_assignment.yml')  # hard-code file name for now
-    read_annotations(annotations, 'train2_pilot', 'pc_annotation-train2_pilot.tsv')  # hard-code file name for now
-    read_annotations(annotations, 'donor_blacklist', '../pcawg-operations/lists/blacklist/pc_annotation-donor_blacklist.tsv')  # hard-code file name for now
-    read_annotations(annotations, 'manual_qc_failed', 'pc_annotation-manual_qc_failed.tsv')  # hard-code file name for now
-    read_annotations(annotations, 'sanger_vcf_in_jamboree', 'pc_annotation-sanger_vcf_in_jamboree.tsv')  # hard-code file name for now
-    read_annotations(annotations, 'santa_cruz', '../pcawg-operations/data_releases/santa_cruz/santa_cruz_freeze_entry.tsv')
-    read_annotations(annotations, 's3_transfer_scheduled', '../s3-transfer-operations/s3-transfer-jobs*/*/*.json')
-    read_annotations(annotations, 's3_transfer_completed', '../s3-transfer-operations/s3-transfer-jobs*/completed-jobs/*.json')
-    read_annotations(annotations, 'qc_donor_prioritization', 'qc_donor_prioritization.txt')
-    read_annotations(annotations, 'uuid_to_barcode', 'pc_annotation-tcga_uuid2barcode.tsv')    
-    read_annotations(annotations, 'icgc_donor_id', '../pcawg-operations/lists/icgc_bioentity_ids/pc_annotation-icgc_donor_ids.csv')
-    read_annotations(annotations, 'icgc_specimen_id', '../pcawg-operations/lists/icgc_bioentity_ids/pc_annotation-icgc_specimen_ids.csv')
-    read_annotations(annotations, 'icgc_sample_id', '../pcawg-operations/lists/icgc_bioentity_ids/pc_annotation-icgc_sample_ids.csv')
-    read_annotations(annotations, 'pcawg_final_list', '../pcawg-operations/lists/pc_annotation-pcawg_final_list.tsv')
-    read_annotations(annotations, 'aliquot_blacklist', '../pcawg-operations/lists/blacklist/pc_annotation-aliquot_blacklist.tsv')
-    read_annotations(annotations, 'oxog_score', '../pcawg-operations/lists/quality_control_info/broad_qc_metrics.tsv')
-    read_annotations(annotations, 'ContEST', '../pcawg-operations/lists/quality_control_info/broad_qc_metrics.tsv')
-    read_annotations(annotations, 'Stars', '../pcawg-operations/lists/quality_control_info/PAWG_QC_Summary_of_Measures.tsv')
-    read_annotations(annotations, 'TiN', '../pcawg-operations/lists/quality_control_info/TiN_donor.TiNsorted.tsv')
-    for r in ['aug2015', 'oct2015', 'mar2016', 'may2016']:
-        read_annotations(annotations, r, '../pcawg-operations/data_releases/'+r+'/release_'+r+'_entry.tsv')
+        annotations = load_annotations()
 
-    # hard-code the file name for now    
-    train2_freeze_bams = read_train2_bams('../pcawg-operations/variant_calling/train2-lists/Data_Freeze_Train_2.0_GoogleDocs__2015_04_10_1150.tsv')
+        # hard-code the file name for now    
+        train2_freeze_bams = read_train2_bams('../pcawg-operations/variant_calling/train2-lists/Data_Freeze_Train_2.0_GoogleDocs__2015_04_10_1150.tsv')
 
     # pre-exclude gnos entries when this option is chosen
     gnos_ids_to_be_excluded = set()
@@ -1012,8 +1021,13 @@ def process(metadata_dir, conf, es_index, es, donor_output_jsonl_file, bam_outpu
 
     donor_fh = open(donor_output_jsonl_file, 'w')
     bam_fh = open(bam_output_jsonl_file, 'w')
+    qc_writer = TsvWriter(metadata_dir + '/qc_donor_prioritization.txt', fields=qc_report_fields)
     
-    for f in get_xml_files( metadata_dir, conf, repo ):
+    with run_stats.phase('file_listing'):
+        xml_files = get_xml_files( metadata_dir, conf, repo )
+    run_stats.count('xml_files_listed', len(xml_files))
+
+    for f in xml_files:
         f = conf.get('output_dir') + '/__all_metadata_xml/' + f
         gnos_analysis = get_gnos_analysis(f)
         #print (json.dumps(gnos_analysis)) # debug
@@ -1022,25 +1036,40 @@ def process(metadata_dir, conf, es_index, es, donor_output_jsonl_file, bam_outpu
             if gnos_analysis.get('analysis_id') and gnos_analysis.get('analysis_id') in gnos_ids_to_be_excluded:
                 logger.warning( 'skipping xml file: {} with analysis_id: {}, as it\'s in the list to be excluded' \
                     .format(f, gnos_analysis.get('analysis_id')) )
+                run_stats.count('xml_files_excluded')
                 continue
 
-            process_gnos_analysis( gnos_analysis, donors, vcf_entries, es_index, es, bam_fh, annotations, consensus_entries)
+            with run_stats.phase('process_gnos_analysis'):
+                process_gnos_analysis( gnos_analysis, donors, vcf_entries, es_index, es, bam_fh, annotations, consensus_entries)
         else:
             logger.warning( 'skipping invalid xml file: {}'.format(f) )
+            run_stats.count('xml_files_invalid')
 
     for donor_id in donors.keys():
         donor = donors[donor_id]
 
-        process_donor(donor, annotations, vcf_entries, conf, train2_freeze_bams, consensus_entries)
+        with run_stats.phase('process_donor'):
+            process_donor(donor, annotations, vcf_entries, conf, train2_freeze_bams, consensus_entries)
+
+        # aggregated QC prioritization metric
+        with run_stats.phase('qc_assessment'):
+            donor.get('flags')['qc_score'], qc_row = assess_donor_qc(donor)
+            qc_writer.write(qc_row)
+        run_stats.count('donors')
 
         # push to Elasticsearch
-        es.index(index=es_index, doc_type='donor', id=donor['donor_unique_id'], \
-            body=json.loads(json.dumps(donor, default=set_default)) )
+        with run_stats.phase('json_dump'):
+            body = json.loads(json.dumps(donor, default=set_default))
+        with run_stats.phase('es_index'):
+            es.index(index=es_index, doc_type='donor', id=donor['donor_unique_id'], body=body)
+        run_stats.count('es_docs')
         del donor['bam_files']  # prune this before dumping JSON for Keiran
-        donor_fh.write(json.dumps(donor, default=set_default) + '\n')
+        with run_stats.phase('json_dump'):
+            donor_fh.write(json.dumps(donor, default=set_default) + '\n')
 
     donor_fh.close()
     bam_fh.close()
+    qc_writer.close()
 
 
 def update_vcf_jamboree(infilenames, outfilename):
@@ -1086,15 +1115,52 @@ def read_train2_bams(filename):
     return train2_bams
 
 
+def load_annotations():
+    annotations = {
+        # interned ids, the annotation lists below are bitmaps over them
+        'ids': {
+            'donor': IdTable(),
+            'specimen': IdTable(),
+            'sample': IdTable(),
+            'aliquot': IdTable()
+        },
+        # gnos_id: bitmask of the membership_lists the entry is in
+        'gnos_id_membership': {}
+    }
+    read_annotations(annotations, 'gnos_assignment', 'pc_annotation-gnos_assignment.yml')  # hard-code file name for now
+    read_annotations(annotations, 'train2_pilot', 'pc_annotation-train2_pilot.tsv')  # hard-code file name for now
+    read_annotations(annotations, 'donor_blacklist', '../pcawg-operations/lists/blacklist/pc_annotation-donor_blacklist.tsv')  # hard-code file name for now
+    read_annotations(annotations, 'manual_qc_failed', 'pc_annotation-manual_qc_failed.tsv')  # hard-code file name for now
+    read_annotations(annotations, 'sanger_vcf_in_jamboree', 'pc_annotation-sanger_vcf_in_jamboree.tsv')  # hard-code file name for now
+    read_annotations(annotations, 'santa_cruz', '../pcawg-operations/data_releases/santa_cruz/santa_cruz_freeze_entry.tsv')
+    read_annotations(annotations, 's3_transfer_scheduled', '../s3-transfer-operations/s3-transfer-jobs*/*/*.json')
+    read_annotations(annotations, 's3_transfer_completed', '../s3-transfer-operations/s3-transfer-jobs*/completed-jobs/*.json')
+    read_annotations(annotations, 'uuid_to_barcode', 'pc_annotation-tcga_uuid2barcode.tsv')    
+    read_annotations(annotations, 'icgc_donor_id', '../pcawg-operations/lists/icgc_bioentity_ids/pc_annotation-icgc_donor_ids.csv')
+    read_annotations(annotations, 'icgc_specimen_id', '../pcawg-operations/lists/icgc_bioentity_ids/pc_annotation-icgc_specimen_ids.csv')
+    read_annotations(annotations, 'icgc_sample_id', '../pcawg-operations/lists/icgc_bioentity_ids/pc_annotation-icgc_sample_ids.csv')
+    read_annotations(annotations, 'pcawg_final_list', '../pcawg-operations/lists/pc_annotation-pcawg_final_list.tsv')
+    read_annotations(annotations, 'aliquot_blacklist', '../pcawg-operations/lists/blacklist/pc_annotation-aliquot_blacklist.tsv')
+    read_annotations(annotations, 'oxog_score', '../pcawg-operations/lists/quality_control_info/broad_qc_metrics.tsv')
+    read_annotations(annotations, 'ContEST', '../pcawg-operations/lists/quality_control_info/broad_qc_metrics.tsv')
+    read_annotations(annotations, 'Stars', '../pcawg-operations/lists/quality_control_info/PAWG_QC_Summary_of_Measures.tsv')
+    read_annotations(annotations, 'TiN', '../pcawg-operations/lists/quality_control_info/TiN_donor.TiNsorted.tsv')
+    for r in releases[1:]:
+        read_annotations(annotations, r, '../pcawg-operations/data_releases/'+r+'/release_'+r+'_entry.tsv')
+
+    return annotations
+
+
 def read_annotations(annotations, type, file_name):
 
+    ids = annotations['ids']
+    membership = annotations['gnos_id_membership']
     if type in ['s3_transfer_scheduled', 's3_transfer_completed']:
-        annotations[type] = set()
         files = glob.glob(file_name)
         for f in files:
             fname = str.split(f, '/')[-1]
             gnos_id = str.split(fname, '.')[0]
-            annotations[type].add(gnos_id)
+            membership[gnos_id] = membership.get(gnos_id, 0) | membership_bit[type]
     else:
         if not os.path.isfile(file_name):
             return
@@ -1118,30 +1184,24 @@ def read_annotations(annotations, type, file_name):
                     annotations[type][donor_id] = ao_id
                     
             elif type in ['train2_donors', 'train2_pilot', 'donor_blacklist', 'manual_qc_failed', 'aliquot_blacklist']:
-                annotations[type] = set()
+                annotations[type] = IdBitmap()
+                id_table = ids['aliquot'] if type == 'aliquot_blacklist' else ids['donor']
                 for line in r:
                     if line.startswith('#'): continue
                     if len(line.rstrip()) == 0: continue
-                    annotations[type].add(line.rstrip())
+                    annotations[type].add(id_table.intern(line.rstrip()))
 
-            elif type in ['santa_cruz', 'aug2015', 'oct2015', 'mar2016', 'may2016']:
+            elif type in releases:
                 annotations[type] = {
-                    'donor': set(),
-                    'gnos_id': set()
+                    'donor': IdBitmap()
                 }
                 for line in r:
                     if line.startswith('#'): continue
                     if len(line.rstrip()) == 0: continue
                     donor_unique_id, gnos_id, entry_type = str.split(line.rstrip(), '\t') 
-                    annotations[type]['donor'].add(donor_unique_id)
-                    annotations[type]['gnos_id'].add(gnos_id)                 
+                    annotations[type]['donor'].add(ids['donor'].intern(donor_unique_id))
+                    membership[gnos_id] = membership.get(gnos_id, 0) | membership_bit[type]
             
-            elif type == 'qc_donor_prioritization':
-                annotations[type] = {}
-                reader = csv.DictReader(r, delimiter='\t')
-                for row in reader:
-                    annotations[type][row.get('Unique DonorId')] = int(row.get('Issue Summary'))
-
             elif type == 'uuid_to_barcode':
                 annotations[type] = {}
                 for line in r:
@@ -1161,19 +1221,19 @@ def read_annotations(annotations, type, file_name):
                     if len(line.rstrip()) == 0: continue
                     icgc_id, id_pcawg, dcc_project_code, creation_release = str.split(line.rstrip(), ',')
                     id_pcawg = detect_and_low_case_uuid(id_pcawg)
-                    annotations[type][dcc_project_code+'::'+id_pcawg] = prefix.upper()+icgc_id
+                    annotations[type][(dcc_project_code, id_pcawg)] = prefix.upper()+icgc_id
 
             elif type == 'pcawg_final_list':
                 annotations[type] = {
-                    'donor': set(),
-                    'specimen': set(),
-                    'sample': set()
+                    'donor': IdBitmap(),
+                    'specimen': IdBitmap(),
+                    'sample': IdBitmap()
                 }
                 reader = csv.DictReader(r, delimiter='\t')
                 for row in reader:
-                    annotations[type]['donor'].add(row.get('donor_unique_id'))
-                    annotations[type]['specimen'].add(row.get('dcc_project_code')+'::'+row.get('submitter_specimen_id'))
-                    annotations[type]['sample'].add(row.get('dcc_project_code')+'::'+row.get('submitter_sample_id'))
+                    annotations[type]['donor'].add(ids['donor'].intern(row.get('donor_unique_id')))
+                    annotations[type]['specimen'].add(ids['specimen'].intern_pair(row.get('dcc_project_code'), row.get('submitter_specimen_id')))
+                    annotations[type]['sample'].add(ids['sample'].intern_pair(row.get('dcc_project_code'), row.get('submitter_sample_id')))
 
             elif type in ['oxog_score', 'ContEST']:
                 annotations[type] = {}
@@ -1222,7 +1282,7 @@ def process_donor(donor, annotations, vcf_entries, conf, train2_freeze_bams, con
         donor.get('flags')['are_all_tumor_specimens_aligned'] = True
 
     # now build easy-to-use, specimen-level, gnos_repo-aware summary of bwa alignment status by iterating all collected bams
-    aggregated_bam_info = bam_aggregation(donor['bam_files'])
+    aggregated_bam_info = bam_aggregation(donor['bam_files'], annotations['gnos_id_membership'])
     #print json.dumps(aggregated_bam_info, default=set_default)  # debug only
     
     # let's add this aggregated alignment information to donor object
@@ -1271,10 +1331,11 @@ def process_donor(donor, annotations, vcf_entries, conf, train2_freeze_bams, con
             .format(donor.get('donor_unique_id'), conf.get(donor.get('normal_alignment_status').get('aligned_bam').get('gnos_repo')[0])))
         # it should be pretty safe to assign it automatically for this freshly aligned normal specimen
         donor['original_gnos_assignment'] = conf.get(donor.get('normal_alignment_status').get('aligned_bam').get('gnos_repo')[0])
+    donor_id = annotations['ids']['donor'].intern(donor.get('donor_unique_id'))
     add_train2_donor_flag(donor, train2_freeze_bams)
-    add_train2_pilot_flag(donor, annotations['train2_pilot'])
-    add_donor_blacklist_flag(donor, annotations['donor_blacklist'])
-    add_manual_qc_failed_flag(donor, annotations['manual_qc_failed'])
+    add_train2_pilot_flag(donor, donor_id, annotations['train2_pilot'])
+    add_donor_blacklist_flag(donor, donor_id, annotations['donor_blacklist'])
+    add_manual_qc_failed_flag(donor, donor_id, annotations['manual_qc_failed'])
     
     donor.get('flags')['is_sanger_vcf_in_jamboree'] = False
     if donor.get('donor_unique_id') in annotations.get('sanger_vcf_in_jamboree'):
@@ -1325,15 +1386,9 @@ def create_minibam(alignment, minibam_info):
         "gnos_id": minibam_info['gnos_id'],
         "effective_xml_md5sum": minibam_info['effective_xml_md5sum'],
         "gnos_last_modified": minibam_info['gnos_last_modified'],
-        "gnos_repo": minibam_info['gnos_repo'],
-        "is_santa_cruz_entry": minibam_info['is_santa_cruz_entry'],
-        "is_aug2015_entry": minibam_info['is_aug2015_entry'],
-        "is_oct2015_entry": minibam_info['is_oct2015_entry'],
-        "is_mar2016_entry": minibam_info['is_mar2016_entry'],
-        "is_may2016_entry": minibam_info['is_may2016_entry'],
-        "is_s3_transfer_scheduled": minibam_info['is_s3_transfer_scheduled'],
-        "is_s3_transfer_completed": minibam_info['is_s3_transfer_completed']
+        "gnos_repo": minibam_info['gnos_repo']
     }
+    copy_membership_flags(minibam_entry, minibam_info)
     minibam_files = minibam_info.get('files')
     if not minibam_files:
         logger.warning('The minibam with gnos_id {} is missing files.'.format(minibam_entry.get('gnos_id')))
@@ -1381,6 +1436,15 @@ def reorganize_dkfz_embl_calls(vcf_entries):
             })
 
 
+bwa_mismatch_checks = [
+    # field of the aligned_bam records, flag set when it differs, whether that makes the bwa bams mismatch
+    ('gnos_id', 'exists_gnos_id_mismatch', True),
+    ('md5sum', 'exists_md5sum_mismatch', True),
+    ('effective_xml_md5sum', 'exists_gnos_xml_mismatch', False),
+    ('bwa_workflow_version', 'exists_version_mismatch', True)
+]
+
+
 def check_bwa_duplicates(donor, train2_freeze_bams):
     duplicated_bwa_alignment_summary = {
         'exists_gnos_xml_mismatch': False,
@@ -1410,300 +1474,128 @@ def check_bwa_duplicates(donor, train2_freeze_bams):
         'is_normal_bam_used_by_sanger_missing': False,
         'is_tumor_bam_used_by_sanger_missing': False,
         'normal': {},
-        '_tmp_tumor': {},
         'tumor': []
     }
-    aliquots = {}
-    duplicated_bwa = False
 
+    # gnos ids used by the sanger call and the ones in the train2 freeze, indexed once per donor
+    sanger_gnos_ids = get_sanger_input_gnos_ids(donor)
+    train2_bams = train2_freeze_bams.get(donor.get('donor_unique_id')) or {}
+
+    aliquots = {}
     for bam_file in donor.get('bam_files'):
         if not bam_file.get('is_aligned'): continue
 
         # not do it for RNA-Seq Bams
         if bam_file.get('library_strategy') == 'RNA-Seq': continue
 
-        if aliquots.get(bam_file.get('aliquot_id')): # exists already
-            duplicated_bwa = True
-            aliquots.get(bam_file.get('aliquot_id')).append(bam_file)
-        else:
-            aliquots[bam_file.get('aliquot_id')] = [bam_file]
-
-    if True or duplicated_bwa:  # Let's do this for all donors
-        for aliquot in aliquots:
-          for bam_file in aliquots.get(aliquot):
-            if 'normal' in bam_file.get('dcc_specimen_type').lower():
-                if duplicated_bwa_alignment_summary.get('normal'):
-                    duplicated_bwa_alignment_summary.get('normal').get('aligned_bam').append(
-                            {
-                                'gnos_id': bam_file.get('bam_gnos_ao_id'),
-                                'gnos_repo': bam_file.get('gnos_repo'),
-                                'md5sum': bam_file.get('md5sum'),
-                                'effective_xml_md5sum': bam_file.get('effective_xml_md5sum'),
-                                'upload_date': bam_file.get('upload_date'),
-                                'published_date': bam_file.get('published_date'),
-                                'last_modified': bam_file.get('last_modified'),
-                                'bwa_workflow_version': bam_file.get('alignment').get('workflow_version'),
-                                'is_train2_bam': is_train2_bam(donor, train2_freeze_bams, bam_file.get('bam_gnos_ao_id'), 'normal'),
-                                'is_used_in_sanger_variant_call': is_used_in_sanger_variant_call(donor,
-                                        bam_file.get('bam_gnos_ao_id')),
-                                'is_santa_cruz_entry': bam_file.get('is_santa_cruz_entry'),
-                                'is_aug2015_entry': bam_file.get('is_aug2015_entry'),
-                                'is_oct2015_entry': bam_file.get('is_oct2015_entry'),
-                                'is_mar2016_entry': bam_file.get('is_mar2016_entry'),
-                                'is_may2016_entry': bam_file.get('is_may2016_entry')
-                            }
-                        )
-                else:
+        aliquots.setdefault(bam_file.get('aliquot_id'), []).append(bam_file)
+
+    tumor_aliquots = {}
+    for aliquot in aliquots:
+        for bam_file in aliquots.get(aliquot):
+            specimen_type = 'normal' if 'normal' in bam_file.get('dcc_specimen_type').lower() else 'tumor'
+            bam = create_bwa_bam_record(donor, bam_file, specimen_type, train2_bams, sanger_gnos_ids)
+
+            if specimen_type == 'normal':
+                # normal bams are all kept under the first normal aliquot
+                if not duplicated_bwa_alignment_summary.get('normal'):
                     duplicated_bwa_alignment_summary['normal'] = {
                         'aliquot_id': aliquot,
                         'dcc_specimen_type': bam_file.get('dcc_specimen_type'),
-                        'aligned_bam': [
-                            {
-                                'gnos_id': bam_file.get('bam_gnos_ao_id'),
-                                'gnos_repo': bam_file.get('gnos_repo'),
-                                'md5sum': bam_file.get('md5sum'),
-                                'effective_xml_md5sum': bam_file.get('effective_xml_md5sum'),
-                                'upload_date': bam_file.get('upload_date'),
-                                'published_date': bam_file.get('published_date'),
-                                'last_modified': bam_file.get('last_modified'),
-                                'bwa_workflow_version': bam_file.get('alignment').get('workflow_version'),
-                                'is_train2_bam': is_train2_bam(donor, train2_freeze_bams, bam_file.get('bam_gnos_ao_id'), 'normal'),
-                                'is_used_in_sanger_variant_call': is_used_in_sanger_variant_call(donor,
-                                        bam_file.get('bam_gnos_ao_id')),
-                                'is_santa_cruz_entry': bam_file.get('is_santa_cruz_entry'),
-                                'is_aug2015_entry': bam_file.get('is_aug2015_entry'),
-                                'is_oct2015_entry': bam_file.get('is_oct2015_entry'),
-                                'is_mar2016_entry': bam_file.get('is_mar2016_entry'),
-                                'is_may2016_entry': bam_file.get('is_may2016_entry')
-                            }
-                        ]
+                        'aligned_bam': []
                     }
-
-            else: # tumor
-                if not duplicated_bwa_alignment_summary.get('_tmp_tumor').get(aliquot):
-                    duplicated_bwa_alignment_summary.get('_tmp_tumor')[aliquot] = {
+                duplicated_bwa_alignment_summary.get('normal').get('aligned_bam').append(bam)
+            else:
+                if not tumor_aliquots.get(aliquot):
+                    tumor_aliquots[aliquot] = {
                         'aliquot_id': aliquot,
                         'dcc_specimen_type': bam_file.get('dcc_specimen_type'),
                         'aligned_bam': []
                     }
+                tumor_aliquots.get(aliquot).get('aligned_bam').append(bam)
 
-                duplicated_bwa_alignment_summary.get('_tmp_tumor').get(aliquot).get('aligned_bam').append(
-                        {
-                            'gnos_id': bam_file.get('bam_gnos_ao_id'),
-                            'gnos_repo': bam_file.get('gnos_repo'),
-                            'md5sum': bam_file.get('md5sum'),
-                            'effective_xml_md5sum': bam_file.get('effective_xml_md5sum'),
-                            'upload_date': bam_file.get('upload_date'),
-                            'published_date': bam_file.get('published_date'),
-                            'last_modified': bam_file.get('last_modified'),
-                            'bwa_workflow_version': bam_file.get('alignment').get('workflow_version'),
-                            'is_train2_bam': is_train2_bam(donor, train2_freeze_bams, bam_file.get('bam_gnos_ao_id'), 'tumor'),
-                            'is_used_in_sanger_variant_call': is_used_in_sanger_variant_call(donor,
-                                    bam_file.get('bam_gnos_ao_id')),
-                            'is_santa_cruz_entry': bam_file.get('is_santa_cruz_entry'),
-                            'is_aug2015_entry': bam_file.get('is_aug2015_entry'),
-                            'is_oct2015_entry': bam_file.get('is_oct2015_entry'),
-                            'is_mar2016_entry': bam_file.get('is_mar2016_entry'),
-                            'is_may2016_entry': bam_file.get('is_may2016_entry')
-                        }
-                    )
+    duplicated_bwa_alignment_summary['tumor'] = [tumor_aliquots.get(aliquot) for aliquot in tumor_aliquots]
+
+    if duplicated_bwa_alignment_summary.get('normal'):
+        check_bwa_aliquot(duplicated_bwa_alignment_summary, duplicated_bwa_alignment_summary.get('normal'), 'normal', donor.get('flags'))
+    for aliquot in duplicated_bwa_alignment_summary.get('tumor'):
+        check_bwa_aliquot(duplicated_bwa_alignment_summary, aliquot, 'tumor', donor.get('flags'))
+
+    donor['duplicated_bwa_alignment_summary'] = duplicated_bwa_alignment_summary
+
+
+def create_bwa_bam_record(donor, bam_file, specimen_type, train2_bams, sanger_gnos_ids):
+    gnos_id = bam_file.get('bam_gnos_ao_id')
+    if gnos_id in train2_bams and not train2_bams.get(gnos_id).get('specimen_type') == specimen_type:
+        logger.warning('This should never happen: specimen type mismatch in train2 list in donor {}'
+                .format(donor.get('donor_unique_id')))
+
+    return copy_membership_flags({
+            'gnos_id': gnos_id,
+            'gnos_repo': bam_file.get('gnos_repo'),
+            'md5sum': bam_file.get('md5sum'),
+            'effective_xml_md5sum': bam_file.get('effective_xml_md5sum'),
+            'upload_date': bam_file.get('upload_date'),
+            'published_date': bam_file.get('published_date'),
+            'last_modified': bam_file.get('last_modified'),
+            'bwa_workflow_version': bam_file.get('alignment').get('workflow_version'),
+            'is_train2_bam': gnos_id in train2_bams,
+            'is_used_in_sanger_variant_call': gnos_id in sanger_gnos_ids
+        }, bam_file, release_entry_flags)
+
+
+def exists_value_mismatch(values):
+    # compared to the first non-empty value, an empty one after it differs too
+    return len(set(dropwhile(lambda v: not v, values))) > 1
+
+
+def check_bwa_aliquot(summary, aliquot, specimen_type, donor_flags):
+    bams = aliquot.get('aligned_bam')
 
-        for aliquot in duplicated_bwa_alignment_summary.get('_tmp_tumor'):
-            duplicated_bwa_alignment_summary.get('tumor').append(duplicated_bwa_alignment_summary.get('_tmp_tumor').get(aliquot))
-
-        del duplicated_bwa_alignment_summary['_tmp_tumor']
-
-        # scan normal BAMs
-        if duplicated_bwa_alignment_summary.get('normal'):
-            b_gnos_id = None
-            b_md5sum = None
-            xml_md5sum = None
-            b_version = None
-            has_santa_cruz_n_bam = False
-            has_train2_n_bam = False
-            has_sanger_n_bam = False
-            count_is_train2_not_sanger = 0
-            count_not_train2_is_sanger = 0
-            count_is_train2_is_sanger = 0
-            duplicated_bwa_alignment_summary.get('normal')['exists_mismatch_bwa_bams'] = False
-            duplicated_bwa_alignment_summary.get('normal')['exists_gnos_id_mismatch'] = False
-            duplicated_bwa_alignment_summary.get('normal')['exists_gnos_xml_mismatch'] = False
-            duplicated_bwa_alignment_summary.get('normal')['exists_md5sum_mismatch'] = False
-            duplicated_bwa_alignment_summary.get('normal')['exists_version_mismatch'] = False
-
-            for bam in duplicated_bwa_alignment_summary.get('normal').get('aligned_bam'):
-                is_santa_cruz_n_bam = bam.get('is_santa_cruz_entry')
-                if is_santa_cruz_n_bam: has_santa_cruz_n_bam = True
-                is_train2_n_bam = bam.get('is_train2_bam')
-                if is_train2_n_bam: has_train2_n_bam = True
-                is_sanger_n_bam = bam.get('is_used_in_sanger_variant_call')
-                if is_sanger_n_bam: has_sanger_n_bam = True
-
-                if is_train2_n_bam and not is_sanger_n_bam: count_is_train2_not_sanger += 1
-                if not is_train2_n_bam and is_sanger_n_bam: count_not_train2_is_sanger += 1
-                if is_train2_n_bam and is_sanger_n_bam: count_is_train2_is_sanger += 1
-
-                if not b_gnos_id: b_gnos_id = bam.get('gnos_id')
-                if b_gnos_id and not b_gnos_id == bam.get('gnos_id'):
-                    duplicated_bwa_alignment_summary['exists_gnos_id_mismatch'] = True
-                    duplicated_bwa_alignment_summary['exists_gnos_id_mismatch_in_normal'] = True
-                    duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams'] = True
-                    duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams_in_normal'] = True
-                    duplicated_bwa_alignment_summary.get('normal')['exists_mismatch_bwa_bams'] = True
-                    duplicated_bwa_alignment_summary.get('normal')['exists_gnos_id_mismatch'] = True
-
-                if not b_md5sum: b_md5sum = bam.get('md5sum')
-                if b_md5sum and not b_md5sum == bam.get('md5sum'):
-                    duplicated_bwa_alignment_summary['exists_md5sum_mismatch'] = True
-                    duplicated_bwa_alignment_summary['exists_md5sum_mismatch_in_normal'] = True
-                    duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams'] = True
-                    duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams_in_normal'] = True
-                    duplicated_bwa_alignment_summary.get('normal')['exists_mismatch_bwa_bams'] = True
-                    duplicated_bwa_alignment_summary.get('normal')['exists_md5sum_mismatch'] = True
-
-                if not xml_md5sum: xml_md5sum = bam.get('effective_xml_md5sum')
-                if xml_md5sum and not xml_md5sum == bam.get('effective_xml_md5sum'):
-                    duplicated_bwa_alignment_summary['exists_gnos_xml_mismatch'] = True
-                    duplicated_bwa_alignment_summary['exists_gnos_xml_mismatch_in_normal'] = True
-                    duplicated_bwa_alignment_summary.get('normal')['exists_gnos_xml_mismatch'] = True
-
-                if not b_version: b_version = bam.get('bwa_workflow_version')
-                if b_version and not b_version == bam.get('bwa_workflow_version'):
-                    duplicated_bwa_alignment_summary['exists_version_mismatch'] = True
-                    duplicated_bwa_alignment_summary['exists_version_mismatch_in_normal'] = True
-                    duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams'] = True
-                    duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams_in_normal'] = True
-                    duplicated_bwa_alignment_summary.get('normal')['exists_mismatch_bwa_bams'] = True
-                    duplicated_bwa_alignment_summary.get('normal')['exists_version_mismatch'] = True
-
-            if donor.get('flags').get('is_santa_cruz_donor') and not has_santa_cruz_n_bam:
-                duplicated_bwa_alignment_summary['is_santa_cruz_freeze_bam_missing'] = True
-                duplicated_bwa_alignment_summary['is_santa_cruz_freeze_normal_bam_missing'] = True
-
-            if donor.get('flags').get('is_train2_donor') and not has_train2_n_bam:
-                duplicated_bwa_alignment_summary['is_train2_freeze_bam_missing'] = True
-                duplicated_bwa_alignment_summary['is_train2_freeze_normal_bam_missing'] = True
-
-            if donor.get('flags').get('is_sanger_variant_calling_performed') and not has_sanger_n_bam:
-                duplicated_bwa_alignment_summary['is_bam_used_by_sanger_missing'] = True
-                duplicated_bwa_alignment_summary['is_normal_bam_used_by_sanger_missing'] = True
-
-            if donor.get('flags').get('is_train2_donor') and \
-                    donor.get('flags').get('is_sanger_variant_calling_performed') and \
-                    not count_is_train2_is_sanger and \
-                    count_is_train2_not_sanger and count_not_train2_is_sanger:
-                if duplicated_bwa_alignment_summary['exists_md5sum_mismatch']:
-                    duplicated_bwa_alignment_summary['exists_md5sum_mismatch_between_train2_marked_and_sanger_used'] = True
-                if duplicated_bwa_alignment_summary['exists_version_mismatch']:
-                    duplicated_bwa_alignment_summary['exists_version_mismatch_between_train2_marked_and_sanger_used'] = True
-
-        # scan tumor BAMs
-        if duplicated_bwa_alignment_summary.get('tumor'):
-            for aliquot in duplicated_bwa_alignment_summary.get('tumor'):
-                b_gnos_id = None
-                b_md5sum = None
-                xml_md5sum = None
-                b_version = None
-                has_santa_cruz_t_bam = False
-                has_train2_t_bam = False
-                has_sanger_t_bam = False
-                count_is_train2_not_sanger = 0
-                count_not_train2_is_sanger = 0
-                count_is_train2_is_sanger = 0
-                aliquot['exists_mismatch_bwa_bams'] = False
-                aliquot['exists_gnos_id_mismatch'] = False
-                aliquot['exists_gnos_xml_mismatch'] = False
-                aliquot['exists_md5sum_mismatch'] = False
-                aliquot['exists_version_mismatch'] = False
-
-                for bam in aliquot.get('aligned_bam'):
-                    is_santa_cruz_t_bam = bam.get('is_santa_cruz_entry')
-                    if is_santa_cruz_t_bam: has_santa_cruz_t_bam = True
-
-                    is_train2_t_bam = bam.get('is_train2_bam')
-                    if is_train2_t_bam: has_train2_t_bam = True
-
-                    is_sanger_t_bam = bam.get('is_used_in_sanger_variant_call')
-                    if is_sanger_t_bam: has_sanger_t_bam = True
-
-                    if is_train2_t_bam and not is_sanger_t_bam: count_is_train2_not_sanger += 1
-                    if not is_train2_t_bam and is_sanger_t_bam: count_not_train2_is_sanger += 1
-                    if is_train2_t_bam and is_sanger_t_bam: count_is_train2_is_sanger += 1
-
-                    if not b_gnos_id: b_gnos_id = bam.get('gnos_id')
-                    if b_gnos_id and not b_gnos_id == bam.get('gnos_id'):
-                        duplicated_bwa_alignment_summary['exists_gnos_id_mismatch'] = True
-                        duplicated_bwa_alignment_summary['exists_gnos_id_mismatch_in_tumor'] = True
-                        duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams'] = True
-                        duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams_in_tumor'] = True
-                        aliquot['exists_mismatch_bwa_bams'] = True
-                        aliquot['exists_gnos_id_mismatch'] = True
-
-                    if not b_md5sum: b_md5sum = bam.get('md5sum')
-                    if b_md5sum and not b_md5sum == bam.get('md5sum'):
-                        duplicated_bwa_alignment_summary['exists_md5sum_mismatch'] = True
-                        duplicated_bwa_alignment_summary['exists_md5sum_mismatch_in_tumor'] = True
-                        duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams'] = True
-                        duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams_in_tumor'] = True
-                        aliquot['exists_mismatch_bwa_bams'] = True
-                        aliquot['exists_md5sum_mismatch'] = True
-
-                    if not xml_md5sum: xml_md5sum = bam.get('effective_xml_md5sum')
-                    if xml_md5sum and not xml_md5sum == bam.get('effective_xml_md5sum'):
-                        duplicated_bwa_alignment_summary['exists_gnos_xml_mismatch'] = True
-                        duplicated_bwa_alignment_summary['exists_gnos_xml_mismatch_in_tumor'] = True
-                        aliquot['exists_gnos_xml_mismatch'] = True
-
-                    if not b_version: b_version = bam.get('bwa_workflow_version')
-                    if b_version and not b_version == bam.get('bwa_workflow_version'):
-                        duplicated_bwa_alignment_summary['exists_version_mismatch'] = True
-                        duplicated_bwa_alignment_summary['exists_version_mismatch_in_tumor'] = True
-                        duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams'] = True
-                        duplicated_bwa_alignment_summary['exists_mismatch_bwa_bams_in_tumor'] = True
-                        aliquot['exists_version_mismatch'] = True
-                        aliquot['exists_mismatch_bwa_bams'] = True
-
-                if donor.get('flags').get('is_santa_cruz_donor') and not has_santa_cruz_t_bam:
-                    duplicated_bwa_alignment_summary['is_santa_cruz_freeze_bam_missing'] = True
-                    duplicated_bwa_alignment_summary['is_santa_cruz_freeze_tumor_bam_missing'] = True
-
-                if donor.get('flags').get('is_train2_donor') and not has_train2_t_bam:
-                    duplicated_bwa_alignment_summary['is_train2_freeze_bam_missing'] = True
-                    duplicated_bwa_alignment_summary['is_train2_freeze_tumor_bam_missing'] = True
-
-                if donor.get('flags').get('is_sanger_variant_calling_performed') and not has_sanger_t_bam:
-                    duplicated_bwa_alignment_summary['is_bam_used_by_sanger_missing'] = True
-                    duplicated_bwa_alignment_summary['is_tumor_bam_used_by_sanger_missing'] = True
-
-                if donor.get('flags').get('is_train2_donor') and \
-                        donor.get('flags').get('is_sanger_variant_calling_performed') and \
-                        not count_is_train2_is_sanger and \
-                        count_is_train2_not_sanger and count_not_train2_is_sanger:
-                    if duplicated_bwa_alignment_summary['exists_md5sum_mismatch']:
-                        duplicated_bwa_alignment_summary['exists_md5sum_mismatch_between_train2_marked_and_sanger_used'] = True
-                    if duplicated_bwa_alignment_summary['exists_version_mismatch']:
-                        duplicated_bwa_alignment_summary['exists_version_mismatch_between_train2_marked_and_sanger_used'] = True
-
-        donor['duplicated_bwa_alignment_summary'] = duplicated_bwa_alignment_summary
-
-
-def is_used_in_sanger_variant_call(donor, gnos_id):
+    aliquot['exists_mismatch_bwa_bams'] = False
+    for field, flag, is_bam_mismatch in bwa_mismatch_checks: aliquot[flag] = False
+
+    for field, flag, is_bam_mismatch in bwa_mismatch_checks:
+        if not exists_value_mismatch([bam.get(field) for bam in bams]): continue
+        for f in ([flag, 'exists_mismatch_bwa_bams'] if is_bam_mismatch else [flag]):
+            summary[f] = True
+            summary[f+'_in_'+specimen_type] = True
+            aliquot[f] = True
+
+    train2_gnos_ids = set(bam.get('gnos_id') for bam in bams if bam.get('is_train2_bam'))
+    sanger_gnos_ids = set(bam.get('gnos_id') for bam in bams if bam.get('is_used_in_sanger_variant_call'))
+
+    if donor_flags.get('is_santa_cruz_donor') and not any(bam.get('is_santa_cruz_entry') for bam in bams):
+        summary['is_santa_cruz_freeze_bam_missing'] = True
+        summary['is_santa_cruz_freeze_'+specimen_type+'_bam_missing'] = True
+
+    if donor_flags.get('is_train2_donor') and not train2_gnos_ids:
+        summary['is_train2_freeze_bam_missing'] = True
+        summary['is_train2_freeze_'+specimen_type+'_bam_missing'] = True
+
+    if donor_flags.get('is_sanger_variant_calling_performed') and not sanger_gnos_ids:
+        summary['is_bam_used_by_sanger_missing'] = True
+        summary['is_'+specimen_type+'_bam_used_by_sanger_missing'] = True
+
+    # the train2 marked and the sanger used bams are different ones
+    if donor_flags.get('is_train2_donor') and \
+            donor_flags.get('is_sanger_variant_calling_performed') and \
+            not train2_gnos_ids & sanger_gnos_ids and \
+            train2_gnos_ids - sanger_gnos_ids and sanger_gnos_ids - train2_gnos_ids:
+        if summary['exists_md5sum_mismatch']:
+            summary['exists_md5sum_mismatch_between_train2_marked_and_sanger_used'] = True
+        if summary['exists_version_mismatch']:
+            summary['exists_version_mismatch_between_train2_marked_and_sanger_used'] = True
+
+
+def get_sanger_input_gnos_ids(donor):
+    gnos_ids = set()
     if donor.get('variant_calling_results') and donor.get('variant_calling_results').get('sanger_variant_calling'):
         for input_gnos_entry in donor.get('variant_calling_results').get('sanger_variant_calling') \
                 .get('workflow_details').get('variant_pipeline_input_info'):
-            if gnos_id == input_gnos_entry.get('attributes').get('analysis_id'): return True
-
-    return False
-
+            gnos_ids.add(input_gnos_entry.get('attributes').get('analysis_id'))
 
-def is_train2_bam(donor, train2_freeze_bams, gnos_id, specimen_type):
-    if donor.get('donor_unique_id') and train2_freeze_bams.get(donor.get('donor_unique_id')) \
-            and train2_freeze_bams.get(donor.get('donor_unique_id')).get(gnos_id):
-        if not specimen_type == train2_freeze_bams.get(donor.get('donor_unique_id')).get(gnos_id).get('specimen_type'):
-            logger.warning('This should never happen: specimen type mismatch in train2 list in donor {}'
-                    .format(donor.get('donor_unique_id')))
-        return True
-    return False
+    return gnos_ids
 
 def add_consensus_entry(donor, consensus_entry):
     if not consensus_entry:
@@ -1856,25 +1748,16 @@ def add_train2_donor_flag(donor, train2_freeze_bams):
         donor.get('flags')['is_train2_donor'] = False
 
 
-def add_train2_pilot_flag(donor, annotation):
-    if donor.get('donor_unique_id') in annotation:
-        donor.get('flags')['is_train2_pilot'] = True
-    else:
-        donor.get('flags')['is_train2_pilot'] = False
+def add_train2_pilot_flag(donor, donor_id, annotation):
+    donor.get('flags')['is_train2_pilot'] = donor_id in annotation
 
 
-def add_donor_blacklist_flag(donor, annotation):
-    if donor.get('donor_unique_id') in annotation:
-        donor.get('flags')['is_donor_blacklisted'] = True
-    else:
-        donor.get('flags')['is_donor_blacklisted'] = False
+def add_donor_blacklist_flag(donor, donor_id, annotation):
+    donor.get('flags')['is_donor_blacklisted'] = donor_id in annotation
 
 
-def add_manual_qc_failed_flag(donor, annotation):
-    if donor.get('donor_unique_id') in annotation:
-        donor.get('flags')['is_manual_qc_failed'] = True
-    else:
-        donor.get('flags')['is_manual_qc_failed'] = False
+def add_manual_qc_failed_flag(donor, donor_id, annotation):
+    donor.get('flags')['is_manual_qc_failed'] = donor_id in annotation
 
 def add_gnos_repos_with_alignment_result(donor):
     repos = set()
@@ -2031,14 +1914,7 @@ def create_aggregated_bam_info_dict(bam):
             "effective_xml_md5sum": [bam['effective_xml_md5sum']],
             "gnos_last_modified": [bam['last_modified']],
             "gnos_published_date": [bam['published_date']],
-            "gnos_repo": [bam['gnos_repo']],
-            "is_santa_cruz_entry": bam['is_santa_cruz_entry'],
-            "is_aug2015_entry": bam['is_aug2015_entry'],
-            "is_oct2015_entry": bam['is_oct2015_entry'],
-            "is_mar2016_entry": bam['is_mar2016_entry'],
-            "is_may2016_entry": bam['is_may2016_entry'],
-            "is_s3_transfer_scheduled": bam['is_s3_transfer_scheduled'],
-            "is_s3_transfer_completed": bam['is_s3_transfer_completed']
+            "gnos_repo": [bam['gnos_repo']]
          },
          "bam_with_unmappable_reads": {},
          "unaligned_bams": {},
@@ -2046,6 +1922,7 @@ def create_aggregated_bam_info_dict(bam):
          "ContEST": bam['ContEST'],
          "Stars": bam['Stars']
     }
+    copy_membership_flags(aggregated_bam_info_dict['aligned_bam'], bam)
     
     return aggregated_bam_info_dict
 
@@ -2059,7 +1936,7 @@ def compare_specimen_type(specimen_type_A, specimen_type_B):
 
 
 
-def bam_aggregation(bam_files):
+def bam_aggregation(bam_files, gnos_id_membership):
     aggregated_bam_info_new = {}
     if not aggregated_bam_info_new.get('WGS'):
        aggregated_bam_info_new['WGS'] = {}
@@ -2095,33 +1972,11 @@ def bam_aggregation(bam_files):
                     alignment_status['exists_xml_md5sum_mismatch'] = False if len(set(alignment_status.get('aligned_bam').get('effective_xml_md5sum'))) == 1 else True
                     
             else:
-                if bam['is_may2016_entry']:
+                replacing = get_replacing_membership(gnos_id_membership.get(bam['bam_gnos_ao_id'], 0))
+                if replacing:
                     aggregated_bam_info[bam['aliquot_id']] = create_aggregated_bam_info_dict(bam)
-                    logger.info( 'Same aliquot: {} from donor: {} has different aligned GNOS BWA BAM entries, keep the one in may2016: {}, additional: {}'
-                        .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('aligned_bam').get('gnos_id')))
-                elif bam['is_mar2016_entry']:
-                    aggregated_bam_info[bam['aliquot_id']] = create_aggregated_bam_info_dict(bam)
-                    logger.info( 'Same aliquot: {} from donor: {} has different aligned GNOS BWA BAM entries, keep the one in mar2016: {}, additional: {}'
-                        .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('aligned_bam').get('gnos_id')))
-                elif bam['is_oct2015_entry']:
-                    aggregated_bam_info[bam['aliquot_id']] = create_aggregated_bam_info_dict(bam)
-                    logger.info( 'Same aliquot: {} from donor: {} has different aligned GNOS BWA BAM entries, keep the one in oct2015: {}, additional: {}'
-                        .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('aligned_bam').get('gnos_id')))
-                elif bam['is_s3_transfer_scheduled']:
-                    aggregated_bam_info[bam['aliquot_id']] = create_aggregated_bam_info_dict(bam)
-                    logger.info( 'Same aliquot: {} from donor: {} has different aligned GNOS BWA BAM entries, keep the one scheduled for S3 transfer: {}, additional: {}'
-                        .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('aligned_bam').get('gnos_id')))
-
-                elif bam['is_aug2015_entry']:
-                    aggregated_bam_info[bam['aliquot_id']] = create_aggregated_bam_info_dict(bam)
-                    logger.info( 'Same aliquot: {} from donor: {} has different aligned GNOS BWA BAM entries, keep the one in aug2015: {}, additional: {}'
-                        .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('aligned_bam').get('gnos_id')))
-
-
-                elif bam['is_santa_cruz_entry']:
-                    aggregated_bam_info[bam['aliquot_id']] = create_aggregated_bam_info_dict(bam)
-                    logger.info( 'Same aliquot: {} from donor: {} has different aligned GNOS BWA BAM entries, keep the one in santa_cruz: {}, additional: {}'
-                        .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('aligned_bam').get('gnos_id')))
+                    logger.info( 'Same aliquot: {} from donor: {} has different aligned GNOS BWA BAM entries, keep the one {}: {}, additional: {}'
+                        .format(bam['aliquot_id'], bam['donor_unique_id'], replacing, bam['gnos_metadata_url'], alignment_status.get('aligned_bam').get('gnos_id')))
 
                 else:
                     logger.warning( 'Same aliquot: {} from donor: {} has different aligned GNOS BWA BAM entries, in use: {}, additional: {}'
@@ -2272,39 +2127,12 @@ def bam_aggregation(bam_files):
 
 
                 else:
-                    if bam['is_may2016_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['tophat'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different tophat aligned GNOS RNA_Seq BAM entries, keep the one in may2016: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('tophat').get('aligned_bam').get('gnos_id')))
-                    elif bam['is_mar2016_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['tophat'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different tophat aligned GNOS RNA_Seq BAM entries, keep the one in mar2016: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('tophat').get('aligned_bam').get('gnos_id')))
-                    elif bam['is_oct2015_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['tophat'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different tophat aligned GNOS RNA_Seq BAM entries, keep the one in oct2015: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('tophat').get('aligned_bam').get('gnos_id')))
-                    elif bam['is_s3_transfer_scheduled']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['tophat'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different tophat aligned GNOS RNA_Seq BAM entries, keep the one scheduled for S3 transfer: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('tophat').get('aligned_bam').get('gnos_id')))
-
-                    elif bam['is_aug2015_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['tophat'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different tophat aligned GNOS RNA_Seq BAM entries, keep the one in aug2015: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('tophat').get('aligned_bam').get('gnos_id')))
-
-
-                    elif bam['is_santa_cruz_entry']:
+                    replacing = get_replacing_membership(gnos_id_membership.get(bam['bam_gnos_ao_id'], 0))
+                    if replacing:
                         aliquot_tmp = create_aggregated_rna_bam_info(bam)
                         alignment_status['tophat'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different tophat aligned GNOS RNA_Seq BAM entries, keep the one in santa_cruz: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('tophat').get('aligned_bam').get('gnos_id')))
+                        logger.info( 'Same aliquot: {} from donor: {} has different tophat aligned GNOS RNA_Seq BAM entries, keep the one {}: {}, additional: {}'
+                            .format(bam['aliquot_id'], bam['donor_unique_id'], replacing, bam['gnos_metadata_url'], alignment_status.get('tophat').get('aligned_bam').get('gnos_id')))
 
                     else:
                         logger.warning( 'Same aliquot: {} from donor: {} using same workflow: {} has different tophat aligned GNOS RNA_Seq BAM entries, in use: {}, additional: {}'
@@ -2337,40 +2165,12 @@ def bam_aggregation(bam_files):
                         alignment_status.get('star')['exists_xml_md5sum_mismatch'] = False if len(set(alignment_status.get('star').get('aligned_bam').get('effective_xml_md5sum'))) == 1 else True
 
                 else:
-                    if bam['is_may2016_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['star'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different star aligned GNOS RNA_Seq BAM entries, keep the one in may2016: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('star').get('aligned_bam').get('gnos_id')))
-                    elif bam['is_mar2016_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['star'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different star aligned GNOS RNA_Seq BAM entries, keep the one in mar2016: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('star').get('aligned_bam').get('gnos_id')))
-                    elif bam['is_oct2015_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['star'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different star aligned GNOS RNA_Seq BAM entries, keep the one in oct2015: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('star').get('aligned_bam').get('gnos_id')))
-                    elif bam['is_s3_transfer_scheduled']:
+                    replacing = get_replacing_membership(gnos_id_membership.get(bam['bam_gnos_ao_id'], 0))
+                    if replacing:
                         aliquot_tmp = create_aggregated_rna_bam_info(bam)
                         alignment_status['star'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different star aligned GNOS RNA_Seq BAM entries, keep the one scheduled for transfer: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('star').get('aligned_bam').get('gnos_id')))
-
-                    elif bam['is_aug2015_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['star'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different star aligned GNOS RNA_Seq BAM entries, keep the one in aug2015: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('star').get('aligned_bam').get('gnos_id')))
-
-
-                    elif bam['is_santa_cruz_entry']:
-                        aliquot_tmp = create_aggregated_rna_bam_info(bam)
-                        alignment_status['star'] = aliquot_tmp
-                        logger.info( 'Same aliquot: {} from donor: {} has different star aligned GNOS RNA_Seq BAM entries, keep the one in santa_cruz: {}, additional: {}'
-                            .format(bam['aliquot_id'], bam['donor_unique_id'], bam['gnos_metadata_url'], alignment_status.get('star').get('aligned_bam').get('gnos_id')))
-
+                        logger.info( 'Same aliquot: {} from donor: {} has different star aligned GNOS RNA_Seq BAM entries, keep the one {}: {}, additional: {}'
+                            .format(bam['aliquot_id'], bam['donor_unique_id'], replacing, bam['gnos_metadata_url'], alignment_status.get('star').get('aligned_bam').get('gnos_id')))
 
                     else:
                         logger.warning( 'Same aliquot: {} from donor: {} using same workflow: {} has different star aligned GNOS RNA_Seq BAM entries, in use: {}, additional: {}'
@@ -2400,13 +2200,6 @@ def create_aggregated_rna_bam_info(bam):
         "icgc_sample_id": bam['icgc_sample_id'],
         "dcc_specimen_type": bam['dcc_specimen_type'],
         "aligned": True,    
-        "is_santa_cruz_entry": bam['is_santa_cruz_entry'],
-        "is_aug2015_entry": bam['is_aug2015_entry'],
-        "is_oct2015_entry": bam['is_oct2015_entry'],
-        "is_mar2016_entry": bam['is_mar2016_entry'],
-        "is_may2016_entry": bam['is_may2016_entry'],
-        "is_s3_transfer_scheduled": bam['is_s3_transfer_scheduled'],  
-        "is_s3_transfer_completed": bam['is_s3_transfer_completed'],
         "exists_xml_md5sum_mismatch": False,           
         "aligned_bam": {
             "gnos_repo": [bam['gnos_repo']],
@@ -2422,6 +2215,7 @@ def create_aggregated_rna_bam_info(bam):
             "effective_xml_md5sum": [bam['effective_xml_md5sum']]
             }
         }
+    copy_membership_flags(aliquot_tmp, bam)
     return aliquot_tmp
 
 
@@ -2468,6 +2262,8 @@ def main(argv=None):
              help="File(s) containing GNOS IDs to be excluded, use filename pattern to specify the file(s)", required=False)
     parser.add_argument("-s", "--es_index_suffix", dest="es_index_suffix", # don't use this option for daily cron job
              help="Single letter suffix for ES index name", required=False)
+    parser.add_argument("-p", "--profile", dest="profile", action="store_true", # sampling profiler, for investigating only
+             help="Sample the call stacks while processing, written next to the log file", required=False)
 
     args = parser.parse_args()
     metadata_dir = args.metadata_dir
@@ -2494,7 +2290,8 @@ def main(argv=None):
     logger.setLevel(logging.INFO)
     ch.setLevel(logging.WARN)
 
-    log_file = metadata_dir + '.metadata_parser' + ('' if not repo else '.'+repo) + '.log'
+    log_base = metadata_dir + '.metadata_parser' + ('' if not repo else '.'+repo)
+    log_file = log_base + '.log'
     # delete old log first if exists
     if os.path.isfile(log_file): os.remove(log_file)
 
@@ -2511,7 +2308,14 @@ def main(argv=None):
     es = init_es(es_host, es_index)
 
     logger.info('processing metadata list files in {} to build es index {}'.format(metadata_dir, es_index))
+    sampler = StackSampler().start() if args.profile else None
     process(metadata_dir, conf, es_index, es, metadata_dir+'/donor_'+es_index+'.jsonl', metadata_dir+'/bam_'+es_index+'.jsonl', repo, exclude_gnos_id_lists)
+    if sampler:
+        sampler.stop()
+        sampler.write(log_base + '.profile.txt')
+
+    run_stats.log(logger)
+    run_stats.write(log_base + '.run_summary.json', metadata_dir=metadata_dir, es_index=es_index, repo=repo)
 
     # now update kibana dashboard
     # donor
@@ -8,6 +8,7 @@ from collections import OrderedDict
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_msearch import msearch
 
 es_host = 'localhost:9200'
 es_type = "donor"
@@ -711,8 +712,10 @@ def generate_report(es_index, es_queries, metadata_dir, report_name, timestamp,
         "tumor_unaligned_normal_missing"
     ]
 
+    # all count queries go out in one msearch
+    responses = msearch(es, es_index, es_queries[:len(count_types)])
     for q_index in range(len(count_types)):
-        response = es.search(index=es_index, body=es_queries[q_index])
+        response = next(responses)
         #print(json.dumps(response['aggregations']['project_f']))  # for debugging
     
         for p in response['aggregations']['project_f']['project'].get('buckets'):
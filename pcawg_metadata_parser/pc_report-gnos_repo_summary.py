@@ -8,7 +8,9 @@ from collections import OrderedDict
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_msearch import msearch
 import shutil
+from gnos_repo_registry import get_repo_code
 
 
 es_host = 'localhost:9200'
@@ -1087,9 +1089,11 @@ def generate_report(es_index, es_queries, metadata_dir, report_name, timestamp,
         #"train2_pilot_donors"
     ]
 
+    # donor and specimen count queries of all count types go out in one msearch
+    responses = msearch(es, es_index, [q for queries in es_queries[:len(count_types)] for q in queries[:2]])
     for q_index in range(len(count_types)):
         # get donor counts
-        response = es.search(index=es_index, body=es_queries[q_index][0])
+        response = next(responses)
         #print json.dumps(response['aggregations']['gnos_f']) + '\n'  # for debugging
     
         donors_per_repo[count_types[q_index]] = {}
@@ -1113,7 +1117,7 @@ def generate_report(es_index, es_queries, metadata_dir, report_name, timestamp,
 
         # get specimen counts
         if len(es_queries[q_index]) >= 2:
-            response = es.search(index=es_index, body=es_queries[q_index][1])
+            response = next(responses)
             #print json.dumps(response['aggregations']['gnos_f']) + '\n'  # for debugging
         else:
             continue
@@ -1143,41 +1147,18 @@ def generate_report(es_index, es_queries, metadata_dir, report_name, timestamp,
 
         repos = {}
         for original_repo in report.keys():
-            repos[get_formal_repo_name(original_repo)] = {
+            repos[get_repo_code(original_repo)] = {
                 "_ori_count": report[original_repo][ctype]['count'] if report.get(original_repo).get(ctype) else []
             }
             if not report.get(original_repo).get(ctype):
                 continue
             for repo, count in report[original_repo][ctype]['repos'].iteritems():
-                repos[get_formal_repo_name(original_repo)][get_formal_repo_name(repo)] = count
+                repos[get_repo_code(original_repo)][get_repo_code(repo)] = count
 
         with open(report_dir + '/' + ctype + '.repos.json', 'w') as o:
             o.write(json.dumps(repos))
 
 
-def get_formal_repo_name(repo):
-    repo_url_to_repo = {
-      "https://gtrepo-bsc.annailabs.com/": "bsc",
-      "bsc": "bsc",
-      "https://gtrepo-ebi.annailabs.com/": "ebi",
-      "ebi": "ebi",
-      "https://cghub.ucsc.edu/": "cghub",
-      "cghub": "cghub",
-      "https://gtrepo-dkfz.annailabs.com/": "dkfz",
-      "dkfz": "dkfz",
-      "https://gtrepo-riken.annailabs.com/": "riken",
-      "riken": "riken",
-      "https://gtrepo-osdc-icgc.annailabs.com/": "osdc-icgc",
-      "osdc-icgc": "osdc-icgc",
-      "https://gtrepo-osdc-tcga.annailabs.com/": "osdc-tcga",
-      "osdc-tcga": "osdc-tcga",
-      "https://gtrepo-etri.annailabs.com/": "etri",
-      "etri": "etri"
-    }
-
-    return repo_url_to_repo.get(repo)
-
-
 def add_specimen_counts_per_repo(repos, repo_buckets_normal, repo_buckets_tumor):
     for s in repo_buckets_normal:
       if repos.get(s.get('key')):
@@ -1194,7 +1175,7 @@ def get_donors_per_repo(repo_buckets, donors):
     repos = {}
     for d in repo_buckets:
         repos[d.get('key')] = [d.get('doc_count')]
-        donors[get_formal_repo_name(d.get('key'))] = [ item.get('key').replace('::', '\t') for item in d.get('donors').get('buckets') ]
+        donors[get_repo_code(d.get('key'))] = [ item.get('key').replace('::', '\t') for item in d.get('donors').get('buckets') ]
     return repos
 
 
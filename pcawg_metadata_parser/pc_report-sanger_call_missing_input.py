@@ -8,6 +8,7 @@ from collections import OrderedDict
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 from elasticsearch1 import Elasticsearch
+from es_paging import scan_hits
 from operator import itemgetter
 
 
@@ -81,9 +82,7 @@ def generate_report(es_index, es_queries, metadata_dir, report_name, timestamp,
 
     q_index = 0
     report = []
-    response = es.search(index=es_index, body=es_queries[q_index])
-    #print(json.dumps(response['aggregations']['project_f']))  # for debugging
-    for p in response['hits']['hits']:
+    for p in scan_hits(es, es_index, es_queries[q_index]):
         summary=OrderedDict()
         summary['dcc_project_code'] = p.get('fields').get('dcc_project_code')[0]
         summary['donor_unique_id'] = p.get('fields').get('donor_unique_id')[0]
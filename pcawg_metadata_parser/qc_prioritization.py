@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+# Donor level QC prioritization, ported from Keiran's prioritise_by_qc.pl so
+# the parser can score each donor as it is built instead of a separate Perl
+# run over the gzipped donor jsonl. Every issue found in the bwa alignment
+# qc_metrics / markduplicates_metrics of the normal and tumour aliquots sets
+# one bit, the sum of the bits is the donor qc_score (0: no issue found).
+
+import re
+from collections import OrderedDict
+
+
+DIV_X = 3000000000.0
+EXP_GC = 40.9
+MIN_SEQX = 25
+MAX_ABS_GC_DEVIATION = 5
+MAX_ISIZE_SD_FRAC = 0.3
+MAX_DUP_FRAC = 0.15
+READ_MAP_DIST_MAX = 0.25
+
+HC = {
+    'Tumour': {
+        'edit_dist': 1,
+        'gc_r1_dev': 4,
+        'gc_r2_dev': 16,
+        'gc_dist': 64,
+        'sd_frac': 256,
+        'dup_frac': 1024,
+        'end_map_disc': 4096,
+        'low_seq': 16384,
+        'no_qc': 65536,
+        'not_aligned': 262144,
+        'none': 1048576,
+        'broken': 4194304
+    },
+    'Normal': {
+        'edit_dist': 2,
+        'gc_r1_dev': 8,
+        'gc_r2_dev': 32,
+        'gc_dist': 128,
+        'sd_frac': 512,
+        'dup_frac': 2048,
+        'end_map_disc': 8192,
+        'low_seq': 32768,
+        'no_qc': 131072,
+        'not_aligned': 524288,
+        'none': 2097152,
+        'broken': 8388608
+    }
+}
+
+donor_ordered_issues = [
+    'Normal available',
+    'Normal low seqX',
+    'Normal r1_GC deviation',
+    'Normal r2_GC deviation',
+    'Normal GC dist',
+    'Normal isize_sd',
+    'Normal edit dist',
+    'Normal dup_frac',
+    'Normal end map dist',
+    'Normal qc_metric absent',
+    'Normal broken',
+    'Tumour available',
+    'Tumour low seqX',
+    'Tumour r1_GC deviation',
+    'Tumour r2_GC deviation',
+    'Tumour GC dist',
+    'Tumour isize_sd',
+    'Tumour edit dist',
+    'Tumour dup_frac',
+    'Tumour end map dist',
+    'Tumour qc_metric absent',
+    'Tumour broken'
+]
+
+report_fields = ['GNOS repo', 'GNOS Study', 'Unique DonorId', 'Normal coverage', 'Tumour coverage',
+                 'Normalised coverage', 'Tumours'] + donor_ordered_issues + ['Issue Summary']
+
+summed_metrics = [
+    '#_mapped_bases',
+    '#_gc_bases_r1',
+    '#_gc_bases_r2',
+    '#_divergent_bases_r1',
+    '#_divergent_bases_r2',
+    '#_mapped_bases_r1',
+    '#_mapped_bases_r2'
+]
+
+
+def reported(value, digits=2):
+    # thresholds apply to the values as the Perl script printed them
+    return None if value is None else float('%.*f' % (digits, value))
+
+
+def ratio(a, b):
+    # the Perl script died on these, a missing value just skips its check here
+    return float(a) / b if b else None
+
+
+def assess_aliquot(specimen, norm_or_tum, donor_issues):
+    hc = HC.get(norm_or_tum)
+    summary = dict.fromkeys(summed_metrics + ['#_bases_r1', '#_bases_r2'], 0)
+    max_insert_sd = 0
+    mapped_r1, mapped_r2, all_r1, all_r2 = 0, 0, 0, 0
+
+    for rg in specimen.get('alignment').get('qc_metrics'):
+        metrics = rg.get('metrics')
+        m = lambda k: metrics.get(k) or 0
+        for k in summed_metrics: summary[k] += m(k)
+        summary['#_bases_r1'] += m('#_total_reads_r1') * m('read_length_r1')
+        summary['#_bases_r2'] += m('#_total_reads_r2') * m('read_length_r2')
+
+        if m('#_mapped_bases') == 0:
+            donor_issues[norm_or_tum+' broken'] = hc.get('broken')
+            continue
+        sd_frac = ratio(m('insert_size_sd'), m('mean_insert_size'))
+        if sd_frac is not None and sd_frac > max_insert_sd: max_insert_sd = sd_frac
+
+        mapped_r1 += m('#_mapped_reads_r1')
+        mapped_r2 += m('#_mapped_reads_r2')
+        all_r1 += m('#_total_reads_r1')
+        all_r2 += m('#_total_reads_r2')
+
+    seq_x = reported(summary['#_mapped_bases'] / DIV_X)
+    if seq_x < MIN_SEQX: donor_issues[norm_or_tum+' low seqX'] = hc.get('low_seq')
+
+    gc_dev = []
+    for r, issue, flag in [('r1', ' r1_GC deviation', 'gc_r1_dev'), ('r2', ' r2_GC deviation', 'gc_r2_dev')]:
+        gc = ratio(summary['#_gc_bases_'+r], summary['#_bases_'+r])
+        gc_dev.append(reported(gc*100 - EXP_GC) if gc is not None else None)
+        if gc_dev[-1] is not None and abs(gc_dev[-1]) > MAX_ABS_GC_DEVIATION:
+            donor_issues[norm_or_tum+issue] = hc.get(flag)
+
+    # GC distance comparing R1vsR2
+    if not None in gc_dev and reported(abs(gc_dev[1] - gc_dev[0])) > MAX_ABS_GC_DEVIATION:
+        donor_issues[norm_or_tum+' GC dist'] = hc.get('gc_dist')
+
+    map_r1 = reported(ratio(mapped_r1, all_r1), 5)
+    map_r2 = reported(ratio(mapped_r2, all_r2), 5)
+    if map_r1 and map_r2 is not None and abs(1 - map_r2 / map_r1) > READ_MAP_DIST_MAX:
+        donor_issues[norm_or_tum+' end map dist'] = hc.get('end_map_disc')
+
+    edits = [reported(ratio(summary['#_divergent_bases_'+r], summary['#_mapped_bases_'+r])*100)
+                for r in ('r1', 'r2') if summary['#_mapped_bases_'+r]]
+    if len(edits) == 2 and max(edits) > min(edits)*2:
+        donor_issues[norm_or_tum+' edit dist'] = hc.get('edit_dist')
+
+    if max_insert_sd > MAX_ISIZE_SD_FRAC: donor_issues[norm_or_tum+' isize_sd'] = hc.get('sd_frac')
+
+    total_dup, total_mapped = 0, 0
+    for lib in specimen.get('alignment').get('markduplicates_metrics'):
+        # have to make compatible with multi library
+        metrics = lib.get('metrics')
+        m = lambda k: metrics.get(k) or 0
+        total_dup += m('read_pair_duplicates') * 2 + m('unpaired_read_duplicates')
+        total_mapped += m('read_pairs_examined') * 2 + m('unpaired_reads_examined')
+    overall_dup_frac = ratio(total_dup, total_mapped) if total_mapped else 1
+    if overall_dup_frac > MAX_DUP_FRAC: donor_issues[norm_or_tum+' dup_frac'] = hc.get('dup_frac')
+
+    return summary['#_mapped_bases']
+
+
+def process_aliquot(specimen, norm_or_tum, donor_issues):
+    if not specimen.get('alignment', {}).get('qc_metrics'):
+        donor_issues[norm_or_tum+' qc_metric absent'] = HC.get(norm_or_tum).get('no_qc')
+        return 0
+    return assess_aliquot(specimen, norm_or_tum, donor_issues)
+
+
+def get_gnos_repo_name(gnos_repo):
+    gnos_repo = gnos_repo or 'unknown'  # this should not happen, but if it happens it won't error out
+    gnos_repo = re.sub(r'^https:/{2}', '', gnos_repo)
+    gnos_repo = re.sub(r'^gtrepo\-', '', gnos_repo)
+    return re.sub(r'\.(ucsc\.edu|annailabs\.com)\/$', '', gnos_repo)
+
+
+def assess_donor(donor):
+    # returns the qc_score of the donor and its row in the qc_donor_prioritization report
+    donor_issues = {}
+    flags = donor.get('flags')
+
+    normal = donor.get('normal_specimen') or {}
+    if not 'is_aligned' in normal:
+        donor_issues['Normal available'] = HC['Normal']['none']
+    else:
+        donor_issues['Normal available'] = 0 if normal.get('is_aligned') else HC['Normal']['not_aligned']
+
+    norm_x = 0
+    if donor_issues['Normal available'] == 0:
+        norm_x = process_aliquot(normal, 'Normal', donor_issues)
+
+    all_tumor_counts = flags.get('all_tumor_specimen_aliquot_counts') or 0
+    aligned_tumor_counts = flags.get('aligned_tumor_specimen_aliquot_counts') or 0
+    tum_x = 0
+    if all_tumor_counts == 0:
+        donor_issues['Tumour available'] = HC['Tumour']['none']
+    elif aligned_tumor_counts == 0 or aligned_tumor_counts != all_tumor_counts:
+        donor_issues['Tumour available'] = HC['Tumour']['not_aligned']
+    else:
+        donor_issues['Tumour available'] = 0
+        for specimen in donor.get('aligned_tumor_specimens'):
+            tum_x += process_aliquot(specimen, 'Tumour', donor_issues)
+
+    row = OrderedDict()
+    row['GNOS repo'] = get_gnos_repo_name(donor.get('original_gnos_assignment'))
+    row['GNOS Study'] = donor.get('gnos_study')
+    row['Unique DonorId'] = donor.get('donor_unique_id')
+    # this reflects the combined coverage for T/N * number of T/N
+    if donor_issues['Normal available'] == 0 and aligned_tumor_counts > 0:
+        row['Normal coverage'] = '%.2f' % (norm_x / DIV_X)
+        row['Tumour coverage'] = '%.2f' % (tum_x / aligned_tumor_counts / DIV_X)
+        row['Normalised coverage'] = '%.2f' % ((norm_x + tum_x) / (aligned_tumor_counts + 1) / DIV_X)
+    else:
+        row['Normal coverage'] = row['Tumour coverage'] = row['Normalised coverage'] = '.'
+    row['Tumours'] = all_tumor_counts
+    for issue in donor_ordered_issues: row[issue] = donor_issues.get(issue, 0)
+    row['Issue Summary'] = sum(donor_issues.values())
+
+    return row['Issue Summary'], row
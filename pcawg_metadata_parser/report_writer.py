@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+# Writers for the tsv reports. The row formatter is built once from the
+# header fields instead of checking keys and types field by field for every
+# row, lines go out through a large write buffer, and rows that need to come
+# out in order (eg, by donor_unique_id) can be sorted externally: sorted runs
+# are spilled to temp files and merged back, so memory does not grow with
+# the report size.
+
+import heapq
+import tempfile
+import cPickle as pickle
+
+
+write_buffer_size = 1 << 20
+
+
+def format_value(v):
+    # list and set values are joined by '|', None as empty
+    if v is None:
+        return ''
+    elif isinstance(v, (list, set)):
+        return '|'.join(v)
+    return str(v)
+
+
+def format_value_or_empty(v):
+    # only set values are joined by '|', all false values as empty
+    if isinstance(v, set):
+        return '|'.join(v)
+    elif not v:
+        return ''
+    return str(v)
+
+
+def make_row_formatter(fields, value_formatter=format_value, line_end='\n'):
+    fields = tuple(fields)
+    def format_row(row):
+        get = row.get
+        return '\t'.join([value_formatter(get(f)) for f in fields]) + line_end
+    return format_row
+
+
+class TsvWriter(object):
+
+    def __init__(self, filename, fields=None, header=None, value_formatter=format_value, line_end='\n'):
+        # fields: row keys to write, the header is taken from the first row when not given
+        # header: column names, same as fields when not given
+        self.fh = open(filename, 'w', write_buffer_size)
+        self.header = header
+        self.value_formatter = value_formatter
+        self.line_end = line_end
+        self._format_row = None
+        # without fields every row is written with its own keys, as the report
+        # rows do not all have the same keys (eg, QC rows without aligned_bam)
+        self._row_keys = not fields
+        if fields: self._init_formatter(fields)
+
+    def _init_formatter(self, fields):
+        self._fields = tuple(fields)
+        self.fh.write('\t'.join(self.header or fields) + '\n')
+        self._format_row = make_row_formatter(fields, self.value_formatter, self.line_end)
+
+    def write(self, row):
+        if not self._format_row: self._init_formatter(list(row.keys()))
+        if self._row_keys:
+            keys = tuple(row.keys())
+            if keys != self._fields:
+                self.fh.write(make_row_formatter(keys, self.value_formatter, self.line_end)(row))
+                return
+        self.fh.write(self._format_row(row))
+
+    def writerows(self, rows):
+        for row in rows: self.write(row)
+
+    def close(self):
+        self.fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ExternalSorter(object):
+    # stable sort of rows by key, holding at most run_size rows in memory
+
+    def __init__(self, key, run_size=50000):
+        self.key = key
+        self.run_size = run_size
+        self._rows = []
+        self._runs = []
+        self._count = 0
+
+    def add(self, row):
+        # the running count keeps rows with the same key in insertion order
+        self._rows.append((self.key(row), self._count, row))
+        self._count += 1
+        if len(self._rows) >= self.run_size: self._spill()
+
+    def extend(self, rows):
+        for row in rows: self.add(row)
+
+    def _spill(self):
+        self._rows.sort()
+        run = tempfile.TemporaryFile()
+        for r in self._rows: pickle.dump(r, run, pickle.HIGHEST_PROTOCOL)
+        run.seek(0)
+        self._runs.append(run)
+        self._rows = []
+
+    def _read_run(self, run):
+        try:
+            while True: yield pickle.load(run)
+        except EOFError:
+            run.close()
+
+    def __iter__(self):
+        self._rows.sort()
+        runs = [self._read_run(run) for run in self._runs] + [iter(self._rows)]
+        for key, count, row in heapq.merge(*runs):
+            yield row
+        self._rows = []
+        self._runs = []
@@ -98,15 +98,11 @@ echo running alignment summary report for $M
 ./pc_report-transfer_summary.py -m $M
 ./generate_QC_reports.py -m $M
 ./compare_xml_md5sum.py -m $M
-./generate_variant_called_donors.py -m $M
-./generate_aligned_donors.py -m $M
-./generate_all_donors.py -m $M
+./generate_donor_exports.py -m $M
 ./generate_pcawg_sample_sheet.py -m $M
 ./generate_pcawg_specimen_alignment_summary.py -m $M
 ./generate_gnos_repo_sync_reports.py -m $M -s wgs rna_seq -v sanger dkfz broad muse broad_tar
 
-# cleaning the old ES index
-curl -XDELETE localhost:9200/pcawg_summary
 ./generate_release.py -m $M -f pcawg_summary -v sanger dkfz broad muse broad_tar
 #./generate_bsc_sync_reports.py -m $M
 ./generate_pcawg_lane_level_gnos_analysis_ids.py -m $M
@@ -114,12 +110,6 @@ curl -XDELETE localhost:9200/pcawg_summary
 echo gzip all jsonl files under $M
 gzip $M/*.jsonl
 
-# comment this out for now as it seems cause problems
-echo generating aggregated QC prioritization metric
-perl ../metadata_tools/prioritise_by_qc.pl $M/donor_p_????????????.jsonl.gz > $M/qc_donor_prioritization.txt
-
-cp $M/qc_donor_prioritization.txt $DIR/
-
 
 # create symlink
 echo
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+# Phase timers and counters for the long running scripts. Every phase
+# accumulates wall and CPU seconds and the number of times it was entered,
+# counters are plain sums (files, bytes, donors, ...). The run summary is
+# written as json so runs can be compared, eg, to spot a phase getting slower.
+#
+# StackSampler is an optional low overhead sampling profiler: a SIGPROF timer
+# records the Python stack every interval seconds of CPU time, the samples are
+# written in the collapsed stack format flame graph tools read
+# (frame;frame;frame count).
+
+import os
+import json
+import time
+import signal
+import socket
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def cpu_time():
+    t = os.times()
+    return t[0] + t[1]
+
+
+class RunStats(object):
+
+    def __init__(self):
+        self.started = time.time()
+        self.started_cpu = cpu_time()
+        self.phases = OrderedDict()
+        self.counters = OrderedDict()
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = time.time(), cpu_time()
+        try:
+            yield
+        finally:
+            p = self.phases.get(name)
+            if not p: p = self.phases[name] = {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0}
+            p['calls'] += 1
+            p['wall_seconds'] += time.time() - wall
+            p['cpu_seconds'] += cpu_time() - cpu
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self, **info):
+        summary = OrderedDict()
+        summary['host'] = socket.gethostname()
+        summary['started'] = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started))
+        summary['wall_seconds'] = round(time.time() - self.started, 3)
+        summary['cpu_seconds'] = round(cpu_time() - self.started_cpu, 3)
+        summary.update(info)
+        summary['phases'] = OrderedDict()
+        for name, p in self.phases.iteritems():
+            summary['phases'][name] = OrderedDict([
+                ('calls', p['calls']),
+                ('wall_seconds', round(p['wall_seconds'], 3)),
+                ('cpu_seconds', round(p['cpu_seconds'], 3))
+            ])
+        summary['counters'] = self.counters
+        return summary
+
+    def write(self, file_name, **info):
+        with open(file_name + '.tmp', 'w') as f:
+            f.write(json.dumps(self.summary(**info), indent=4) + '\n')
+        os.rename(file_name + '.tmp', file_name)
+
+    def log(self, logger):
+        for name, p in self.phases.iteritems():
+            logger.info('phase {}: {} calls, {:.1f}s wall, {:.1f}s cpu'
+                          .format(name, p['calls'], p['wall_seconds'], p['cpu_seconds']))
+        for name, n in self.counters.iteritems():
+            logger.info('count {}: {}'.format(name, n))
+
+
+class StackSampler(object):
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = {}
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame:
+            code = frame.f_code
+            stack.append('{}:{}'.format(os.path.basename(code.co_filename), code.co_name))
+            frame = frame.f_back
+        key = ';'.join(reversed(stack))
+        self.samples[key] = self.samples.get(key, 0) + 1
+
+    def start(self):
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.siginterrupt(signal.SIGPROF, False)  # restart system calls the sample interrupted
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def write(self, file_name):
+        with open(file_name, 'w') as f:
+            for stack, n in sorted(self.samples.iteritems(), key=lambda s: -s[1]):
+                f.write('{} {}\n'.format(stack, n))
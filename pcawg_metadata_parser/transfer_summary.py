@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+# Shared by the transfer summary reports: one field restricted query gets
+# project, tumor aliquot count and alignment flags of all donors up front, and
+# the completed transfer jobs are indexed from the job file names, with the
+# parsed names cached per completed-jobs directory, so the report is a join of
+# the two in memory instead of ES round trips per project and per donor.
+
+import os
+import glob
+import json
+import copy
+import shutil
+from fnmatch import fnmatch
+from collections import OrderedDict
+from es_paging import scan_hits
+
+
+transfer_jobs_cache_file = 'gnos_metadata/transfer_jobs_index.json'
+
+count_types = [
+    "expected_to_be_transferred",
+    "both_transferred",
+    "normal_transferred_tumor_not",
+    "tumor_transferred_normal_not",
+    "both_not_transferred"
+]
+
+
+def get_donor_transfer_info(es, es_index):
+    es_query_donors = {
+        "fields": [
+            "donor_unique_id",
+            "dcc_project_code",
+            "flags.all_tumor_specimen_aliquot_counts",
+            "flags.is_normal_specimen_aligned",
+            "flags.are_all_tumor_specimens_aligned",
+            "flags.is_manual_qc_failed"
+        ],
+        "query": {
+            "match_all": {}
+        },
+        "size": 10000
+    }
+
+    donors = {}
+    for p in scan_hits(es, es_index, es_query_donors):
+        fields = p.get('fields')
+        field = lambda f: fields.get(f)[0] if fields.get(f) else None
+        donors[field('donor_unique_id')] = {
+            'dcc_project_code': field('dcc_project_code'),
+            'tumor_aliquot_count': field('flags.all_tumor_specimen_aliquot_counts'),
+            # aligned normal and all tumors, not failed in manual qc
+            'is_expected': field('flags.is_normal_specimen_aligned') is True \
+                and field('flags.are_all_tumor_specimens_aligned') is True \
+                and not field('flags.is_manual_qc_failed') is True
+        }
+
+    return donors
+
+
+def get_transfer_jobs(git_fnames):
+    # git_fnames: glob of the completed job json files, eg, '../s3-transfer-operations/s3-transfer-jobs*/completed-jobs/*.json'
+    # job file names are: gnos_id.dcc_project_code.donor_id.specimen_id.data_type.json
+    job_dir_pattern, fname_pattern = os.path.split(git_fnames)
+
+    cache = {}
+    if os.path.isfile(transfer_jobs_cache_file):
+        with open(transfer_jobs_cache_file, 'r') as c: cache = json.load(c)
+
+    cache_updated = False
+    jobs = dict()
+    for job_dir in sorted(glob.glob(job_dir_pattern)):
+        # directory mtime changes whenever a job file is added or removed
+        mtime = os.path.getmtime(job_dir)
+        cache_key = job_dir + '/' + fname_pattern
+        if not cache.get(cache_key) or cache.get(cache_key).get('mtime') != mtime:
+            cache[cache_key] = {
+                'mtime': mtime,
+                'jobs': [str.split(fname, '.')[:5] for fname in sorted(os.listdir(job_dir)) if fnmatch(fname, fname_pattern)]
+            }
+            cache_updated = True
+
+        for gnos_id, dcc_project_code, donor_id, specimen_id, data_type in cache.get(cache_key).get('jobs'):
+            jobs.setdefault(dcc_project_code, {}).setdefault(donor_id, {}).setdefault(data_type, set()).add(gnos_id)
+
+    if cache_updated and os.path.isdir(os.path.dirname(transfer_jobs_cache_file)):
+        with open(transfer_jobs_cache_file, 'w') as c: json.dump(cache, c)
+
+    return jobs
+
+
+def init_report_dir(metadata_dir, report_name, repo):
+    report_dir = metadata_dir + '/reports/' + report_name if not repo else metadata_dir + '/reports/' + report_name + '/' + repo
+
+    if os.path.exists(report_dir): shutil.rmtree(report_dir, ignore_errors=True)  # empty the folder if exists
+    os.makedirs(report_dir)
+
+    return report_dir
+
+
+def generate_report(metadata_dir, report_name, timestamp, repo, jobs, donors):
+    expected_donors = {}
+    for donor_unique_id, donor_info in donors.iteritems():
+        if not donor_info.get('is_expected'): continue
+        expected_donors.setdefault(donor_info.get('dcc_project_code'), set()).add(donor_unique_id)
+
+    report = OrderedDict()
+    for project, project_value in jobs.iteritems():
+        report[project] = {}
+        for ctype in count_types:
+            report[project][ctype] = {'count': 0, 'donors': set()}
+
+        donors_list = expected_donors.get(project, set())
+
+        report[project]['expected_to_be_transferred']['count'] = len(donors_list)
+        report[project]['expected_to_be_transferred']['donors'] = copy.deepcopy(donors_list)
+        report[project]['both_not_transferred']['count'] = len(donors_list)
+        report[project]['both_not_transferred']['donors'] = copy.deepcopy(donors_list)
+
+        for donor, donor_value in project_value.iteritems():
+            donor_unique_id = project + "::" + donor
+            tumor_aliquot_count = donors.get(donor_unique_id, {}).get('tumor_aliquot_count')
+
+            is_normal_transferred = donor_value.get('WGS-BWA-Normal') and len(donor_value.get('WGS-BWA-Normal')) == 1
+            is_tumor_transferred = donor_value.get('WGS-BWA-Tumor') and len(donor_value.get('WGS-BWA-Tumor')) == tumor_aliquot_count
+
+            if is_normal_transferred and is_tumor_transferred:
+                ctype = 'both_transferred'
+            elif is_normal_transferred:
+                ctype = 'normal_transferred_tumor_not'
+            elif is_tumor_transferred:
+                ctype = 'tumor_transferred_normal_not'
+            else:
+                continue
+
+            report[project][ctype]['count'] += 1
+            report[project][ctype]['donors'].add(donor_unique_id)
+            report[project]['both_not_transferred']['count'] -= 1
+            report[project]['both_not_transferred']['donors'].discard(donor_unique_id)
+
+    report_dir = init_report_dir(metadata_dir, report_name, repo)
+
+    summary_table = []
+    for p in report.keys():
+        summary = OrderedDict()
+        summary['project'] = p
+        summary['timestamp'] = timestamp
+        for ctype in count_types:
+            summary[ctype] = report.get(p).get(ctype).get('count')
+            donors_set = report.get(p).get(ctype).get('donors')
+
+            if donors_set:
+                with open(report_dir + '/' + p + '.' + ctype + '.donors.txt', 'w') as o:
+                    o.write('# ' + ctype + '\n')
+                    o.write('# dcc_project_code' + '\t' + 'submitter_donor_id' + '\n')
+                    for d in donors_set:
+                        # TODO: query ES to get JSON then retrieve BAM info: aligned/unaligned, gnos, bam file name etc
+                        o.write(d.replace('::', '\t') + '\n')
+
+        summary_table.append(summary)
+
+    with open(report_dir + '/donor.json', 'w') as o:
+        o.write(json.dumps(summary_table))
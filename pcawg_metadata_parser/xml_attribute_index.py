@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+# Attribute index over the cached GNOS metadata xml: one sqlite row per
+# cached (repo, analysis_id, last_modified) holding the fields most tools
+# need (ids, study, library_strategy, workflow, files, xml md5sums). Rows are
+# added by the downloader as it writes the xml files, and any cached xml
+# missing from the index is parsed (in parallel) on the next update, so
+# lookups and filters run off the table without touching the xml files.
+
+import os
+import re
+import json
+import hashlib
+import sqlite3
+from parse_gnos_xml import get_xml_files, add_effective_xml_md5sum
+from gnos_xml_scanner import scan_xml_files
+
+
+index_file = 'gnos_metadata/__all_metadata_xml/xml_attribute_index.sqlite'
+
+analysis_fields = [
+    'analysis_id',
+    'state',
+    'last_modified',
+    'published_date',
+    'analysis_detail_uri',
+    'study',
+    'library_strategy',
+    'aliquot_id'
+]
+
+attrib_fields = [
+    'dcc_project_code',
+    'submitter_donor_id',
+    'submitter_specimen_id',
+    'submitter_sample_id',
+    'dcc_specimen_type',
+    'workflow_name',
+    'workflow_version'
+]
+
+columns = ['repo', 'xml_file'] + analysis_fields + attrib_fields + \
+          ['has_analysis_attrib', 'files', 'xml_md5sum', 'effective_xml_md5sum']
+
+
+def xml_md5sum(xml_str):
+    # md5sum of the xml as shipped in transfer jobs, ie, with the ResultSet attributes removed
+    return hashlib.md5(re.sub(r'<ResultSet .+?>', '<ResultSet>', xml_str)).hexdigest()
+
+
+def effective_xml_md5sum(xml_str, gnos_analysis=None):
+    if not gnos_analysis or not gnos_analysis.get('_effective_xml_md5sum'):
+        gnos_analysis = add_effective_xml_md5sum({}, xml_str)
+    return gnos_analysis.get('_effective_xml_md5sum')
+
+
+def get_analysis_attrib(gnos_analysis):
+    analysis = ((gnos_analysis.get('analysis_xml') or {}).get('ANALYSIS_SET') or {}).get('ANALYSIS') or {}
+    attrib_fragment = (analysis.get('ANALYSIS_ATTRIBUTES') or {}).get('ANALYSIS_ATTRIBUTE')
+    if not attrib_fragment: return {}
+    if not isinstance(attrib_fragment, list): attrib_fragment = [attrib_fragment]
+
+    analysis_attrib = {}
+    for a in attrib_fragment:
+        if not analysis_attrib.get(a['TAG']):
+            analysis_attrib[a['TAG']] = a['VALUE']
+    return analysis_attrib
+
+
+def get_files(gnos_analysis):
+    file_list = (gnos_analysis.get('files') or {}).get('file') or []
+    if isinstance(file_list, dict): file_list = [file_list]
+    return [{
+        'file_name': f.get('filename'),
+        'file_size': f.get('filesize'),
+        'file_md5sum': (f.get('checksum') or {}).get('#text')
+    } for f in file_list]
+
+
+def to_text(value):
+    # elements with xml attributes come out of xmltodict as dicts
+    return value if value is None or isinstance(value, basestring) else json.dumps(value)
+
+
+def create_row(gnos_analysis, xml_file, xml_str):
+    # xml_file: <output_dir>/__all_metadata_xml/<repo>/<analysis_id>__<state>__<last_modified>.xml
+    analysis_attrib = get_analysis_attrib(gnos_analysis)
+
+    row = {
+        'repo': xml_file.split('/')[-2],
+        'xml_file': xml_file
+    }
+    for f in analysis_fields: row[f] = to_text(gnos_analysis.get(f))
+    for f in attrib_fields: row[f] = to_text(analysis_attrib.get(f))
+    row['has_analysis_attrib'] = 1 if analysis_attrib else 0
+    row['files'] = json.dumps(get_files(gnos_analysis))
+    row['xml_md5sum'] = xml_md5sum(xml_str)
+    row['effective_xml_md5sum'] = effective_xml_md5sum(xml_str, gnos_analysis)
+
+    return row
+
+
+class XmlAttributeIndex(object):
+
+    def __init__(self, db_file=index_file):
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS analysis_objects (' +
+                          ', '.join(c + ' INTEGER' if c == 'has_analysis_attrib' else c + ' TEXT' for c in columns) +
+                          ', PRIMARY KEY (repo, analysis_id, last_modified))')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS analysis_objects_library_strategy ON analysis_objects (library_strategy)')
+        self.conn.commit()
+
+    def _insert(self, rows):
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO analysis_objects (' + ', '.join(columns) + ') VALUES (' +
+                                  ', '.join(['?'] * len(columns)) + ')',
+                                  ([r.get(c) for c in columns] for r in rows))
+
+    def add(self, gnos_analysis, xml_file, xml_str):
+        self._insert([create_row(gnos_analysis, xml_file, xml_str)])
+
+    def update(self, xml_files, workers=None):
+        # parse and add the xml files not in the index yet
+        indexed = set(r[0] for r in self.conn.execute('SELECT xml_file FROM analysis_objects'))
+        missing = [f for f in xml_files if not f in indexed and os.path.isfile(f)]
+        if missing:
+            self._insert(scan_xml_files(missing, create_row, effective_md5=True, workers=workers, with_xml=True))
+        return len(missing)
+
+    def update_metadata_dir(self, metadata_dir, conf, repo=None, workers=None):
+        xml_files = [conf.get('output_dir') + '/__all_metadata_xml/' + f for f in get_xml_files(metadata_dir, conf, repo)]
+        self.update(xml_files, workers)
+        return xml_files
+
+    def _to_dict(self, row):
+        row = dict(zip(columns, row))
+        row['files'] = json.loads(row.get('files')) if row.get('files') else []
+        return row
+
+    def get(self, repo, analysis_id, state='live'):
+        # the latest cached version of the analysis object
+        row = self.conn.execute('SELECT ' + ', '.join(columns) + ' FROM analysis_objects '
+                                'WHERE repo = ? AND analysis_id = ? AND state = ? '
+                                'ORDER BY last_modified DESC LIMIT 1', (repo, analysis_id, state)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_xml_file(self, xml_file):
+        row = self.conn.execute('SELECT ' + ', '.join(columns) + ' FROM analysis_objects WHERE xml_file = ?', (xml_file, )).fetchone()
+        return self._to_dict(row) if row else None
+
+    def find(self, where=None, params=(), xml_files=None):
+        # where: sql condition on the columns, eg, "library_strategy LIKE '%RNA%'"
+        # xml_files: only return rows of these xml files, in their order
+        query = 'SELECT ' + ', '.join(columns) + ' FROM analysis_objects' + (' WHERE ' + where if where else '')
+        rows = (self._to_dict(r) for r in self.conn.execute(query, params))
+        if xml_files is None: return rows
+
+        rows = dict((r.get('xml_file'), r) for r in rows)
+        return (rows.get(f) for f in xml_files if f in rows)
+
+    def close(self):
+        self.conn.close()